@@ -0,0 +1,445 @@
+"""
+Grow A Beanstock - Asset Pipeline
+Build step that turns the full-resolution art in Assets/ into the sizes the
+game actually displays. Every PNG is shrunk to fit its on-screen box (at 2x
+for high-DPI screens), saved as an optimized PNG and as a WebP, and written to
+build/assets/ under a content-hashed name. build/assets/manifest.json maps each
+original path to its variants, and Run.py serves /Assets/<path> from the best
+one the client accepts.
+
+The bean, seed and vine sprites are also packed into one texture atlas per
+family (build/assets/atlases/), with build/assets/atlases/atlases.json giving
+each species id's frame, so a client can load three images instead of sixty.
+
+Resizing, WebP and atlases need Pillow. Without it the build still
+recompresses each PNG losslessly, at full size, with zlib.
+
+Usage:
+    python AssetPipeline.py            # build what changed since the last run
+    python AssetPipeline.py --force    # rebuild everything
+"""
+
+import argparse
+import hashlib
+import io
+import json
+import math
+import os
+import struct
+import sys
+import threading
+import zlib
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+try:
+    from PIL import Image
+except ImportError:  # Pillow is optional; without it PNGs are only recompressed
+    Image = None
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+SOURCE_DIR = os.path.join(BASE_DIR, 'Assets')
+BUILD_DIR = os.path.join(BASE_DIR, 'build', 'assets')
+MANIFEST_NAME = 'manifest.json'
+MANIFEST_VERSION = 1
+PIXEL_DENSITY = 2  # Variants are sized for 2x screens
+WEBP_QUALITY = 90
+HASH_LENGTH = 10  # Hex digits of the content hash in built file names
+PNG_SIGNATURE = b'\x89PNG\r\n\x1a\n'
+
+# Largest on-screen box (CSS pixels) each asset is drawn in; the first matching
+# path prefix wins and anything unlisted keeps its full size
+DISPLAY_SIZES: List[Tuple[str, Tuple[int, int]]] = [
+    ('BasicBeans/', (140, 140)),  # 40px vine beans, scaled up to 3.5x when massive
+    ('PlantSeeds/', (90, 90)),  # Shop and inventory icons
+    ('Vines/', (250, 500)),
+    ('burtvine.png', (250, 500)),
+    ('pot.png', (100, 100)),
+    ('cloud', (200, 200)),  # Clouds are drawn 200px wide
+]
+
+# Sprite atlases: name -> (catalog asset kind, directory under Assets)
+ATLAS_FAMILIES: Dict[str, Tuple[str, str]] = {
+    'beans': ('bean', 'BasicBeans'),
+    'seeds': ('seeds', 'PlantSeeds'),
+    'vines': ('vine', 'Vines'),
+}
+ATLAS_DIR = 'atlases'  # Under the build directory
+ATLAS_MANIFEST_NAME = 'atlases.json'
+ATLAS_PADDING = 2  # Transparent pixels around each frame, so filtering doesn't bleed neighbours in
+MAX_ATLAS_SIZE = 4096  # Widest and tallest atlas every browser's canvas and WebGL will take
+
+# Chunks that change how a PNG looks; text, timestamps and the like are dropped
+RENDERING_CHUNKS = {b'IHDR', b'PLTE', b'tRNS', b'gAMA', b'cHRM', b'sRGB', b'iCCP', b'sBIT', b'IDAT', b'IEND'}
+
+
+def display_size(relative_path: str) -> Optional[Tuple[int, int]]:
+    """On-screen box for an asset, in CSS pixels, or None to keep it full size"""
+    for prefix, size in DISPLAY_SIZES:
+        if relative_path.startswith(prefix):
+            return size
+    return None
+
+def fit_size(width: int, height: int, box: Optional[Tuple[int, int]]) -> Tuple[int, int]:
+    """Size that fits inside the box at PIXEL_DENSITY, keeping the aspect ratio; never enlarges"""
+    if box is None:
+        return width, height
+    scale = min(box[0] * PIXEL_DENSITY / width, box[1] * PIXEL_DENSITY / height, 1.0)
+    return max(1, round(width * scale)), max(1, round(height * scale))
+
+def _png_chunks(data: bytes) -> Iterator[Tuple[bytes, bytes]]:
+    position = len(PNG_SIGNATURE)
+    while position + 8 <= len(data):
+        length, kind = struct.unpack('>I4s', data[position:position + 8])
+        yield kind, data[position + 8:position + 8 + length]
+        position += 12 + length
+
+def _png_chunk(kind: bytes, payload: bytes) -> bytes:
+    return struct.pack('>I', len(payload)) + kind + payload + struct.pack('>I', zlib.crc32(kind + payload))
+
+def png_size(data: bytes) -> Tuple[int, int]:
+    return struct.unpack('>II', data[16:24])
+
+def recompress_png(data: bytes) -> bytes:
+    """Same pixels, ancillary chunks dropped and the image data deflated at the highest level"""
+    chunks = [(kind, payload) for kind, payload in _png_chunks(data) if kind in RENDERING_CHUNKS]
+    compressor = zlib.compressobj(9, zlib.DEFLATED, 15, 9)
+    pixels = compressor.compress(zlib.decompress(b''.join(p for kind, p in chunks if kind == b'IDAT')))
+    pixels += compressor.flush()
+    out = [PNG_SIGNATURE]
+    for kind, payload in chunks:
+        if kind == b'IDAT':
+            if pixels is not None:
+                out.append(_png_chunk(b'IDAT', pixels))
+                pixels = None
+        else:
+            out.append(_png_chunk(kind, payload))
+    result = b''.join(out)
+    return result if len(result) < len(data) else data
+
+def _encode(image, image_format: str, **options: Any) -> bytes:
+    buffer = io.BytesIO()
+    image.save(buffer, format=image_format, **options)
+    return buffer.getvalue()
+
+def build_variants(data: bytes, relative_path: str) -> List[Dict[str, Any]]:
+    """Encoded variants of one PNG, most preferred first: [{'mimetype', 'data', 'width', 'height'}]"""
+    width, height = png_size(data)
+    if Image is None:
+        return [{'mimetype': 'image/png', 'data': recompress_png(data), 'width': width, 'height': height}]
+
+    image = _load_resized(data, relative_path)
+    size = image.size
+    png = _encode(image, 'PNG', optimize=True)
+    if size == (width, height):
+        png = min(png, recompress_png(data), key=len)
+    webp = _encode(image, 'WEBP', quality=WEBP_QUALITY, method=6)
+    return [
+        {'mimetype': 'image/webp', 'data': webp, 'width': size[0], 'height': size[1]},
+        {'mimetype': 'image/png', 'data': png, 'width': size[0], 'height': size[1]}
+    ]
+
+def _load_resized(data: bytes, relative_path: str):
+    """Decode a PNG with Pillow and shrink it to its display size"""
+    with Image.open(io.BytesIO(data)) as source:
+        source.load()
+        image = source if source.mode in ('RGB', 'RGBA') else source.convert('RGBA')
+        size = fit_size(source.width, source.height, display_size(relative_path))
+        if size == image.size:
+            return image.copy() if image is source else image
+        if image.mode == 'RGBA':
+            # Resample with premultiplied alpha so transparent edges don't bleed dark fringes
+            return image.convert('RGBa').resize(size, Image.LANCZOS).convert('RGBA')
+        return image.resize(size, Image.LANCZOS)
+
+def _write_variants(build_dir: str, relative_path: str, variants: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Write encoded variants under content-hashed names; returns their manifest entries"""
+    written = []
+    for variant in variants:
+        file_name = hashed_name(relative_path, variant['data'], variant['mimetype'].split('/')[1])
+        output_path = os.path.join(build_dir, file_name)
+        os.makedirs(os.path.dirname(output_path), exist_ok=True)
+        with open(output_path, 'wb') as f:
+            f.write(variant['data'])
+        written.append({'file': file_name, 'mimetype': variant['mimetype'], 'bytes': len(variant['data']),
+                        'width': variant['width'], 'height': variant['height']})
+    return written
+
+def hashed_name(relative_path: str, data: bytes, extension: str) -> str:
+    """e.g. Vines/Chocovine.png -> Vines/Chocovine.3f9a0c1b2d.webp"""
+    stem = os.path.splitext(relative_path)[0]
+    return f"{stem}.{hashlib.sha256(data).hexdigest()[:HASH_LENGTH]}.{extension}"
+
+def build_settings() -> Dict[str, Any]:
+    """Everything that changes the output; a change rebuilds every asset"""
+    return {
+        'pillow': Image is not None,
+        'pixel_density': PIXEL_DENSITY,
+        'webp_quality': WEBP_QUALITY,
+        'display_sizes': [[prefix, list(size)] for prefix, size in DISPLAY_SIZES]
+    }
+
+
+def build_assets(source_dir: str = SOURCE_DIR, build_dir: str = BUILD_DIR, force: bool = False) -> Dict[str, Any]:
+    """Build variants of every PNG under source_dir; unchanged ones are reused from the last manifest"""
+    manifest_path = os.path.join(build_dir, MANIFEST_NAME)
+    previous: Dict[str, Any] = {}
+    if not force and os.path.exists(manifest_path):
+        with open(manifest_path, 'r', encoding='utf-8') as f:
+            previous = json.load(f)
+        if previous.get('version') != MANIFEST_VERSION or previous.get('settings') != build_settings():
+            previous = {}
+    previous_assets = previous.get('assets', {})
+
+    assets: Dict[str, Any] = {}
+    for directory, subdirectories, files in os.walk(source_dir):
+        subdirectories.sort()
+        for name in sorted(files):
+            path = os.path.join(directory, name)
+            relative_path = os.path.relpath(path, source_dir).replace(os.sep, '/')
+            with open(path, 'rb') as f:
+                data = f.read()
+            if not data.startswith(PNG_SIGNATURE):
+                continue  # Not really a PNG (drone.png is SVG); served as it is
+            digest = hashlib.sha256(data).hexdigest()
+
+            entry = previous_assets.get(relative_path)
+            if (entry and entry['source_sha256'] == digest
+                    and all(os.path.exists(os.path.join(build_dir, v['file'])) for v in entry['variants'])):
+                assets[relative_path] = entry
+                continue
+
+            width, height = png_size(data)
+            variants = _write_variants(build_dir, relative_path, build_variants(data, relative_path))
+            assets[relative_path] = {'source_sha256': digest, 'source_bytes': len(data),
+                                     'width': width, 'height': height, 'variants': variants}
+            print(f"🖼️  {relative_path}: {len(data):,} bytes -> "
+                  + ', '.join(f"{v['bytes']:,} {v['mimetype'].split('/')[1]}" for v in variants))
+
+    manifest = {'version': MANIFEST_VERSION, 'settings': build_settings(), 'assets': assets}
+    os.makedirs(build_dir, exist_ok=True)
+    temporary_path = manifest_path + '.tmp'
+    with open(temporary_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(temporary_path, manifest_path)
+    _remove_stale(build_dir, {v['file'] for entry in assets.values() for v in entry['variants']},
+                  skip_directory=ATLAS_DIR)
+    return manifest
+
+def _remove_stale(build_dir: str, wanted: set, skip_directory: Optional[str] = None):
+    """Delete built files that aren't wanted any more (manifests are kept)"""
+    for directory, subdirectories, files in os.walk(build_dir):
+        if skip_directory and os.path.normpath(directory) == os.path.normpath(build_dir):
+            subdirectories[:] = [d for d in subdirectories if d != skip_directory]
+        for name in files:
+            relative_path = os.path.relpath(os.path.join(directory, name), build_dir).replace(os.sep, '/')
+            if name not in (MANIFEST_NAME, ATLAS_MANIFEST_NAME) and relative_path not in wanted:
+                os.remove(os.path.join(directory, name))
+
+
+def pack_shelves(sizes: Dict[str, Tuple[int, int]], padding: int = ATLAS_PADDING
+                 ) -> Tuple[Dict[str, Tuple[int, int]], Tuple[int, int]]:
+    """Place frames in rows, tallest first, in a roughly square sheet.
+
+    Returns each frame's top-left corner and the sheet size. Sprites in a
+    family are drawn in the same box, so they are close in size and rows
+    waste little space.
+    """
+    padded = {key: (w + 2 * padding, h + 2 * padding) for key, (w, h) in sizes.items()}
+    area = sum(w * h for w, h in padded.values())
+    sheet_width = max(max((w for w, _ in padded.values()), default=0), math.ceil(math.sqrt(area)))
+    positions = {}
+    x = y = row_height = width = 0
+    for key in sorted(padded, key=lambda k: (-padded[k][1], -padded[k][0], k)):
+        w, h = padded[key]
+        if x + w > sheet_width:
+            x, y, row_height = 0, y + row_height, 0
+        positions[key] = (x + padding, y + padding)
+        x += w
+        row_height = max(row_height, h)
+        width = max(width, x)
+    return positions, (width, y + row_height)
+
+def atlas_sprites(kind: str) -> Dict[str, str]:
+    """Species id -> image file name for one asset kind, from the catalog"""
+    from Catalog import get_catalog
+    return {species.id: species.assets[kind] for species in get_catalog().species.values() if kind in species.assets}
+
+def build_atlas(name: str, source_dir: str = SOURCE_DIR) -> Tuple[Dict[str, Any], List[Dict[str, Any]]]:
+    """Pack one family's sprites; returns the atlas entry (without files) and its encoded variants"""
+    kind, directory = ATLAS_FAMILIES[name]
+    sprites = atlas_sprites(kind)
+    frames = {}
+    for file_name in sorted(set(sprites.values())):
+        relative_path = f"{directory}/{file_name}"
+        with open(os.path.join(source_dir, directory, file_name), 'rb') as f:
+            frames[file_name] = _load_resized(f.read(), relative_path).convert('RGBA')
+
+    positions, (width, height) = pack_shelves({file_name: image.size for file_name, image in frames.items()})
+    if width > MAX_ATLAS_SIZE or height > MAX_ATLAS_SIZE:
+        raise ValueError(f"{name} atlas would be {width}x{height}, over {MAX_ATLAS_SIZE}px; shrink its display size")
+    sheet = Image.new('RGBA', (width, height), (0, 0, 0, 0))
+    for file_name, image in frames.items():
+        sheet.paste(image, positions[file_name])
+
+    entry = {
+        'kind': kind,
+        'width': width,
+        'height': height,
+        # Several species may share an image; each still gets its own entry
+        'sprites': {species_id: {'x': positions[file_name][0], 'y': positions[file_name][1],
+                                 'w': frames[file_name].width, 'h': frames[file_name].height}
+                    for species_id, file_name in sorted(sprites.items())}
+    }
+    variants = [
+        {'mimetype': 'image/webp', 'data': _encode(sheet, 'WEBP', quality=WEBP_QUALITY, method=6),
+         'width': width, 'height': height},
+        {'mimetype': 'image/png', 'data': _encode(sheet, 'PNG', optimize=True), 'width': width, 'height': height}
+    ]
+    return entry, variants
+
+def _atlas_fingerprint(name: str, source_dir: str) -> str:
+    """Changes whenever an atlas's sprites, their pixels or the build settings change"""
+    kind, directory = ATLAS_FAMILIES[name]
+    digest = hashlib.sha256(json.dumps(build_settings(), sort_keys=True).encode('utf-8'))
+    for species_id, file_name in sorted(atlas_sprites(kind).items()):
+        digest.update(f"{species_id}={file_name};".encode('utf-8'))
+        with open(os.path.join(source_dir, directory, file_name), 'rb') as f:
+            digest.update(hashlib.sha256(f.read()).digest())
+    return digest.hexdigest()
+
+def build_atlases(source_dir: str = SOURCE_DIR, build_dir: str = BUILD_DIR, force: bool = False) -> Dict[str, Any]:
+    """Build every family's atlas that changed and write atlases.json"""
+    atlas_dir = os.path.join(build_dir, ATLAS_DIR)
+    manifest_path = os.path.join(atlas_dir, ATLAS_MANIFEST_NAME)
+    previous: Dict[str, Any] = {}
+    if not force and os.path.exists(manifest_path):
+        with open(manifest_path, 'r', encoding='utf-8') as f:
+            previous = json.load(f)
+        if previous.get('version') != MANIFEST_VERSION:
+            previous = {}
+
+    atlases = {}
+    for name in ATLAS_FAMILIES:
+        fingerprint = _atlas_fingerprint(name, source_dir)
+        entry = previous.get('atlases', {}).get(name)
+        if (entry and entry.get('fingerprint') == fingerprint
+                and all(os.path.exists(os.path.join(build_dir, v['file'])) for v in entry['variants'])):
+            atlases[name] = entry
+            continue
+        entry, variants = build_atlas(name, source_dir)
+        entry['fingerprint'] = fingerprint
+        entry['variants'] = _write_variants(build_dir, f"{ATLAS_DIR}/{name}.png", variants)
+        atlases[name] = entry
+        print(f"🧩 {name} atlas: {len(entry['sprites'])} sprites in {entry['width']}x{entry['height']}, "
+              + ', '.join(f"{v['bytes']:,} {v['mimetype'].split('/')[1]}" for v in entry['variants']))
+
+    manifest = {'version': MANIFEST_VERSION, 'atlases': atlases}
+    os.makedirs(atlas_dir, exist_ok=True)
+    temporary_path = manifest_path + '.tmp'
+    with open(temporary_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(temporary_path, manifest_path)
+    _remove_stale(atlas_dir, {os.path.relpath(v['file'], ATLAS_DIR).replace(os.sep, '/')
+                              for entry in atlases.values() for v in entry['variants']})
+    return manifest
+
+
+def pick_variant(variants: List[Dict[str, Any]], accept) -> Optional[Dict[str, Any]]:
+    """First variant whose type the client names in its Accept header (a werkzeug MIMEAccept).
+    PNG is always acceptable, since it is what the client asked for in the first place."""
+    accepted = {value for value, quality in accept if quality > 0}
+    for variant in variants:
+        # A bare */* doesn't count: clients that can't decode WebP send it too
+        if variant['mimetype'] == 'image/png' or variant['mimetype'] in accepted:
+            return variant
+    return None
+
+def _load_json(path: str) -> Dict[str, Any]:
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return data if data.get('version') == MANIFEST_VERSION else {}
+
+
+class AssetManifest:
+    """The built variants of each asset and the sprite atlases, for picking one per request"""
+    def __init__(self, assets: Optional[Dict[str, Any]] = None, atlases: Optional[Dict[str, Any]] = None):
+        self.assets = assets or {}
+        self.atlases = atlases or {}
+
+    @classmethod
+    def load(cls, build_dir: str = BUILD_DIR) -> 'AssetManifest':
+        """The manifests of the last build, or empty ones if there hasn't been a build"""
+        assets = _load_json(os.path.join(build_dir, MANIFEST_NAME)).get('assets')
+        atlases = _load_json(os.path.join(build_dir, ATLAS_DIR, ATLAS_MANIFEST_NAME)).get('atlases')
+        return cls(assets, atlases)
+
+    def best_variant(self, relative_path: str, accept) -> Optional[Dict[str, Any]]:
+        """Variant of an Assets/ path to serve for this Accept header, if it was built"""
+        entry = self.assets.get(relative_path)
+        return pick_variant(entry['variants'], accept) if entry else None
+
+    def best_atlas(self, name: str, accept) -> Optional[Dict[str, Any]]:
+        """Variant of a family's atlas image to serve for this Accept header, if it was built"""
+        entry = self.atlases.get(name)
+        return pick_variant(entry['variants'], accept) if entry else None
+
+    def has_alternatives(self, relative_path: str) -> bool:
+        """Whether the variant served for this asset depends on the Accept header"""
+        entry = self.assets.get(relative_path)
+        return entry is not None and len(entry['variants']) > 1
+
+    def totals(self) -> Dict[str, int]:
+        """Bytes of the originals and of the smallest variant of each type"""
+        totals = {'source': 0}
+        for entry in self.assets.values():
+            totals['source'] += entry['source_bytes']
+            for variant in entry['variants']:
+                kind = variant['mimetype'].split('/')[1]
+                totals[kind] = totals.get(kind, 0) + variant['bytes']
+        return totals
+
+
+_manifest: Optional[AssetManifest] = None
+_manifest_lock = threading.Lock()
+
+def get_asset_manifest() -> AssetManifest:
+    """The manifest of the last build, loaded on first use"""
+    global _manifest
+    if _manifest is None:
+        with _manifest_lock:
+            if _manifest is None:
+                _manifest = AssetManifest.load()
+    return _manifest
+
+def reload_asset_manifest() -> AssetManifest:
+    """Pick up a build made while the server was running"""
+    global _manifest
+    _manifest = AssetManifest.load()
+    return _manifest
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Build resized, recompressed variants of the game art")
+    parser.add_argument('--source', default=SOURCE_DIR, help="directory of original assets")
+    parser.add_argument('--out', default=BUILD_DIR, help="directory for built variants and the manifest")
+    parser.add_argument('--force', action='store_true', help="rebuild every asset, not just changed ones")
+    args = parser.parse_args(argv)
+
+    if Image is None:
+        print("ℹ️  Pillow isn't installed: PNGs are recompressed at full size, with no resizing or WebP "
+              "(pip install Pillow)")
+    manifest = build_assets(args.source, args.out, args.force)
+    if Image is not None:
+        build_atlases(args.source, args.out, args.force)
+    totals = AssetManifest(manifest['assets']).totals()
+    summary = ', '.join(f"{kind} {size / 1e6:.1f} MB ({totals['source'] / size:.1f}x smaller)"
+                        for kind, size in totals.items() if kind != 'source' and size)
+    print(f"✅ {len(manifest['assets'])} assets, {totals['source'] / 1e6:.1f} MB originals -> {summary}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
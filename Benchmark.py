@@ -0,0 +1,1056 @@
+"""
+Grow A Beanstock - Benchmarks
+Standalone performance benchmarks for the game server.
+
+Usage:
+    python Benchmark.py sessions
+    python Benchmark.py stress
+    python Benchmark.py xp-batch
+    python Benchmark.py leveling
+    python Benchmark.py pot-stats
+    python Benchmark.py autosave
+    python Benchmark.py sqlite
+    python Benchmark.py offline
+    python Benchmark.py shop-sampler
+    python Benchmark.py rarity
+    python Benchmark.py memory
+    python Benchmark.py catalog
+    python Benchmark.py serialize
+    python Benchmark.py logging
+    python Benchmark.py metrics
+    python Benchmark.py profiler
+    python Benchmark.py static
+"""
+
+import contextlib
+import io
+import json
+import logging
+import math
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List
+
+import Logs
+from Catalog import get_catalog
+from Logs import configure_logging, get_logger, log_stats
+from Setup import (GameState, PlantInstance, Pot, ShopSlot, SessionStore, PLANT_SPECIES, SESSION_COOKIE_NAME, get_shop_data, get_pots_data, session_store,
+                   get_experience_base, experience_for_level, get_level_table, get_level_multipliers,
+                   get_bulk_level_stats, LEVEL_STATS_MEMO, RARITY_CONFIG, get_shop_sampler,
+                   RandomBuffer, roll_rarity, roll_rarities)
+
+
+def benchmark_sessions(player_counts=(1, 10, 100, 1000, 10000), threads: int = 8,
+                       ops_per_thread: int = 2000) -> List[Dict[str, float]]:
+    """Measure request throughput of the session store as the player count grows.
+
+    Each operation looks up a random player and builds their shop and pots
+    views, which is what every API response does.
+    """
+    results = []
+    for player_count in player_counts:
+        store = SessionStore()
+        session_ids = [f"player_{i}" for i in range(player_count)]
+
+        start = time.perf_counter()
+        for session_id in session_ids:
+            store.get_or_create(session_id)
+        create_seconds = time.perf_counter() - start
+
+        def worker(seed: int) -> int:
+            rng = random.Random(seed)
+            for _ in range(ops_per_thread):
+                state = store.get_or_create(rng.choice(session_ids))
+                get_shop_data(state)
+                get_pots_data(state)
+            return ops_per_thread
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=threads) as pool:
+            total_ops = sum(pool.map(worker, range(threads)))
+        elapsed = time.perf_counter() - start
+
+        result = {
+            'players': player_count,
+            'create_per_sec': player_count / create_seconds if create_seconds else 0.0,
+            'ops_per_sec': total_ops / elapsed,
+        }
+        results.append(result)
+        print(f"👥 {player_count:>6} players | create {result['create_per_sec']:>10.0f}/s | "
+              f"requests {result['ops_per_sec']:>10.0f}/s")
+    return results
+
+
+def stress_transactions(threads: int = 16, requests_per_thread: int = 250) -> Dict[str, int]:
+    """Hammer one player's mutation endpoints from a thread pool and check invariants.
+
+    Mixes buy-seed, plant-from-inventory, burn-plant and XP requests against a
+    single session, then verifies no stock was double-spent, coins match the
+    purchases made, and every occupied pot points at a live plant instance.
+    """
+    from Run import app
+
+    session_id = 'stress_player'
+    state = session_store.get_or_create(session_id)
+    with state.transaction():
+        state.coins = 10 ** 9
+        state.shop.refresh_at = time.time() + 3600  # Keep the same roll for the whole run
+        initial_coins = state.coins
+        initial_stock = [slot.stock for slot in state.shop.slots]
+        species_names = [species.name for species in PLANT_SPECIES.values()]
+
+    def worker(seed: int) -> Dict[str, int]:
+        rng = random.Random(seed)
+        client = app.test_client()
+        client.set_cookie(SESSION_COOKIE_NAME, session_id)
+        counts = {'buys': 0, 'errors': 0}
+        for _ in range(requests_per_thread):
+            action = rng.random()
+            pot_index = rng.randrange(len(state.pots))
+            if action < 0.35:
+                response = client.post('/api/buy-seed', json={
+                    'slot_index': rng.randrange(len(initial_stock)), 'pot_index': rng.choice([-1, pot_index])})
+                if response.status_code == 200 and response.json['success']:
+                    counts['buys'] += 1
+            elif action < 0.55:
+                response = client.post('/api/plant-from-inventory', json={
+                    'species_name': rng.choice(species_names), 'pot_index': pot_index})
+            elif action < 0.70:
+                response = client.post('/api/burn-plant', json={'pot_index': pot_index})
+            else:
+                pot = state.pots[pot_index]
+                endpoint = '/api/add-plant-experience' if action < 0.9 else '/api/add-clipper-experience'
+                response = client.post(endpoint, json={
+                    'instance_id': pot.instance_id or 'missing', 'xp_amount': rng.randint(1, 500)})
+            if response.status_code >= 500:
+                counts['errors'] += 1
+        return counts
+
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        with ThreadPoolExecutor(max_workers=threads) as pool:
+            results = list(pool.map(worker, range(threads)))
+    elapsed = time.perf_counter() - start
+
+    buys = sum(r['buys'] for r in results)
+    errors = sum(r['errors'] for r in results)
+    with state.lock:
+        sold = sum(initial_stock[i] - slot.stock for i, slot in enumerate(state.shop.slots))
+        spent = initial_coins - state.coins
+        expected_spent = 0
+        for slot in state.shop.slots:
+            for n in range(slot.purchases_this_roll):
+                expected_spent += slot.base_price if n == 0 else int(slot.base_price * (1.1 if n == 1 else 1.25))
+        failures = []
+        if sold != buys:
+            failures.append(f"stock sold {sold} != successful buys {buys}")
+        if spent != expected_spent:
+            failures.append(f"coins spent {spent} != purchase prices {expected_spent}")
+        if any(slot.stock < 0 for slot in state.shop.slots):
+            failures.append("negative stock")
+        for pot in state.pots:
+            if (pot.state == 'empty') != (pot.instance_id is None):
+                failures.append(f"pot {pot.index} state {pot.state} with instance {pot.instance_id}")
+            elif pot.instance_id and pot.instance_id not in state.plant_instances:
+                failures.append(f"pot {pot.index} points at missing instance {pot.instance_id}")
+    session_store.remove(session_id)
+
+    total = threads * requests_per_thread
+    print(f"🔨 {total} requests from {threads} threads in {elapsed:.2f}s ({total / elapsed:.0f} req/s), "
+          f"{buys} purchases, {errors} server errors")
+    for failure in failures:
+        print(f"❌ {failure}")
+    if errors or failures:
+        raise SystemExit(1)
+    print("✅ All transaction invariants held")
+    return {'requests': total, 'purchases': buys, 'errors': errors}
+
+
+def benchmark_experience_batch(events: int = 1200, batch_size: int = 100) -> Dict[str, float]:
+    """Compare one XP POST per bean against the batched ingestion endpoint"""
+    from Run import app
+
+    session_id = 'xp_batch_player'
+    state = session_store.get_or_create(session_id)
+    with state.transaction():
+        state.coins = 10 ** 9
+        for pot_index in range(len(state.pots)):
+            state.buy_seed(0, pot_index)
+    instance_ids = [pot.instance_id for pot in state.pots if pot.instance_id]
+    client = app.test_client()
+    client.set_cookie(SESSION_COOKIE_NAME, session_id)
+    stream = [(instance_ids[i % len(instance_ids)], 'plant' if i % 3 else 'clipper') for i in range(events)]
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        for instance_id, kind in stream:
+            client.post(f'/api/add-{kind}-experience', json={'instance_id': instance_id, 'xp_amount': 2})
+        single_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for offset in range(0, events, batch_size):
+            client.post('/api/add-experience-batch', json={'events': [
+                {'instance_id': instance_id, 'kind': kind, 'xp_amount': 2}
+                for instance_id, kind in stream[offset:offset + batch_size]]})
+        batch_seconds = time.perf_counter() - start
+    session_store.remove(session_id)
+
+    print(f"📨 {events} events one-per-request: {single_seconds * 1000:.0f}ms ({events} requests)")
+    print(f"📦 {events} events in batches of {batch_size}: {batch_seconds * 1000:.0f}ms "
+          f"({-(-events // batch_size)} requests, {single_seconds / batch_seconds:.1f}x faster)")
+    return {'single_seconds': single_seconds, 'batch_seconds': batch_seconds}
+
+
+def _level_up_one_at_a_time(base_xp: int, level: int, experience: float):
+    """Reference leveling loop the tables replaced"""
+    while True:
+        required_xp = experience_for_level(base_xp, level + 1)
+        if experience >= required_xp:
+            experience -= required_xp
+            level += 1
+        else:
+            return level, experience
+
+
+def benchmark_leveling(grants=(10, 1_000, 100_000, 10_000_000, 1_000_000_000), repeats: int = 200) -> List[Dict[str, float]]:
+    """Compare the per-level loop with table lookups for XP grants of growing size"""
+    rng = random.Random(7)
+    species_ids = list(PLANT_SPECIES)
+    results = []
+    for grant in grants:
+        cases = []
+        for _ in range(repeats):
+            species_id = rng.choice(species_ids)
+            cases.append((species_id, rng.randint(1, 50), grant + rng.random()))
+
+        start = time.perf_counter()
+        expected = [_level_up_one_at_a_time(get_experience_base(PLANT_SPECIES[sid].seed_cost), level, xp)
+                    for sid, level, xp in cases]
+        loop_seconds = time.perf_counter() - start
+
+        # Tables are shared by every player and only grow once, so time the steady state
+        for sid, level, xp in cases:
+            get_level_table(sid).resolve(level, xp)
+        start = time.perf_counter()
+        actual = [get_level_table(sid).resolve(level, xp) for sid, level, xp in cases]
+        table_seconds = time.perf_counter() - start
+
+        if actual != expected:
+            raise SystemExit(f"❌ Table leveling differs from the loop for grants of {grant} XP")
+        levels_gained = sum(new_level - level for (new_level, _), (_, level, _) in zip(expected, cases)) / repeats
+        results.append({'grant': grant, 'levels_gained': levels_gained,
+                        'loop_us': loop_seconds / repeats * 1e6, 'table_us': table_seconds / repeats * 1e6})
+        print(f"⭐ {grant:>13,} XP (~{levels_gained:>7.0f} levels) | loop {loop_seconds / repeats * 1e6:>9.1f}us | "
+              f"table {table_seconds / repeats * 1e6:>6.1f}us | {loop_seconds / table_seconds:>7.1f}x")
+    print("✅ Table leveling matches the loop exactly")
+    return results
+
+
+def benchmark_pot_stats(instance_counts=(12, 1_000, 100_000), max_level: int = 500) -> List[Dict[str, float]]:
+    """Compare per-pot multiplier/required-XP calls with the bulk memoized path"""
+    rng = random.Random(11)
+    species = list(PLANT_SPECIES.values())
+    results = []
+    for count in instance_counts:
+        keys = [(rng.randint(1, max_level), get_experience_base(rng.choice(species).seed_cost)) for _ in range(count)]
+        tables = {base_xp: get_level_table(s.id) for s in species for base_xp in [get_experience_base(s.seed_cost)]}
+
+        start = time.perf_counter()
+        for level, base_xp in keys:
+            get_level_multipliers(level)
+            tables[base_xp].required_for(level + 1)
+        per_pot_seconds = time.perf_counter() - start
+
+        LEVEL_STATS_MEMO.clear()
+        start = time.perf_counter()
+        get_bulk_level_stats(keys)
+        cold_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        get_bulk_level_stats(keys)
+        warm_seconds = time.perf_counter() - start
+
+        results.append({'instances': count, 'per_pot_ms': per_pot_seconds * 1000,
+                        'bulk_cold_ms': cold_seconds * 1000, 'bulk_warm_ms': warm_seconds * 1000})
+        print(f"🪴 {count:>7} instances | per-pot {per_pot_seconds * 1000:>8.2f}ms | "
+              f"bulk cold {cold_seconds * 1000:>7.2f}ms | bulk memoized {warm_seconds * 1000:>7.2f}ms")
+    return results
+
+
+def benchmark_autosave(player_counts=(100, 1_000, 10_000), dirty_fraction: float = 0.1) -> List[Dict[str, float]]:
+    """Measure flush latency and bytes written when a fraction of players changed"""
+    import shutil
+    import tempfile
+    from Persistence import AutosaveManager, JSONFileBackend
+
+    results = []
+    for player_count in player_counts:
+        directory = tempfile.mkdtemp(prefix='beanstock_saves_')
+        store = SessionStore()
+        manager = AutosaveManager(JSONFileBackend(directory), store=store)
+        states = [store.get_or_create(f"player_{i}") for i in range(player_count)]
+        for state in states:
+            state.coins = 10 ** 7
+            state.buy_seed(0, 0)
+            manager.mark_dirty(state)
+        full = manager.flush()
+
+        for state in random.Random(3).sample(states, int(player_count * dirty_fraction)):
+            state.set_coins(state.coins + 1)
+            manager.mark_dirty(state)
+        incremental = manager.flush()
+        shutil.rmtree(directory, ignore_errors=True)
+
+        results.append({'players': player_count, 'full_ms': full['seconds'] * 1000, 'full_bytes': full['bytes'],
+                        'incremental_ms': incremental['seconds'] * 1000, 'incremental_bytes': incremental['bytes']})
+        print(f"💾 {player_count:>6} players | full flush {full['seconds'] * 1000:>8.1f}ms {full['bytes']:>10,}B | "
+              f"{dirty_fraction:.0%} dirty {incremental['seconds'] * 1000:>7.1f}ms {incremental['bytes']:>9,}B")
+    return results
+
+
+def benchmark_sqlite(player_count: int = 100_000, max_players: int = 5_000, flush_every: int = 5_000,
+                     samples: int = 1_000) -> Dict[str, float]:
+    """Grow far more players than fit in memory through a bounded store backed by SQLite.
+
+    Checks that memory stays bounded, reports batched flush throughput and cold
+    load latency, and verifies evicted players come back exactly as saved.
+    """
+    import os
+    import shutil
+    import tempfile
+    from Persistence import AutosaveManager
+    from Storage import SQLiteBackend
+
+    directory = tempfile.mkdtemp(prefix='beanstock_db_')
+    backend = SQLiteBackend(os.path.join(directory, 'bench.db'))
+    store = SessionStore(max_players=max_players, min_idle_seconds=0)
+    manager = AutosaveManager(backend, store=store)
+    store.loader = manager.load_state
+
+    flush_seconds = 0.0
+    peak_in_memory = 0
+    for i in range(player_count):
+        state = store.get_or_create(f"player_{i}")
+        state.coins = 10 ** 7
+        with contextlib.redirect_stdout(io.StringIO()):
+            state.buy_seed(0, 0)
+        manager.mark_dirty(state)
+        if (i + 1) % flush_every == 0:
+            flush_seconds += manager.flush()['seconds']
+            peak_in_memory = max(peak_in_memory, len(store))
+    if manager.pending:
+        flush_seconds += manager.flush()['seconds']
+
+    # Evicted players must load back exactly as they were saved
+    rng = random.Random(5)
+    session_ids = [f"player_{rng.randrange(player_count)}" for _ in range(samples)]
+    latencies = []
+    for session_id in session_ids:
+        in_memory = store.get(session_id)
+        expected = in_memory.save_data() if in_memory is not None else backend.load(session_id)
+        store.remove(session_id)
+        start = time.perf_counter()
+        loaded = store.get_or_create(session_id)
+        latencies.append(time.perf_counter() - start)
+        actual = loaded.save_data()
+        for data in (expected, actual):
+            data.pop('last_save')
+        if actual != expected:
+            raise SystemExit(f"❌ {session_id} did not round-trip through SQLite")
+
+    latencies.sort()
+    result = {
+        'players': player_count,
+        'peak_in_memory': peak_in_memory,
+        'evictions': store.evictions,
+        'saved': backend.count(),
+        'flush_players_per_second': player_count / flush_seconds,
+        'cold_load_p50_ms': latencies[len(latencies) // 2] * 1000,
+        'cold_load_p99_ms': latencies[int(len(latencies) * 0.99)] * 1000,
+    }
+    backend.close()
+    shutil.rmtree(directory, ignore_errors=True)
+
+    print(f"🗄️ {player_count:,} players | peak {peak_in_memory:,} in memory (cap {max_players:,}) | "
+          f"{store.evictions:,} evictions | {result['saved']:,} saved")
+    print(f"💾 Batched flushes: {result['flush_players_per_second']:,.0f} players/s")
+    print(f"📥 Cold load p50 {result['cold_load_p50_ms']:.2f}ms | p99 {result['cold_load_p99_ms']:.2f}ms")
+    print("✅ Evicted players round-trip exactly")
+    return result
+
+
+def benchmark_offline(away_seconds=(600, 3_600, 86_400, 7 * 86_400), repeats: int = 200) -> List[Dict[str, float]]:
+    """Time catching up a full garden of clipped plants after growing absences"""
+    from Offline import catch_up
+
+    species_ids = list(PLANT_SPECIES)
+    results = []
+    for away in away_seconds:
+        states = []
+        now = time.time()
+        for i in range(repeats):
+            state = GameState()
+            for pot in state.pots:
+                species = PLANT_SPECIES[species_ids[(i + pot.index) % len(species_ids)]]
+                instance_id = state.allocate_instance_id()
+                instance = PlantInstance(species.id, now - away - species.grow_time, {'size': 'normal', 'finish': 'none'})
+                instance.level = 25 + pot.index
+                instance.clipper_unlocked = True
+                instance.clipper_level = 1
+                state.plant_instances[instance_id] = instance
+                pot.state = 'growing'
+                pot.instance_id = instance_id
+            state.rebuild_ready_queue()
+            state.last_seen = now - away
+            states.append(state)
+
+        start = time.perf_counter()
+        reports = [catch_up(state, now) for state in states]
+        elapsed = time.perf_counter() - start
+
+        coins = sum(report['coins'] for report in reports) / repeats
+        results.append({'away_seconds': away, 'catch_up_ms': elapsed / repeats * 1000, 'coins': coins})
+        print(f"🌙 {away:>7,}s away | {elapsed / repeats * 1000:>6.3f}ms per 12-pot garden | "
+              f"{coins:>14,.0f} coins earned")
+    return results
+
+
+def _legacy_refresh_slots(rng: random.Random) -> List[tuple]:
+    """Reference shop roll: the original attempt-by-attempt rejection loop"""
+    species_by_rarity = {}
+    for species_id, species in PLANT_SPECIES.items():
+        species_by_rarity.setdefault(species.rarity, []).append(species_id)
+
+    slots = []
+    spawned_species = set()
+    attempts = 0
+    while len(slots) < 8 and attempts < 50:
+        attempts += 1
+        spawned = False
+        rarities = list(RARITY_CONFIG.keys())
+        rng.shuffle(rarities)
+        for rarity in rarities:
+            config = RARITY_CONFIG[rarity]
+            if rng.random() < config['spawn_chance']:
+                available_species = [s for s in species_by_rarity.get(rarity, []) if s not in spawned_species]
+                if available_species:
+                    species_id = rng.choice(available_species)
+                    slots.append((species_id, rng.randint(config['min_qty'], config['max_qty'])))
+                    spawned_species.add(species_id)
+                    spawned = True
+                    break
+        if not spawned and len(slots) < 4:
+            available_commons = [s for s in species_by_rarity['common'] if s not in spawned_species]
+            if available_commons:
+                species_id = rng.choice(available_commons)
+                config = RARITY_CONFIG['common']
+                slots.append((species_id, rng.randint(config['min_qty'], config['max_qty'])))
+                spawned_species.add(species_id)
+    return slots
+
+def _chi_square_p_value(counts_a: Dict, counts_b: Dict) -> tuple:
+    """Two-sample chi-square homogeneity test; returns (statistic, degrees of freedom, p-value)"""
+    total_a, total_b = sum(counts_a.values()), sum(counts_b.values())
+    statistic, categories = 0.0, 0
+    for key in set(counts_a) | set(counts_b):
+        a, b = counts_a.get(key, 0), counts_b.get(key, 0)
+        expected_a = (a + b) * total_a / (total_a + total_b)
+        expected_b = (a + b) * total_b / (total_a + total_b)
+        if expected_a < 5 or expected_b < 5:
+            continue  # Too rare to test reliably
+        statistic += (a - expected_a) ** 2 / expected_a + (b - expected_b) ** 2 / expected_b
+        categories += 1
+    dof = max(1, categories - 1)
+    # Wilson-Hilferty: (X/k)^(1/3) is close to normal
+    z = ((statistic / dof) ** (1 / 3) - (1 - 2 / (9 * dof))) / (2 / (9 * dof)) ** 0.5
+    return statistic, dof, 0.5 * math.erfc(z / 2 ** 0.5)
+
+def benchmark_shop_sampler(refreshes: int = 200_000, significance: float = 0.001) -> Dict[str, float]:
+    """Compare the alias-table shop sampler with the original loop, for speed and distribution"""
+    sampler = get_shop_sampler()
+    legacy_rng, sampler_rng = random.Random(13), random.Random(17)
+
+    start = time.perf_counter()
+    legacy = [_legacy_refresh_slots(legacy_rng) for _ in range(refreshes)]
+    legacy_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    drawn = [[(slot.species_id, slot.stock) for slot in sampler.draw(sampler_rng)] for _ in range(refreshes)]
+    sampler_seconds = time.perf_counter() - start
+
+    # Compare slot counts, which species sit in which slot, and stock quantities
+    features = {
+        'slot count': lambda slots: [len(slots)],
+        'species by position': lambda slots: [(i, species_id) for i, (species_id, _) in enumerate(slots)],
+        'species and stock': lambda slots: list(slots),
+    }
+    failed = False
+    for name, feature in features.items():
+        counts = []
+        for rolls in (legacy, drawn):
+            tally = {}
+            for slots in rolls:
+                for key in feature(slots):
+                    tally[key] = tally.get(key, 0) + 1
+            counts.append(tally)
+        statistic, dof, p_value = _chi_square_p_value(*counts)
+        failed |= p_value < significance
+        print(f"📊 {name:<20} chi2 {statistic:>9.1f} on {dof:>3} dof | p = {p_value:.3f}")
+
+    print(f"🛒 {refreshes:,} refreshes | loop {legacy_seconds / refreshes * 1e6:>6.1f}us | "
+          f"sampler {sampler_seconds / refreshes * 1e6:>6.1f}us | {legacy_seconds / sampler_seconds:.1f}x")
+    if failed:
+        raise SystemExit(f"❌ Sampler distribution differs from the loop (p < {significance})")
+    print("✅ Sampler matches the original distribution")
+    return {'refreshes': refreshes, 'loop_us': legacy_seconds / refreshes * 1e6,
+            'sampler_us': sampler_seconds / refreshes * 1e6}
+
+
+def _legacy_generate_rarity() -> Dict[str, str]:
+    """Reference plant rarity roll: two random.random() calls and an if-chain"""
+    size_roll = random.random()
+    size = 'normal' if size_roll < 0.65 else 'large' if size_roll < 0.95 else 'massive'
+    finish_roll = random.random()
+    finish = 'none' if finish_roll < 0.94 else 'shiny' if finish_roll < 0.97 else 'golden'
+    return {'size': size, 'finish': finish}
+
+def benchmark_rarity(counts=(1, 12, 1_000, 100_000), repeats: int = 20) -> List[Dict[str, float]]:
+    """Compare per-plant rarity rolls with buffered and batched rolls"""
+    results = []
+    for count in counts:
+        rounds = max(1, repeats * 1000 // count)
+
+        start = time.perf_counter()
+        for _ in range(rounds):
+            [_legacy_generate_rarity() for _ in range(count)]
+        legacy_seconds = (time.perf_counter() - start) / (rounds * count)
+
+        buffer = RandomBuffer(seed=1)
+        start = time.perf_counter()
+        for _ in range(rounds):
+            [roll_rarity(buffer) for _ in range(count)]
+        single_seconds = (time.perf_counter() - start) / (rounds * count)
+
+        buffer = RandomBuffer(seed=1)
+        start = time.perf_counter()
+        for _ in range(rounds):
+            roll_rarities(count, buffer)
+        batch_seconds = (time.perf_counter() - start) / (rounds * count)
+
+        results.append({'count': count, 'legacy_ns': legacy_seconds * 1e9, 'buffered_ns': single_seconds * 1e9,
+                        'batched_ns': batch_seconds * 1e9})
+        print(f"🎲 {count:>7,} plants | per-plant random() {legacy_seconds * 1e9:>6.0f}ns | "
+              f"buffered single {single_seconds * 1e9:>6.0f}ns | batched {batch_seconds * 1e9:>6.0f}ns per plant")
+
+    # The same seed must give the same plants whether they are rolled one at a time or in a batch
+    one_by_one, batched = RandomBuffer(seed=42), RandomBuffer(seed=42)
+    if [roll_rarity(one_by_one) for _ in range(5_000)] != roll_rarities(5_000, batched):
+        raise SystemExit("❌ Batched rolls differ from single rolls for the same seed")
+    print("✅ Seeded rolls are identical one at a time and batched")
+    return results
+
+
+class _LegacyPlantInstance:
+    """Reference plant instance: a plain __dict__ object with its own rarity dict"""
+    def __init__(self, species_id: str, planted_at: float, rarity: Dict[str, str]):
+        self.species_id = species_id
+        self.planted_at = planted_at
+        self.picks_done = 0
+        self.rarity = dict(rarity)
+        self.ready_state = 'growing'
+        self.level = 1
+        self.experience = 0
+        self.clipper_unlocked = False
+        self.clipper_level = 0
+        self.clipper_experience = 0
+
+class _LegacyPot:
+    """Reference pot without __slots__"""
+    def __init__(self, index: int):
+        self.index = index
+        self.state = 'empty'
+        self.instance_id = None
+
+class _LegacyShopSlot:
+    """Reference shop slot without __slots__"""
+    def __init__(self, species_id: str, stock: int, base_price: int):
+        self.species_id = species_id
+        self.stock = stock
+        self.base_price = base_price
+        self.purchases_this_roll = 0
+
+def _full_garden(seed: int, legacy: bool) -> GameState:
+    """A player with every pot planted, built from the current or the reference classes"""
+    state = GameState(seed=seed)
+    species_ids = list(PLANT_SPECIES)
+    now = time.time()
+    pot_class, instance_class, slot_class = ((_LegacyPot, _LegacyPlantInstance, _LegacyShopSlot) if legacy
+                                             else (Pot, PlantInstance, ShopSlot))
+    state.pots = [pot_class(i) for i in range(len(state.pots))]
+    state.shop.slots = [slot_class(s.species_id, s.stock, s.base_price) for s in state.shop.slots]
+    for pot in state.pots:
+        species_id = species_ids[(seed + pot.index) % len(species_ids)]
+        instance_id = f"plant_{now}_{pot.index}" if legacy else state.allocate_instance_id()
+        state.plant_instances[instance_id] = instance_class(species_id, now, state.generate_rarity())
+        pot.state = 'growing'
+        pot.instance_id = instance_id
+    state.rebuild_ready_queue()
+    return state
+
+def _measure_players(players: int, legacy: bool) -> float:
+    """Bytes allocated per player while building full gardens"""
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    states = [_full_garden(i, legacy) for i in range(players)]
+    allocated = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    del states
+    return allocated / players
+
+def benchmark_memory(players: int = 2_000, churn: int = 500) -> Dict[str, float]:
+    """Compare per-player memory of slotted objects and integer IDs with the original representation"""
+    legacy_bytes = _measure_players(players, legacy=True)
+    slotted_bytes = _measure_players(players, legacy=False)
+    print(f"🧠 {players:,} full gardens | dict objects {legacy_bytes / 1024:.1f} KiB/player | "
+          f"slotted {slotted_bytes / 1024:.1f} KiB/player | {1 - slotted_bytes / legacy_bytes:.0%} smaller")
+
+    # Burning and replanting leaves queue entries behind; compaction clears them
+    state = _full_garden(0, legacy=False)
+    with contextlib.redirect_stdout(io.StringIO()):
+        for i in range(churn):
+            pot_index = i % len(state.pots)
+            state.burn_plant(pot_index)
+            state.plant_from_inventory(PLANT_SPECIES['beanstalk'].name, pot_index)
+    queued = len(state._ready_heap)
+    dropped = state.compact()
+    print(f"🧹 {churn} replants | ready queue {queued} -> {len(state._ready_heap)} entries ({dropped} dropped)")
+    if len(state._ready_heap) != sum(pot.state == 'growing' for pot in state.pots):
+        raise SystemExit("❌ Compaction left stale ready-queue entries")
+
+    # Integer IDs survive a save, and string IDs from older saves are renumbered
+    restored = GameState.from_save(state.save_game())
+    if ([pot.instance_id for pot in restored.pots] != [pot.instance_id for pot in state.pots]
+            or restored.next_instance_id != state.next_instance_id):
+        raise SystemExit("❌ Instance IDs changed across a save")
+    old_save = state.save_data()
+    old_save['plant_instances'] = {f"plant_{k}": v for k, v in old_save['plant_instances'].items()}
+    for pot in old_save['pots']:
+        pot['instance_id'] = f"plant_{pot['instance_id']}" if pot['instance_id'] else None
+    del old_save['next_instance_id']
+    migrated = GameState.from_save_data(old_save)
+    if any(pot.instance_id not in migrated.plant_instances for pot in migrated.pots if pot.state != 'empty'):
+        raise SystemExit("❌ Old string instance IDs were not migrated")
+    print("✅ Instance IDs round-trip and old saves migrate")
+    return {'players': players, 'legacy_bytes_per_player': legacy_bytes, 'slotted_bytes_per_player': slotted_bytes}
+
+
+def _legacy_find_species(species_name: str):
+    """Reference species lookup: scan every species comparing names"""
+    for sid, species in get_catalog().species.items():
+        if species.name == species_name:
+            return sid
+    return None
+
+def benchmark_catalog(lookups: int = 100_000, reloads: int = 50, threads: int = 4) -> Dict[str, float]:
+    """Time species lookups and catalog reloads under concurrent view requests"""
+    from Catalog import CATALOG_PATH, reload_catalog
+
+    names = [species.name for species in get_catalog().by_cost]
+    start = time.perf_counter()
+    for i in range(lookups):
+        _legacy_find_species(names[i % len(names)])
+    scan_ns = (time.perf_counter() - start) / lookups * 1e9
+    start = time.perf_counter()
+    for i in range(lookups):
+        get_catalog().by_name.get(names[i % len(names)])
+    index_ns = (time.perf_counter() - start) / lookups * 1e9
+    print(f"🔎 Species by name | scan {scan_ns:>6.0f}ns | index {index_ns:>6.0f}ns | {scan_ns / index_ns:.0f}x")
+
+    # A rebalanced copy of the data file: every grow time doubled
+    with open(CATALOG_PATH, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    for entry in data['species']:
+        entry['grow_time'] *= 2
+    fd, rebalanced_path = tempfile.mkstemp(suffix='.json')
+    with os.fdopen(fd, 'w', encoding='utf-8') as f:
+        json.dump(data, f)
+
+    state = _full_garden(0, legacy=False)
+    stop = threading.Event()
+    latencies: List[float] = []
+    errors: List[Exception] = []
+
+    def reader():
+        while not stop.is_set():
+            begin = time.perf_counter()
+            try:
+                get_shop_data(state)
+                get_pots_data(state)
+            except Exception as e:
+                errors.append(e)
+            latencies.append(time.perf_counter() - begin)
+
+    workers = [threading.Thread(target=reader) for _ in range(threads)]
+    for worker in workers:
+        worker.start()
+    try:
+        reload_seconds = []
+        for i in range(reloads):
+            begin = time.perf_counter()
+            reload_catalog(rebalanced_path if i % 2 == 0 else CATALOG_PATH)
+            reload_seconds.append(time.perf_counter() - begin)
+            time.sleep(0.005)
+        reload_catalog(CATALOG_PATH)
+        grow_time = get_pots_data(state)[0]['grow_time']
+        reload_catalog(rebalanced_path)
+        doubled = get_pots_data(state)[0]['grow_time'] == 2 * grow_time
+    finally:
+        stop.set()
+        for worker in workers:
+            worker.join()
+        reload_catalog(CATALOG_PATH)
+        os.remove(rebalanced_path)
+
+    latencies.sort()
+    reload_seconds.sort()
+    print(f"📚 {reloads} reloads | median {reload_seconds[len(reload_seconds) // 2] * 1000:.2f}ms | "
+          f"views during reloads p50 {latencies[len(latencies) // 2] * 1e6:.0f}us "
+          f"p99 {latencies[int(len(latencies) * 0.99)] * 1e6:.0f}us ({len(latencies):,} requests)")
+    if errors:
+        raise SystemExit(f"❌ {len(errors)} view requests failed during reloads: {errors[0]!r}")
+    if not doubled:
+        raise SystemExit("❌ Cached pot views kept the old species data after a reload")
+    print("✅ Reloads swapped species atomically and refreshed cached views")
+    return {'scan_ns': scan_ns, 'index_ns': index_ns,
+            'reload_ms': reload_seconds[len(reload_seconds) // 2] * 1000}
+
+
+def benchmark_serialization(requests_per_route: int = 2_000, encodes: int = 20_000) -> List[Dict[str, float]]:
+    """Compare Flask's stdlib jsonify with the fast provider and gzip on /api/game-state and /api/buy-seed"""
+    from flask.json.provider import DefaultJSONProvider
+    from Run import app
+    from Serialize import FastJSONProvider, encode, gzip_bytes, orjson
+
+    session_id = 'serialization_player'
+    state = _full_garden(0, legacy=False)
+    session_store.put(session_id, state)
+    state.coins = 10 ** 12
+    for slot in state.shop.slots:
+        slot.stock = 10 ** 9
+    client = app.test_client()
+    client.set_cookie(SESSION_COOKIE_NAME, session_id)
+    print(f"🧾 Fast encoder: {'orjson' if orjson is not None else 'standard library (orjson not installed)'}")
+
+    routes = {
+        'game-state': lambda headers: client.get('/api/game-state', headers=headers),
+        'buy-seed': lambda headers: client.post('/api/buy-seed', json={'slot_index': 0, 'pot_index': -1}, headers=headers),
+    }
+    payloads = {
+        'game-state': {'coins': state.coins, 'shop': get_shop_data(state), 'pots': get_pots_data(state),
+                       'version': state.version, 'offline': None},
+        'buy-seed': {'success': True, 'coins': state.coins, 'shop': get_shop_data(state), 'pots': get_pots_data(state)},
+    }
+
+    results = []
+    original_provider = app.json
+    try:
+        for route, send in routes.items():
+            payload = payloads[route]
+            start = time.perf_counter()
+            for _ in range(encodes):
+                json.dumps(payload, sort_keys=True, separators=(',', ':'))
+            stdlib_us = (time.perf_counter() - start) / encodes * 1e6
+            start = time.perf_counter()
+            for _ in range(encodes):
+                encode(payload)
+            fast_us = (time.perf_counter() - start) / encodes * 1e6
+            body = encode(payload)
+
+            timings = {}
+            for name, provider, headers in (('jsonify', DefaultJSONProvider(app), {}),
+                                            ('fast', FastJSONProvider(app), {}),
+                                            ('fast+gzip', FastJSONProvider(app), {'Accept-Encoding': 'gzip'})):
+                app.json = provider
+                with contextlib.redirect_stdout(io.StringIO()):
+                    send(headers)
+                    start = time.perf_counter()
+                    for _ in range(requests_per_route):
+                        send(headers)
+                    timings[name] = (time.perf_counter() - start) / requests_per_route * 1e6
+
+            results.append({'route': route, 'stdlib_encode_us': stdlib_us, 'fast_encode_us': fast_us,
+                            'bytes': len(body), 'gzip_bytes': len(gzip_bytes(body)), **{f"{k}_us": v for k, v in timings.items()}})
+            print(f"📤 /api/{route:<10} | encode stdlib {stdlib_us:>6.1f}us fast {fast_us:>5.1f}us | "
+                  f"request jsonify {timings['jsonify']:>6.0f}us fast {timings['fast']:>6.0f}us gzip {timings['fast+gzip']:>6.0f}us | "
+                  f"{len(body):,}B -> {len(gzip_bytes(body)):,}B gzipped")
+    finally:
+        app.json = original_provider
+        session_store.remove(session_id)
+
+    # Both encoders must describe the same response
+    for route, payload in payloads.items():
+        if json.loads(encode(payload)) != json.loads(json.dumps(payload)):
+            raise SystemExit(f"❌ Fast encoder output differs for /api/{route}")
+    print("✅ Fast encoder output matches the standard library")
+    return results
+
+
+def benchmark_logging(calls: int = 50_000) -> Dict[str, float]:
+    """Per-call cost of a purchase debug line: print vs logging disabled, queued and sampled"""
+    purchase_log = get_logger('shop.purchase')
+    slot_index, pot_index, coins = 3, 7, 120
+
+    def run(fn) -> float:
+        start = time.perf_counter()
+        for _ in range(calls):
+            fn()
+        return (time.perf_counter() - start) / calls * 1e9
+
+    def legacy_print():
+        print(f"🛒 DEBUG: buy_seed called with slot_index={slot_index}, pot_index={pot_index}, coins={coins}")
+
+    def log_line():
+        purchase_log.debug("🛒 Purchase slot %s into pot %s (coins %s)", slot_index, pot_index, coins)
+
+    results = {}
+    sink = io.StringIO()
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            results['print_ns'] = run(legacy_print)
+
+        configure_logging(level='INFO', sample={}, handler=logging.StreamHandler(io.StringIO()), force=True)
+        results['disabled_ns'] = run(log_line)
+
+        # Bursts the listener can drain between, then one flood that overruns the queue
+        configure_logging(level='DEBUG', sample={}, handler=logging.StreamHandler(sink), force=True)
+        burst, elapsed = 1000, 0.0
+        for _ in range(calls // burst):
+            while Logs.pipeline.queue.qsize():
+                time.sleep(0.001)
+            start = time.perf_counter()
+            for _ in range(burst):
+                log_line()
+            elapsed += time.perf_counter() - start
+        results['queued_ns'] = elapsed / (calls // burst * burst) * 1e9
+        results['flood_ns'] = run(log_line)
+        queued = log_stats()
+
+        configure_logging(level='DEBUG', sample={'beanstock.shop': 0.01}, handler=logging.StreamHandler(io.StringIO()), force=True)
+        results['sampled_ns'] = run(log_line)
+        sampled = log_stats()
+
+        json_sink = io.StringIO()
+        configure_logging(level='DEBUG', json_lines=True, sample={}, handler=logging.StreamHandler(json_sink), force=True)
+        purchase_log.debug("🛒 Purchase slot %s into pot %s", slot_index, pot_index, extra={'coins': coins})
+        Logs.stop_logging()
+    finally:
+        configure_logging(level='WARNING', force=True)
+
+    print(f"🖨️  print to stdout        {results['print_ns']:>7.0f}ns per line")
+    print(f"🔇 logging disabled       {results['disabled_ns']:>7.0f}ns per line")
+    print(f"📥 logging queued         {results['queued_ns']:>7.0f}ns per line in bursts of {burst:,}")
+    print(f"🌊 logging flooded        {results['flood_ns']:>7.0f}ns per line "
+          f"({queued['enqueued']:,} enqueued in all, {queued['dropped']:,} dropped on a full queue)")
+    print(f"🎲 logging sampled at 1%  {results['sampled_ns']:>7.0f}ns per line "
+          f"({sampled['enqueued']:,} kept, {sampled['sampled_out']:,} sampled out)")
+
+    # Every queued line is written once the listener drains, and JSON lines carry extras
+    written = sink.getvalue().count('\n')
+    if written != queued['enqueued']:
+        raise SystemExit(f"❌ {queued['enqueued']} lines queued but {written} written")
+    entry = json.loads(json_sink.getvalue().splitlines()[0])
+    if entry['logger'] != 'beanstock.shop.purchase' or entry['level'] != 'DEBUG' or entry['coins'] != coins:
+        raise SystemExit(f"❌ Unexpected JSON log line: {entry}")
+    print(f"✅ {written:,} queued lines written, JSON lines parse with extra fields")
+    return results
+
+
+def benchmark_metrics(observations: int = 100_000, threads: int = 8, requests_per_route: int = 2_000) -> Dict[str, float]:
+    """Cost of recording a request, request overhead with metrics on, and totals across exiting threads"""
+    import Run
+    from Metrics import Metrics, NUM_BUCKETS, bucket_index, bucket_upper_us, render_prometheus
+
+    results = {}
+    registry = Metrics()
+    rng = random.Random(0)
+    latencies = [int(rng.lognormvariate(6.5, 1.0)) for _ in range(observations)]
+    start = time.perf_counter()
+    for us in latencies:
+        registry.observe_request('/api/game-state', 'GET', 200, us)
+    results['observe_ns'] = (time.perf_counter() - start) / observations * 1e9
+
+    # Bucketed percentiles stay within one bucket (25%) of the exact ones
+    hist = registry.totals().latency[('/api/game-state', 'GET')]
+    exact = sorted(latencies)
+    for q in (0.5, 0.95, 0.99):
+        target, seen = q * observations, 0
+        for index in range(NUM_BUCKETS):
+            seen += hist[index]
+            if seen >= target:
+                break
+        actual = exact[int(q * observations) - 1]
+        if not bucket_index(actual) - 1 <= index <= bucket_index(actual) + 1:
+            raise SystemExit(f"❌ p{q * 100:g} bucket up to {bucket_upper_us(index)}us but exact is {actual}us")
+        print(f"📏 p{q * 100:<4g} exact {actual:>6,}us | bucket up to {bucket_upper_us(index):>6,}us")
+
+    # Many short-lived threads, as with a thread-per-request server: nothing lost when they exit
+    registry = Metrics(max_live_shards=4)
+    per_thread = observations // (threads * 10)
+    def record():
+        for _ in range(per_thread):
+            registry.observe_request('/api/shop', 'GET', 200, 120)
+    for _ in range(10):
+        workers = [threading.Thread(target=record) for _ in range(threads)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+    totals = registry.totals()
+    recorded = totals.requests[('/api/shop', 'GET', 200)]
+    if recorded != per_thread * threads * 10 or sum(totals.latency[('/api/shop', 'GET')][:NUM_BUCKETS]) != recorded:
+        raise SystemExit(f"❌ Recorded {recorded} of {per_thread * threads * 10} requests across threads")
+    print(f"🧵 {threads * 10} short-lived threads: all {recorded:,} requests counted, {len(registry._shards)} live shards left")
+
+    # Whole requests through Flask with and without the metrics hook
+    session_id = 'metrics_player'
+    session_store.put(session_id, _full_garden(0, legacy=False))
+    client = Run.app.test_client()
+    client.set_cookie(SESSION_COOKIE_NAME, session_id)
+    original = Run.metrics
+    try:
+        # Alternate rounds and keep each side's best, since the difference is small next to the noise
+        rounds = 5
+        for _ in range(rounds):
+            for label, registry in (('off', None), ('on', original)):
+                Run.metrics = registry
+                start = time.perf_counter()
+                for _ in range(requests_per_route // rounds):
+                    client.get('/api/pots')
+                elapsed = (time.perf_counter() - start) / (requests_per_route // rounds) * 1e6
+                results[f"request_{label}_us"] = min(results.get(f"request_{label}_us", elapsed), elapsed)
+    finally:
+        Run.metrics = original
+        session_store.remove(session_id)
+
+    start = time.perf_counter()
+    body = render_prometheus()
+    results['render_ms'] = (time.perf_counter() - start) * 1000
+    print(f"⏱️  observe {results['observe_ns']:.0f}ns | /api/pots {results['request_off_us']:.0f}us without metrics, "
+          f"{results['request_on_us']:.0f}us with | scrape {results['render_ms']:.1f}ms for {body.count(chr(10)):,} lines")
+    return results
+
+
+def benchmark_profiler(requests_per_rate: int = 1_000) -> Dict[str, float]:
+    """/api/game-state request time with profiling off and at several sampling rates"""
+    import Run
+    from Profiler import collapsed_stacks
+
+    profiler = Run.profiler
+    session_id = 'profiler_player'
+    session_store.put(session_id, _full_garden(0, legacy=False))
+    client = Run.app.test_client()
+    client.set_cookie(SESSION_COOKIE_NAME, session_id)
+    results = {}
+    try:
+        for rate in (0.0, 0.01, 0.1, 1.0):
+            profiler.reset()
+            profiler.configure(rate=rate, header_trigger=False)
+            if rate == 0 and 'dispatch_request' in vars(Run.app):
+                raise SystemExit("❌ Profiler is still hooked into dispatch while off")
+            client.get('/api/game-state')
+            start = time.perf_counter()
+            for _ in range(requests_per_rate):
+                client.get('/api/game-state')
+            results[rate] = (time.perf_counter() - start) / requests_per_rate * 1e6
+            print(f"🔬 rate {rate:<5g} {results[rate]:>6.0f}us per request, "
+                  f"{sum(profiler.profiled.values()):>5,} profiled")
+        stats = profiler.stats('/api/game-state')
+    finally:
+        profiler.configure(rate=0.0, header_trigger=False)
+        session_store.remove(session_id)
+
+    # The collapsed stacks account for the profiled time
+    stack_us = sum(int(line.rsplit(' ', 1)[1]) for line in collapsed_stacks(stats).splitlines())
+    profiled_us = stats.total_tt * 1e6
+    print(f"🔥 Collapsed stacks cover {stack_us / profiled_us:.0%} of {profiled_us / 1000:.0f}ms profiled")
+    if not 0.9 <= stack_us / profiled_us <= 1.05:
+        raise SystemExit("❌ Collapsed stacks don't add up to the profiled time")
+    return results
+
+
+def benchmark_static(requests_per_file: int = 2_000) -> Dict[str, float]:
+    """Static file request time through send_from_directory and the cached layer, and repeat-visit bytes"""
+    import Run
+    from flask import send_from_directory
+    from Static import StaticFiles
+
+    files = [('js', 'main.js'), ('css', 'base.css'), ('Sound', 'coin.mp3'), ('Assets', 'pot.png')]
+    cached = StaticFiles()
+    results = {}
+    with Run.app.test_request_context('/'):
+        for directory, filename in files:
+            for name, send in (('send_from_directory', lambda: send_from_directory(directory, filename)),
+                               ('cached', lambda: cached.send(directory, filename))):
+                send().close()
+                start = time.perf_counter()
+                for _ in range(requests_per_file):
+                    response = send()
+                    b''.join(response.response)  # File wrappers are passed through, so read them directly
+                    response.close()
+                results[f"{filename} {name}"] = (time.perf_counter() - start) / requests_per_file * 1e6
+            print(f"📦 {filename:<10} {results[f'{filename} send_from_directory']:>6.1f}us send_from_directory, "
+                  f"{results[f'{filename} cached']:>6.1f}us cached")
+
+    # A second visit revalidates everything the first one downloaded
+    client = Run.app.test_client()
+    urls = ['/js/main.js', '/js/game-manager.js', '/css/base.css', '/Sound/coin.mp3', '/Assets/pot.png']
+    etags, first_bytes, second_bytes = {}, 0, 0
+    for url in urls:
+        response = client.get(url)
+        first_bytes += len(response.get_data())
+        etags[url] = response.headers['ETag']
+    for url in urls:
+        response = client.get(url, headers={'If-None-Match': etags[url]})
+        if response.status_code != 304:
+            raise SystemExit(f"❌ {url} answered a matching If-None-Match with {response.status_code}")
+        second_bytes += len(response.get_data())
+    results['first_visit_bytes'], results['repeat_visit_bytes'] = first_bytes, second_bytes
+    print(f"🔁 First visit {first_bytes:,} bytes, repeat visit {second_bytes:,} bytes (all 304)")
+    return results
+
+
+BENCHMARKS = {
+    'sessions': benchmark_sessions,
+    'stress': stress_transactions,
+    'xp-batch': benchmark_experience_batch,
+    'leveling': benchmark_leveling,
+    'pot-stats': benchmark_pot_stats,
+    'autosave': benchmark_autosave,
+    'sqlite': benchmark_sqlite,
+    'offline': benchmark_offline,
+    'shop-sampler': benchmark_shop_sampler,
+    'rarity': benchmark_rarity,
+    'memory': benchmark_memory,
+    'catalog': benchmark_catalog,
+    'serialize': benchmark_serialization,
+    'logging': benchmark_logging,
+    'metrics': benchmark_metrics,
+    'profiler': benchmark_profiler,
+    'static': benchmark_static,
+}
+
+if __name__ == "__main__":
+    configure_logging(level='WARNING')  # Keep the game's own logs out of the results
+    names = sys.argv[1:] or list(BENCHMARKS)
+    for name in names:
+        if name not in BENCHMARKS:
+            print(f"❌ Unknown benchmark '{name}'. Available: {', '.join(BENCHMARKS)}")
+            sys.exit(1)
+        print(f"\n⏱️  {name}")
+        BENCHMARKS[name]()
@@ -0,0 +1,158 @@
+"""
+Grow A Beanstock - Species Catalog
+Plant species loaded from plantdata.json and compiled into read-only indexes
+(by id, name, rarity and seed cost) plus the static halves of the shop and pot
+views. A reload builds a whole new catalog and swaps it in with one
+assignment, so a request sees either the old species or the new ones, never a
+mix, and nothing is rebuilt while requests wait.
+"""
+
+import hashlib
+import json
+import os
+import threading
+from collections.abc import Mapping
+from types import MappingProxyType
+from typing import Callable, Dict, Iterator, List, Optional
+
+CATALOG_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'plantdata.json')
+RARITIES = ('common', 'uncommon', 'rare', 'legendary', 'mythical', 'ultra_mythical', 'godly')
+PLANT_TYPES = ('picker', 'cutter')
+ASSET_KINDS = ('bean', 'seeds', 'vine')  # Files under Assets/BasicBeans, Assets/PlantSeeds and Assets/Vines
+
+
+class PlantSpecies:
+    """Defines a plant species with growth characteristics"""
+    def __init__(self, id: str, name: str, type: str, grow_time: int, base_sell: int, seed_cost: int,
+                 rarity: str = 'common', assets: Optional[Dict[str, str]] = None):
+        self.id = id
+        self.name = name
+        self.type = type  # 'picker' or 'cutter'
+        self.grow_time = grow_time  # seconds to first ready
+        self.base_sell = base_sell
+        self.seed_cost = seed_cost
+        self.rarity = rarity  # Rarity tier for shop spawn chances
+        self.assets = assets or {}  # Image filenames by asset kind
+
+
+class Catalog:
+    """One compiled, read-only snapshot of the species data"""
+    def __init__(self, species: List[PlantSpecies], generation: int = 0, source: Optional[str] = None):
+        self._validate(species)
+        self.generation = generation
+        self.source = source
+
+        self.species = MappingProxyType({s.id: s for s in species})
+        self.by_name = MappingProxyType({s.name: s for s in species})
+        self.by_rarity = MappingProxyType({r: tuple(s for s in species if s.rarity == r) for r in RARITIES})
+        self.by_cost = tuple(sorted(species, key=lambda s: s.seed_cost))
+
+        # Species fields of the shop and pot views, merged into each slot or pot as it is built
+        self.shop_fragments = MappingProxyType({s.id: {
+            'species_id': s.id,
+            'species_name': s.name,
+            'species_type': s.type,
+            'rarity': s.rarity,
+            'grow_time': s.grow_time,
+            'base_sell': s.base_sell
+        } for s in species})
+        self.pot_fragments = MappingProxyType({s.id: {
+            'species_name': s.name,
+            'species_type': s.type,
+            'grow_time': s.grow_time
+        } for s in species})
+
+        # The whole catalog for clients, encoded once
+        self.json = json.dumps({'generation': generation, 'species': [{
+            'id': s.id,
+            'name': s.name,
+            'type': s.type,
+            'grow_time': s.grow_time,
+            'base_sell': s.base_sell,
+            'seed_cost': s.seed_cost,
+            'rarity': s.rarity,
+            'assets': s.assets
+        } for s in species]}, separators=(',', ':')).encode('utf-8')
+        self.etag = hashlib.sha1(self.json).hexdigest()[:16]
+
+    @staticmethod
+    def _validate(species: List[PlantSpecies]):
+        """Reject data the game can't run with, before anything is swapped in"""
+        if not species:
+            raise ValueError("Catalog has no species")
+        ids, names = set(), set()
+        for s in species:
+            if s.id in ids or s.name in names:
+                raise ValueError(f"Duplicate species id or name: {s.id} / {s.name}")
+            ids.add(s.id)
+            names.add(s.name)
+            if s.rarity not in RARITIES:
+                raise ValueError(f"Unknown rarity '{s.rarity}' for {s.id}")
+            if s.type not in PLANT_TYPES:
+                raise ValueError(f"Unknown plant type '{s.type}' for {s.id}")
+            for field in ('grow_time', 'base_sell', 'seed_cost'):
+                value = getattr(s, field)
+                if isinstance(value, bool) or not isinstance(value, int) or value <= 0:
+                    raise ValueError(f"{field} for {s.id} must be a positive integer, got {value!r}")
+        if not any(s.rarity == 'common' for s in species):
+            raise ValueError("Catalog needs at least one common species for the shop")
+
+
+def load_catalog(path: str = CATALOG_PATH, generation: int = 0) -> Catalog:
+    """Read and compile a species data file"""
+    with open(path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    try:
+        species = [PlantSpecies(entry['id'], entry['name'], entry['type'], entry['grow_time'],
+                                entry['base_sell'], entry['seed_cost'], entry['rarity'],
+                                {kind: entry['assets'][kind] for kind in ASSET_KINDS if kind in entry.get('assets', {})})
+                   for entry in data['species']]
+    except (KeyError, TypeError) as e:
+        raise ValueError(f"Malformed species entry in {path}: {e}") from e
+    return Catalog(species, generation, path)
+
+
+# Current catalog; replaced whole by reload_catalog()
+_catalog: Catalog = load_catalog()
+_reload_lock = threading.Lock()
+
+# Called with the new catalog after each reload, on the reloading thread, to
+# rebuild anything derived from the species before a request has to
+catalog_hooks: List[Callable[[Catalog], None]] = []
+
+def get_catalog() -> Catalog:
+    """The current catalog; hold on to it for the length of one operation"""
+    return _catalog
+
+def reload_catalog(path: Optional[str] = None) -> Catalog:
+    """Load the data file again and swap the new catalog in.
+
+    Species can be added or rebalanced but not removed, since planted seeds
+    and saves still refer to them. On any error the current catalog stays.
+    """
+    global _catalog
+    with _reload_lock:
+        current = _catalog
+        catalog = load_catalog(path or current.source or CATALOG_PATH, current.generation + 1)
+        removed = set(current.species) - set(catalog.species)
+        if removed:
+            raise ValueError(f"Reload would remove species still in use: {', '.join(sorted(removed))}")
+        _catalog = catalog
+        for hook in catalog_hooks:
+            hook(catalog)
+        return catalog
+
+
+class CurrentSpecies(Mapping):
+    """Species by id from whichever catalog is current, for code that keeps a reference to it"""
+    def __getitem__(self, species_id: str) -> PlantSpecies:
+        return _catalog.species[species_id]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(_catalog.species)
+
+    def __len__(self) -> int:
+        return len(_catalog.species)
+
+    def __repr__(self) -> str:
+        return f"CurrentSpecies(generation={_catalog.generation}, species={len(self)})"
@@ -0,0 +1,218 @@
+"""
+Grow A Beanstock - Server-Sent Events
+Pushes shop refreshes, plants becoming ready and level-ups to browsers the
+moment they happen. Every stream is served from one asyncio event loop, so an
+open but idle stream costs a socket and a small queue instead of a thread.
+"""
+
+import asyncio
+import json
+import threading
+import time
+from http.cookies import CookieError, SimpleCookie
+from typing import Any, Dict, Optional, Set
+from urllib.parse import urlsplit
+
+from Setup import session_store, event_hooks, is_valid_session_id, SESSION_COOKIE_NAME
+
+HEARTBEAT_SECONDS = 15  # Comment line sent on idle streams so proxies keep them open
+MAX_QUEUED_EVENTS = 100  # Per stream; a client this far behind misses old events
+MIN_WAKE_DELAY = 0.05  # Never re-arm a player's timer tighter than this
+
+
+class EventStreamServer:
+    """Asyncio SSE server with one subscriber queue per open stream.
+
+    Request threads publish through event_hooks; the loop fans events out to
+    the player's streams. Each subscribed player also gets a single timer armed
+    for their next shop refresh or ripening plant, so time-driven events fire
+    without anyone polling.
+    """
+    def __init__(self, host: str = '0.0.0.0', port: int = 5001, page_port: Optional[int] = None):
+        self.host = host
+        self.port = port
+        self.page_port = page_port  # Port the Flask page is served on; only it may open streams cross-origin
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self._subscribers: Dict[str, Set[asyncio.Queue]] = {}
+        self._timers: Dict[str, asyncio.TimerHandle] = {}
+        self._started = threading.Event()
+
+    def start(self):
+        """Run the event loop in a background thread"""
+        thread = threading.Thread(target=self._run, daemon=True, name='event-stream')
+        thread.start()
+        self._started.wait(5)
+
+    def _run(self):
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_until_complete(asyncio.start_server(self._handle, self.host, self.port, backlog=1024))
+        event_hooks.append(self.publish)
+        self._started.set()
+        self.loop.run_forever()
+
+    @property
+    def stream_count(self) -> int:
+        return sum(len(queues) for queues in self._subscribers.values())
+
+    def is_streaming(self, session_id: str) -> bool:
+        """Whether the player has a stream open right now; safe to call from any thread"""
+        return session_id in self._subscribers
+
+    def publish(self, session_id: str, event: str, data: Dict[str, Any]):
+        """Hand an event to the loop; safe to call from any thread"""
+        if self.loop is None or session_id not in self._subscribers:
+            return
+        self.loop.call_soon_threadsafe(self._deliver, session_id, event, data)
+
+    def _deliver(self, session_id: str, event: str, data: Dict[str, Any]):
+        queues = self._subscribers.get(session_id)
+        if not queues:
+            return
+        message = f"event: {event}\ndata: {json.dumps(data)}\n\n".encode()
+        for queue in queues:
+            if queue.full():
+                queue.get_nowait()
+            queue.put_nowait(message)
+
+        # A planting or refresh may have moved the next deadline
+        self._schedule(session_id)
+
+    def _schedule(self, session_id: str):
+        """(Re)arm the wake-up for a player's next time-driven change"""
+        handle = self._timers.pop(session_id, None)
+        if handle is not None:
+            handle.cancel()
+
+        state = session_store.get(session_id)
+        if state is None or session_id not in self._subscribers:
+            return
+        # An open stream counts as activity, so the player isn't evicted from memory
+        # and the time they spend watching isn't credited again as time away
+        state.last_access = time.monotonic()
+        state.last_seen = time.time()
+        # Reading the deadline takes the player's threading lock, so do it off the loop
+        future = self.loop.run_in_executor(None, state.next_event_at)
+        future.add_done_callback(lambda done: self._arm(session_id, done))
+
+    def _arm(self, session_id: str, done: asyncio.Future):
+        """Set the player's timer for the deadline worked out in the executor"""
+        if done.cancelled() or done.exception() is not None or session_id not in self._subscribers:
+            return
+        handle = self._timers.pop(session_id, None)
+        if handle is not None:
+            handle.cancel()
+        delay = max(MIN_WAKE_DELAY, done.result() - time.time())
+        self._timers[session_id] = self.loop.call_later(delay, self._wake, session_id)
+
+    def _wake(self, session_id: str):
+        self._timers.pop(session_id, None)
+        state = session_store.get(session_id)
+        if state is None:
+            return
+        # Game state locks are threading locks, so advance the state off the loop
+        future = self.loop.run_in_executor(None, self._advance, state)
+        future.add_done_callback(lambda done: self._arm(session_id, done))
+
+    @staticmethod
+    def _advance(state) -> float:
+        """Fire whatever is due and return the next deadline"""
+        state.update_plants()
+        state.refresh_shop_if_due()
+        return state.next_event_at()
+
+    def _origin_allowed(self, origin: str, host: str) -> bool:
+        """Whether a cross-origin stream comes from the game page: same host name, the Flask port"""
+        if self.page_port is None:
+            return False
+        try:
+            page = urlsplit(origin)
+            port = page.port or (443 if page.scheme == 'https' else 80)
+            return (page.scheme in ('http', 'https') and port == self.page_port
+                    and page.hostname is not None and page.hostname == urlsplit('//' + host).hostname)
+        except ValueError:
+            return False
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        session_id = None
+        queue = None
+        try:
+            request_line = (await asyncio.wait_for(reader.readline(), 10)).decode('latin-1').split()
+            headers = {}
+            while True:
+                line = await asyncio.wait_for(reader.readline(), 10)
+                if line in (b'\r\n', b'\n', b''):
+                    break
+                name, _, value = line.decode('latin-1').partition(':')
+                headers[name.strip().lower()] = value.strip()
+
+            if len(request_line) < 2 or request_line[0] != 'GET' or not request_line[1].startswith('/events'):
+                writer.write(b'HTTP/1.1 404 Not Found\r\nContent-Length: 0\r\nConnection: close\r\n\r\n')
+                await writer.drain()
+                return
+
+            try:
+                morsel = SimpleCookie(headers.get('cookie', '')).get(SESSION_COOKIE_NAME)
+            except CookieError:
+                morsel = None
+            session_id = morsel.value if morsel else None
+            if not is_valid_session_id(session_id) or session_id not in session_store:
+                writer.write(b'HTTP/1.1 403 Forbidden\r\nContent-Length: 0\r\nConnection: close\r\n\r\n')
+                await writer.drain()
+                return
+
+            response = [
+                'HTTP/1.1 200 OK',
+                'Content-Type: text/event-stream',
+                'Cache-Control: no-cache',
+                'Connection: keep-alive',
+            ]
+            origin = headers.get('origin')
+            if origin and self._origin_allowed(origin, headers.get('host', '')):
+                # The page is served by Flask on another port, so allow it (and only it) to send its cookie
+                response.append(f'Access-Control-Allow-Origin: {origin}')
+                response.append('Access-Control-Allow-Credentials: true')
+            writer.write(('\r\n'.join(response) + '\r\n\r\nretry: 5000\n\n').encode('latin-1'))
+
+            queue = asyncio.Queue(MAX_QUEUED_EVENTS)
+            self._subscribers.setdefault(session_id, set()).add(queue)
+            if session_id not in self._timers:
+                self._schedule(session_id)
+
+            while True:
+                try:
+                    message = await asyncio.wait_for(queue.get(), HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    message = b': ping\n\n'
+                writer.write(message)
+                await writer.drain()
+        except (ConnectionError, asyncio.TimeoutError, asyncio.IncompleteReadError, UnicodeDecodeError):
+            pass
+        finally:
+            if queue is not None:
+                queues = self._subscribers.get(session_id)
+                if queues is not None:
+                    queues.discard(queue)
+                    if not queues:
+                        del self._subscribers[session_id]
+                        handle = self._timers.pop(session_id, None)
+                        if handle is not None:
+                            handle.cancel()
+                        # They were here until the stream closed, not just until their last request
+                        state = session_store.get(session_id)
+                        if state is not None:
+                            state.last_seen = time.time()
+            writer.close()
+
+
+# Global event stream server (started by Run.py)
+event_server: Optional[EventStreamServer] = None
+
+def start_event_stream(host: str = '0.0.0.0', port: int = 5001,
+                       page_port: Optional[int] = None) -> EventStreamServer:
+    """Start the SSE server once and return it"""
+    global event_server
+    if event_server is None:
+        event_server = EventStreamServer(host, port, page_port)
+        event_server.start()
+    return event_server
@@ -0,0 +1,561 @@
+"""
+Grow A Beanstock - Load Test
+Capacity test that plays thousands of simulated browser clients against the
+server at once, on asyncio. Each player follows what js/game-manager.js does:
+load /api/game-state (and /api/stream-info) on page load, revalidate /api/shop
+every 30 seconds, fill empty pots from the shop, refetch /api/pots when a
+plant should be ready, pick beans from ready plants, tick unlocked clippers
+every max(800, 2500 - 60 * level) ms, send the XP in batches (flushed after a
+second or at 100 events) and sync coins to /api/update-money a second after
+the last bean.
+
+The event stream runs on its own port and isn't opened; players time plant
+readiness themselves instead of waiting for it to push plant_ready.
+
+Runs against a server over HTTP (python Run.py, then --url) or against Run.py's
+app in this process through Flask's test client (--in-process). Latency is
+measured from when the client meant to send a request, so a server that falls
+behind shows up in the percentiles instead of quietly slowing the players
+down. Only requests due after the ramp-up are counted.
+
+Usage:
+    python LoadTest.py --url http://localhost:5000 --players 2000 --duration 120
+    python LoadTest.py --in-process --players 500 --duration 60 --speed 5
+    python LoadTest.py --url http://localhost:5000 --per-bean-xp --json results.json
+
+Exits with status 1 when the error rate is over --max-error-rate or the p99
+latency is over --max-p99-ms.
+"""
+
+import argparse
+import asyncio
+import gzip
+import heapq
+import json
+import random
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+from Catalog import get_catalog
+from Metrics import NUM_BUCKETS, bucket_index, bucket_upper_us
+
+SESSION_COOKIE_NAME = 'beanstock_session'
+SHOP_POLL_SECONDS = 30.0  # Fallback shop refresh in the client
+XP_FLUSH_SECONDS = 1.0  # Queued XP events are sent this long after the first one...
+XP_FLUSH_EVENTS = 100  # ...or as soon as this many are queued
+MONEY_SYNC_SECONDS = 1.0  # Coins are synced this long after the last earning
+BEAN_CHECK_SECONDS = (1.0, 2.0)  # Bean spawn checks run every 1-2 seconds per plant
+SHOP_VISIT_SECONDS = 20.0  # How often a player looks for a seed to put in an empty pot
+READY_RECHECK_SECONDS = 5.0  # Refetch pots again this long after a plant wasn't ready yet
+REQUEST_TIMEOUT = 30.0
+REPORT_EVERY = 10.0  # Seconds between progress lines
+
+Response = Tuple[int, Dict[str, str], bytes]
+
+
+def clipper_interval_ms(level: int) -> int:
+    """Clipper tick interval, as the client sets dataset.speed"""
+    return max(800, 2500 - level * 60)
+
+
+class RouteStats:
+    """Counts and a latency histogram (Metrics.py buckets) for one route"""
+    __slots__ = ('requests', 'errors', 'rejected', 'latency')
+
+    def __init__(self):
+        self.requests = 0
+        self.errors = 0  # 5xx responses and failed requests
+        self.rejected = 0  # 4xx responses
+        self.latency = [0] * (NUM_BUCKETS + 1)  # Bucket counts + total us
+
+    def record(self, status: int, duration_us: int):
+        self.requests += 1
+        if status >= 500 or status == 0:
+            self.errors += 1
+        elif status >= 400:
+            self.rejected += 1
+        self.latency[bucket_index(duration_us)] += 1
+        self.latency[NUM_BUCKETS] += duration_us
+
+    def percentile_us(self, fraction: float) -> int:
+        """Upper bound of the bucket holding this percentile (within 25% of the true value)"""
+        target = fraction * self.requests
+        seen = 0
+        for index in range(NUM_BUCKETS):
+            seen += self.latency[index]
+            if seen >= target and seen > 0:
+                return bucket_upper_us(index)
+        return 0
+
+    def merge(self, other: 'RouteStats'):
+        self.requests += other.requests
+        self.errors += other.errors
+        self.rejected += other.rejected
+        for i, count in enumerate(other.latency):
+            self.latency[i] += count
+
+    def summary(self, seconds: float) -> Dict[str, Any]:
+        return {
+            'requests': self.requests,
+            'per_second': round(self.requests / seconds, 1) if seconds > 0 else 0.0,
+            'p50_ms': self.percentile_us(0.50) / 1000,
+            'p95_ms': self.percentile_us(0.95) / 1000,
+            'p99_ms': self.percentile_us(0.99) / 1000,
+            'mean_ms': round(self.latency[NUM_BUCKETS] / self.requests / 1000, 3) if self.requests else 0.0,
+            'error_rate': round(self.errors / self.requests, 5) if self.requests else 0.0,
+            'rejected_rate': round(self.rejected / self.requests, 5) if self.requests else 0.0
+        }
+
+
+class LoadStats:
+    """Per-route stats for requests due after measure_from (a loop time)"""
+    def __init__(self):
+        self.routes: Dict[Tuple[str, str], RouteStats] = {}
+        self.failures: Dict[str, int] = {}  # Exceptions by type, for requests that got no response
+        self.measure_from = float('inf')
+        self.total_requests = 0  # Everything sent, ramp-up included, for progress lines
+
+    def record(self, method: str, path: str, status: int, due: float, finished: float):
+        self.total_requests += 1
+        if due < self.measure_from:
+            return
+        key = (method, path.partition('?')[0])
+        stats = self.routes.get(key)
+        if stats is None:
+            stats = self.routes[key] = RouteStats()
+        stats.record(status, int((finished - due) * 1e6))
+
+    def record_failure(self, error: BaseException):
+        name = type(error).__name__
+        self.failures[name] = self.failures.get(name, 0) + 1
+
+    def report(self, seconds: float) -> Dict[str, Any]:
+        total = RouteStats()
+        routes = {}
+        for (method, route), stats in sorted(self.routes.items(), key=lambda item: (item[0][1], item[0][0])):
+            routes[f"{method} {route}"] = stats.summary(seconds)
+            total.merge(stats)
+        return {'seconds': round(seconds, 1), 'total': total.summary(seconds), 'routes': routes, 'failures': self.failures}
+
+
+class HTTPTransport:
+    """HTTP/1.1 over asyncio streams, with a pool of keep-alive connections shared by every player"""
+    def __init__(self, url: str, connections: int):
+        parts = urlsplit(url)
+        if parts.scheme != 'http':
+            raise ValueError(f"only http:// URLs are supported, not {url!r}")
+        self.host = parts.hostname or 'localhost'
+        self.port = parts.port or 80
+        self.prefix = parts.path.rstrip('/')
+        self._slots = asyncio.Semaphore(connections)
+        self._idle: List[Tuple[asyncio.StreamReader, asyncio.StreamWriter]] = []
+
+    async def request(self, method: str, path: str, headers: Dict[str, str], body: Optional[bytes]) -> Response:
+        async with self._slots:
+            connection = self._idle.pop() if self._idle else await asyncio.open_connection(self.host, self.port)
+            try:
+                response, keep_alive = await asyncio.wait_for(self._exchange(connection, method, path, headers, body),
+                                                              REQUEST_TIMEOUT)
+            except BaseException:
+                connection[1].close()
+                raise
+            if keep_alive:
+                self._idle.append(connection)
+            else:
+                connection[1].close()
+            return response
+
+    async def _exchange(self, connection, method: str, path: str, headers: Dict[str, str],
+                        body: Optional[bytes]) -> Tuple[Response, bool]:
+        reader, writer = connection
+        lines = [f"{method} {self.prefix}{path} HTTP/1.1", f"Host: {self.host}:{self.port}"]
+        lines.extend(f"{name}: {value}" for name, value in headers.items())
+        if body is not None:
+            lines.append(f"Content-Length: {len(body)}")
+        writer.write(('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1') + (body or b''))
+
+        status_line = await reader.readline()
+        if not status_line:
+            raise ConnectionResetError("server closed the connection")
+        version, status = status_line.split(None, 2)[:2]
+        response_headers: Dict[str, str] = {}
+        while True:
+            line = await reader.readline()
+            if line in (b'\r\n', b'\n', b''):
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            response_headers[name.strip().lower()] = value.strip()
+
+        keep_alive = version == b'HTTP/1.1' and response_headers.get('connection', '').lower() != 'close'
+        status = int(status)
+        if method == 'HEAD' or status in (204, 304) or 100 <= status < 200:
+            data = b''
+        elif 'content-length' in response_headers:
+            data = await reader.readexactly(int(response_headers['content-length']))
+        elif response_headers.get('transfer-encoding', '').lower() == 'chunked':
+            chunks = []
+            while True:
+                size = int((await reader.readline()).split(b';')[0], 16)
+                if size == 0:
+                    await reader.readline()
+                    break
+                chunks.append(await reader.readexactly(size))
+                await reader.readline()
+            data = b''.join(chunks)
+        else:
+            data = await reader.read()
+            keep_alive = False
+        return (status, response_headers, data), keep_alive
+
+    async def close(self):
+        for _, writer in self._idle:
+            writer.close()
+        self._idle.clear()
+
+
+class InProcessTransport:
+    """Run.py's app through Flask's test client, on a thread pool so the event loop keeps going"""
+    def __init__(self, workers: int):
+        from Run import app
+        self.app = app
+        self._local = threading.local()
+        self._executor = ThreadPoolExecutor(workers, thread_name_prefix='loadtest')
+
+    def _call(self, method: str, path: str, headers: Dict[str, str], body: Optional[bytes]) -> Response:
+        client = getattr(self._local, 'client', None)
+        if client is None:
+            client = self._local.client = self.app.test_client(use_cookies=False)
+        response = client.open(path, method=method, headers=headers, data=body)
+        response_headers = {name.lower(): value for name, value in response.headers.items()}
+        return response.status_code, response_headers, response.get_data()
+
+    async def request(self, method: str, path: str, headers: Dict[str, str], body: Optional[bytes]) -> Response:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, self._call, method, path, headers, body)
+
+    async def close(self):
+        self._executor.shutdown(wait=True)
+
+
+class SimulatedPlayer:
+    """One browser tab playing the game; every timer the client runs is an entry in one heap"""
+    def __init__(self, number: int, transport, stats: LoadStats, options: argparse.Namespace):
+        self.number = number
+        self.transport = transport
+        self.stats = stats
+        self.options = options
+        self.speed = options.speed
+        self.rng = random.Random(options.seed * 1_000_003 + number)
+        self.loop = asyncio.get_running_loop()
+        self.cookie: Optional[str] = None
+        self.etags: Dict[str, str] = {}
+        self.coins = 0.0
+        self.pots: List[Dict[str, Any]] = []
+        self.shop: List[Dict[str, Any]] = []
+        self.timers: List[Tuple[float, int, Callable, tuple]] = []
+        self._timer_seq = 0
+        self.xp_queue: List[Dict[str, Any]] = []
+        self.xp_flush_due: Optional[float] = None
+        self.money_due: Optional[float] = None
+        self.ready_checks: Dict[int, float] = {}  # Pot index -> when its plant should be ready
+        self.clippers: Dict[int, int] = {}  # Pot index -> instance id with a ticking clipper
+
+    # Timers
+
+    def after(self, seconds: float, action: Callable, *args: Any, compressed: bool = True) -> float:
+        """Run action(due, *args) in `seconds` of client time (divided by --speed unless compressed=False)"""
+        due = self.loop.time() + (seconds / self.speed if compressed else seconds)
+        self._timer_seq += 1
+        heapq.heappush(self.timers, (due, self._timer_seq, action, args))
+        return due
+
+    async def run(self, start_in: float, stop_at: float):
+        await asyncio.sleep(start_in)
+        await self.page_load(self.loop.time())
+        while self.timers:
+            due, _, action, args = heapq.heappop(self.timers)
+            if due >= stop_at:
+                break
+            delay = due - self.loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            await action(due, *args)
+
+    # Requests
+
+    async def call(self, due: float, method: str, path: str, payload: Any = None) -> Optional[Tuple[int, Any]]:
+        """Send one request; returns (status, decoded JSON or None) or None if it failed outright"""
+        headers = {'Accept': 'application/json', 'Accept-Encoding': 'gzip'}
+        if self.cookie:
+            headers['Cookie'] = f"{SESSION_COOKIE_NAME}={self.cookie}"
+        etag_key = path if method == 'GET' else None
+        if etag_key in self.etags:
+            headers['If-None-Match'] = self.etags[etag_key]
+        body = None
+        if payload is not None:
+            headers['Content-Type'] = 'application/json'
+            body = json.dumps(payload, separators=(',', ':')).encode('utf-8')
+
+        try:
+            status, response_headers, data = await self.transport.request(method, path, headers, body)
+        except (OSError, asyncio.TimeoutError, ValueError, IndexError, asyncio.IncompleteReadError) as e:
+            self.stats.record_failure(e)
+            self.stats.record(method, path, 0, due, self.loop.time())
+            return None
+        self.stats.record(method, path, status, due, self.loop.time())
+
+        cookie = response_headers.get('set-cookie', '')
+        if cookie.startswith(SESSION_COOKIE_NAME + '='):
+            self.cookie = cookie.split(';', 1)[0].split('=', 1)[1]
+        if etag_key and 'etag' in response_headers:
+            self.etags[etag_key] = response_headers['etag']
+        if status == 304 or not data:
+            return status, None
+        if response_headers.get('content-encoding') == 'gzip':
+            data = gzip.decompress(data)
+        try:
+            return status, json.loads(data)
+        except ValueError:
+            return status, None
+
+    def take_pots(self, pots: Any):
+        if not isinstance(pots, list):
+            return
+        self.pots = pots
+        now_wall, now = time.time(), self.loop.time()
+        for pot in pots:
+            index = pot.get('index')
+            if pot.get('ready_state') == 'growing' and index not in self.ready_checks:
+                ready_in = max(0.0, pot.get('planted_at', now_wall) + pot.get('grow_time', 0) - now_wall)
+                self.ready_checks[index] = self.after(ready_in, self.plant_ready_check, index, compressed=False)
+            if pot.get('clipper_unlocked') and pot.get('instance_id') and index not in self.clippers:
+                self.clippers[index] = pot['instance_id']
+                self.after(clipper_interval_ms(pot.get('clipper_level') or 1) / 1000, self.clipper_tick, index)
+
+    def take_shop(self, shop: Any):
+        if isinstance(shop, dict) and isinstance(shop.get('slots'), list):
+            self.shop = shop['slots']
+
+    # What the client does
+
+    async def page_load(self, due: float):
+        result = await self.call(due, 'GET', '/api/game-state')
+        if result and isinstance(result[1], dict):
+            data = result[1]
+            self.coins = data.get('coins', 0)
+            self.take_shop(data.get('shop'))
+            self.take_pots(data.get('pots'))
+        await self.call(due, 'GET', '/api/stream-info')
+        if self.options.starting_coins and self.coins < self.options.starting_coins:
+            # Stand-in for an established player's bank, so gardens fill up quickly
+            self.coins = self.options.starting_coins
+            await self.call(due, 'POST', '/api/update-money', {'coins': self.coins})
+
+        self.after(SHOP_POLL_SECONDS, self.poll_shop)
+        self.after(self.rng.uniform(0, SHOP_VISIT_SECONDS), self.visit_shop)
+        for pot in self.pots:
+            self.after(self.rng.uniform(*BEAN_CHECK_SECONDS), self.bean_check, pot.get('index'))
+
+    async def poll_shop(self, due: float):
+        result = await self.call(due, 'GET', '/api/shop')
+        if result and result[1] is not None:
+            self.take_shop(result[1])
+        self.after(SHOP_POLL_SECONDS, self.poll_shop)
+
+    async def visit_shop(self, due: float):
+        empty = [pot['index'] for pot in self.pots if pot.get('state') == 'empty']
+        affordable = [i for i, slot in enumerate(self.shop) if slot.get('stock', 0) > 0 and slot.get('price', 0) <= self.coins]
+        if empty and affordable:
+            # Players go for the priciest seed they can afford
+            slot_index = max(affordable, key=lambda i: self.shop[i]['price'])
+            result = await self.call(due, 'POST', '/api/buy-seed', {'slot_index': slot_index, 'pot_index': empty[0]})
+            if result and isinstance(result[1], dict):
+                self.coins = result[1].get('coins', self.coins)
+                self.take_shop(result[1].get('shop'))
+                self.take_pots(result[1].get('pots'))
+        self.after(SHOP_VISIT_SECONDS, self.visit_shop)
+
+    async def plant_ready_check(self, due: float, index: int):
+        # What a plant_ready event would have prompted
+        self.ready_checks.pop(index, None)
+        result = await self.call(due, 'GET', '/api/pots')
+        if result and result[1] is not None:
+            self.take_pots(result[1])
+        pot = self.pots[index] if index < len(self.pots) else {}
+        if pot.get('ready_state') == 'growing' and index not in self.ready_checks:
+            self.ready_checks[index] = self.after(READY_RECHECK_SECONDS, self.plant_ready_check, index, compressed=False)
+
+    def ready_plant(self, index: int) -> Optional[Dict[str, Any]]:
+        pot = self.pots[index] if 0 <= index < len(self.pots) else None
+        if pot and pot.get('instance_id') and pot.get('ready_state') == 'ready':
+            return pot
+        return None
+
+    async def bean_check(self, due: float, index: int):
+        pot = self.ready_plant(index)
+        if pot is not None and self.rng.random() < self.options.attention:
+            await self.collect_bean(due, pot)
+        self.after(self.rng.uniform(*BEAN_CHECK_SECONDS), self.bean_check, index)
+
+    async def clipper_tick(self, due: float, index: int):
+        pot = self.ready_plant(index)
+        if pot is None or pot.get('instance_id') != self.clippers.get(index):
+            self.clippers.pop(index, None)
+            return
+        await self.collect_bean(due, pot)
+        await self.queue_xp(due, pot['instance_id'], 'clipper', 0.5)
+        self.after(clipper_interval_ms(pot.get('clipper_level') or 1) / 1000, self.clipper_tick, index)
+
+    async def collect_bean(self, due: float, pot: Dict[str, Any]):
+        # The client keeps its own table of bean values; the catalog has the same numbers
+        species = get_catalog().by_name.get(pot.get('species_name'))
+        value = species.base_sell if species else 10
+        self.coins += round(value * pot.get('multipliers', {}).get('money', 1.0))
+        await self.queue_xp(due, pot['instance_id'], 'plant', self.options.xp_scale)
+        self.money_due = self.after(MONEY_SYNC_SECONDS, self.sync_money)
+
+    async def queue_xp(self, due: float, instance_id: int, kind: str, xp_amount: float):
+        if self.options.per_bean_xp:
+            # Older clients posted every bean on its own
+            path = '/api/add-plant-experience' if kind == 'plant' else '/api/add-clipper-experience'
+            result = await self.call(due, 'POST', path, {'instance_id': instance_id, 'xp_amount': xp_amount})
+            if result and isinstance(result[1], dict) and (result[1].get('result') or {}).get('leveled_up'):
+                self.take_pots(result[1].get('pots'))
+            return
+        self.xp_queue.append({'instance_id': instance_id, 'kind': kind, 'xp_amount': xp_amount})
+        if len(self.xp_queue) >= XP_FLUSH_EVENTS:
+            await self.flush_xp(due)
+        elif self.xp_flush_due is None:
+            self.xp_flush_due = self.after(XP_FLUSH_SECONDS, self.flush_xp)
+
+    async def flush_xp(self, due: float):
+        self.xp_flush_due = None
+        events, self.xp_queue = self.xp_queue, []
+        if not events:
+            return
+        result = await self.call(due, 'POST', '/api/add-experience-batch', {'events': events})
+        if not result or not isinstance(result[1], dict):
+            return
+        # Patch pots in place from the results, as the client does
+        by_instance = {pot.get('instance_id'): pot for pot in self.pots if pot.get('instance_id')}
+        for item in result[1].get('results') or []:
+            pot = by_instance.get(item.get('instance_id'))
+            if pot is None:
+                continue
+            if item.get('kind') == 'plant':
+                pot['level'] = item.get('new_level', pot.get('level'))
+                pot['clipper_unlocked'] = item.get('clipper_unlocked', pot.get('clipper_unlocked'))
+                pot['clipper_level'] = item.get('clipper_level', pot.get('clipper_level'))
+            else:
+                pot['clipper_level'] = item.get('new_level', pot.get('clipper_level'))
+        self.take_pots(self.pots)
+
+    async def sync_money(self, due: float):
+        if due != self.money_due:
+            return  # A later earning pushed the sync back
+        self.money_due = None
+        await self.call(due, 'POST', '/api/update-money', {'coins': int(self.coins)})
+
+
+async def _progress(stats: LoadStats, stop_at: float, out):
+    loop = asyncio.get_running_loop()
+    last_count, last_time = 0, loop.time()
+    while loop.time() < stop_at:
+        await asyncio.sleep(min(REPORT_EVERY, max(0.0, stop_at - loop.time())))
+        now = loop.time()
+        phase = 'ramping' if now < stats.measure_from else 'measuring'
+        rate = (stats.total_requests - last_count) / max(now - last_time, 1e-9)
+        print(f"📈 {stats.total_requests:>9} requests, {rate:>7.0f}/s ({phase})", file=out)
+        last_count, last_time = stats.total_requests, now
+
+async def run_load(transport, options: argparse.Namespace, out=sys.stdout) -> Dict[str, Any]:
+    """Play options.players simulated clients for options.duration seconds; returns the report"""
+    loop = asyncio.get_running_loop()
+    stats = LoadStats()
+    start = loop.time()
+    stats.measure_from = start + options.ramp
+    stop_at = stats.measure_from + options.duration
+    players = [SimulatedPlayer(i, transport, stats, options) for i in range(options.players)]
+    tasks = [asyncio.ensure_future(player.run(options.ramp * i / max(1, options.players), stop_at))
+             for i, player in enumerate(players)]
+    tasks.append(asyncio.ensure_future(_progress(stats, stop_at, out)))
+    await asyncio.gather(*tasks)
+    await transport.close()
+    return stats.report(loop.time() - stats.measure_from)
+
+def print_report(report: Dict[str, Any], out=sys.stdout):
+    print(f"\n{'route':<40} {'req':>8} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'errors':>7} {'4xx':>7}", file=out)
+    rows = list(report['routes'].items()) + [('all routes', report['total'])]
+    for name, row in rows:
+        print(f"{name:<40} {row['requests']:>8} {row['per_second']:>8.1f} {row['p50_ms']:>8.2f} {row['p95_ms']:>8.2f} "
+              f"{row['p99_ms']:>8.2f} {row['error_rate']:>7.2%} {row['rejected_rate']:>7.2%}", file=out)
+    for name, count in sorted(report['failures'].items()):
+        print(f"❌ {count} request(s) failed with {name}", file=out)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Capacity test with simulated browser clients")
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument('--url', help="base URL of a running server, e.g. http://localhost:5000")
+    target.add_argument('--in-process', action='store_true', help="drive Run.py's app through Flask's test client")
+    parser.add_argument('--players', type=int, default=1000, help="simulated players")
+    parser.add_argument('--duration', type=float, default=60.0, help="seconds measured after the ramp-up")
+    parser.add_argument('--ramp', type=float, default=10.0, help="seconds over which players join")
+    parser.add_argument('--speed', type=float, default=1.0,
+                        help="run client timers this many times faster (plant growth stays real time)")
+    parser.add_argument('--attention', type=float, default=0.5, help="chance a player picks a ready bean on each check")
+    parser.add_argument('--starting-coins', type=int, default=5000,
+                        help="coins players sync on load if they have fewer (0 to start from scratch)")
+    parser.add_argument('--xp-scale', type=float, default=1.0, help="XP per picked bean, to reach clippers sooner")
+    parser.add_argument('--per-bean-xp', action='store_true', help="post XP per bean like older clients, not in batches")
+    parser.add_argument('--connections', type=int, default=100, help="HTTP keep-alive connections (with --url)")
+    parser.add_argument('--workers', type=int, default=8, help="request threads (with --in-process)")
+    parser.add_argument('--seed', type=int, default=1, help="random seed for player behaviour")
+    parser.add_argument('--json', metavar='PATH', help="write the report as JSON ('-' for stdout)")
+    parser.add_argument('--max-error-rate', type=float, default=0.01, help="fail the run above this error rate")
+    parser.add_argument('--max-p99-ms', type=float, help="fail the run if the overall p99 is above this")
+    args = parser.parse_args(argv)
+
+    out = sys.stderr if args.json == '-' else sys.stdout
+    if args.in_process:
+        from Logs import configure_logging
+        configure_logging(level='WARNING')
+        transport_factory = lambda: InProcessTransport(args.workers)
+        target_name = 'Run.py in-process'
+    else:
+        transport_factory = lambda: HTTPTransport(args.url, args.connections)
+        target_name = args.url
+    print(f"🚜 {args.players} players against {target_name}: {args.ramp:g}s ramp-up, "
+          f"{args.duration:g}s measured, timers at {args.speed:g}x", file=out)
+
+    async def run() -> Dict[str, Any]:
+        return await run_load(transport_factory(), args, out)
+    report = asyncio.run(run())
+    report['options'] = {key: value for key, value in vars(args).items() if key != 'json'}
+    print_report(report, out)
+
+    if args.json == '-':
+        print(json.dumps(report, indent=2))
+    elif args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+
+    total = report['total']
+    failed = False
+    if total['error_rate'] > args.max_error_rate:
+        print(f"❌ Error rate {total['error_rate']:.2%} is over {args.max_error_rate:.2%}", file=out)
+        failed = True
+    if args.max_p99_ms is not None and total['p99_ms'] > args.max_p99_ms:
+        print(f"❌ p99 latency {total['p99_ms']:.1f}ms is over {args.max_p99_ms:g}ms", file=out)
+        failed = True
+    if not failed:
+        print(f"✅ {total['requests']} requests at {total['per_second']:.0f}/s, p99 {total['p99_ms']:.1f}ms", file=out)
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,240 @@
+"""
+Grow A Beanstock - Logging
+Leveled, sampled, non-blocking logging for the game. A request thread only
+checks the level, rolls the sample and puts a small tuple on a queue; a
+background listener builds the log record, formats it (as text or JSON lines)
+and writes it out. A full queue drops records instead of stalling a request.
+
+Configured from the environment by configure_logging():
+    BEANSTOCK_LOG_LEVEL   DEBUG, INFO (default), WARNING, ...
+    BEANSTOCK_LOG_FORMAT  text (default) or json
+    BEANSTOCK_LOG_SAMPLE  per message type keep rates, e.g. "shop=0.01,xp=0.1"
+"""
+
+import atexit
+import json
+import logging
+import os
+import queue
+import random
+import sys
+import threading
+import time
+from typing import Any, Dict, Optional
+
+ROOT_LOGGER = 'beanstock'
+QUEUE_SIZE = 10000  # Records waiting to be written before new ones are dropped
+TEXT_FORMAT = '%(asctime)s %(levelname)-7s %(message)s'
+UNKNOWN_FILE = '(unknown file)'  # Callers aren't looked up; neither format uses them
+
+# Attributes every LogRecord has; anything else came in through `extra`
+_RECORD_FIELDS = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime'}
+
+
+class Sampler:
+    """Keep rates per message type; a type's rate applies to every logger below it,
+    so 'shop' also samples 'shop.purchase'"""
+    def __init__(self, rates: Dict[str, float]):
+        self.rates = rates
+        self._resolved: Dict[str, float] = {}
+        self.sampled_out = 0
+
+    def rate(self, name: str) -> float:
+        rate = self._resolved.get(name)
+        if rate is None:
+            rate, prefix = 1.0, name
+            while prefix:
+                if prefix in self.rates:
+                    rate = self.rates[prefix]
+                    break
+                prefix = prefix.rpartition('.')[0]
+            self._resolved[name] = rate
+        return rate
+
+    def keep(self, name: str) -> bool:
+        rate = self.rate(name)
+        if rate >= 1.0 or random.random() < rate:
+            return True
+        self.sampled_out += 1
+        return False
+
+def parse_sample_rates(spec: str) -> Dict[str, float]:
+    """Parse "shop=0.01,xp=0.1" into {'beanstock.shop': 0.01, 'beanstock.xp': 0.1}"""
+    rates = {}
+    for item in spec.split(','):
+        name, _, rate = item.partition('=')
+        if name.strip() and rate.strip():
+            rates[f"{ROOT_LOGGER}.{name.strip()}"] = min(1.0, max(0.0, float(rate)))
+    return rates
+
+
+class LogPipeline:
+    """Bounded queue of raw log calls and the listener thread that writes them"""
+    def __init__(self, handler: logging.Handler, sampler: Sampler, max_size: int = QUEUE_SIZE):
+        self.handler = handler
+        self.sampler = sampler
+        self.max_size = max_size
+        self.queue: queue.SimpleQueue = queue.SimpleQueue()
+        self.enqueued = 0
+        self.dropped = 0  # Counters are approximate under concurrent logging
+        self._thread: Optional[threading.Thread] = None
+
+    def submit(self, name: str, level: int, msg: Any, args: tuple, exc_info: Any, extra: Optional[Dict[str, Any]]):
+        """Everything a request thread pays for one enabled log call"""
+        if level < logging.WARNING and self.sampler.rates and not self.sampler.keep(name):
+            return
+        if self.queue.qsize() >= self.max_size:
+            self.dropped += 1
+            return
+        if exc_info:
+            if isinstance(exc_info, BaseException):
+                exc_info = (type(exc_info), exc_info, exc_info.__traceback__)
+            elif not isinstance(exc_info, tuple):
+                exc_info = sys.exc_info()
+        # Arguments are formatted later, so log immutable values (numbers, strings)
+        self.queue.put((time.time_ns(), threading.current_thread().name, name, level, msg, args, exc_info, extra))
+        self.enqueued += 1
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name='log-writer', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Write out whatever is queued and stop the listener"""
+        if self._thread is not None:
+            self.queue.put(None)
+            self._thread.join()
+            self._thread = None
+        self.handler.flush()
+
+    def _run(self):
+        while True:
+            item = self.queue.get()
+            if item is None:
+                return
+            created_ns, thread_name, name, level, msg, args, exc_info, extra = item
+            record = logging.LogRecord(name, level, UNKNOWN_FILE, 0, msg, args, exc_info)
+            record.created = created_ns / 1e9
+            record.msecs = (created_ns // 1_000_000) % 1000
+            record.threadName = thread_name
+            if extra:
+                record.__dict__.update(extra)
+            try:
+                if level >= self.handler.level:
+                    self.handler.handle(record)
+            except Exception:
+                self.handler.handleError(record)
+
+
+# Set up by configure_logging; None means game loggers behave like plain loggers
+pipeline: Optional[LogPipeline] = None
+
+class GameLogger(logging.Logger):
+    """Logger that hands enabled calls to the pipeline before any record is built"""
+    def _log(self, level, msg, args, exc_info=None, extra=None, stack_info=False, stacklevel=1):
+        current = pipeline
+        if current is None:
+            return super()._log(level, msg, args, exc_info, extra, stack_info, stacklevel)
+        current.submit(self.name, level, msg, args, exc_info, extra)
+
+# Game loggers live in their own hierarchy, so the GameLogger class and the
+# queue don't leak into Flask's or anyone else's logging
+_manager = logging.Manager(logging.RootLogger(logging.WARNING))
+_manager.root.manager = _manager
+_manager.setLoggerClass(GameLogger)
+
+def get_logger(name: str) -> logging.Logger:
+    """Logger for one module or message type, e.g. get_logger('shop') -> 'beanstock.shop'"""
+    return _manager.getLogger(f"{ROOT_LOGGER}.{name}")
+
+def get_logger_root() -> logging.Logger:
+    """The 'beanstock' logger every game logger sits under"""
+    return _manager.getLogger(ROOT_LOGGER)
+
+
+class JSONLinesFormatter(logging.Formatter):
+    """One JSON object per record, including any `extra` fields"""
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            'ts': round(record.created, 6),
+            'level': record.levelname,
+            'logger': record.name,
+            'msg': record.getMessage(),
+            'thread': record.threadName
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_FIELDS:
+                entry[key] = value
+        if record.exc_info:
+            entry['exc'] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class _StdoutHandler(logging.StreamHandler):
+    """Writes to whatever sys.stdout is when the record is written"""
+    @property
+    def stream(self):
+        return sys.stdout
+
+    @stream.setter
+    def stream(self, value):
+        pass
+
+
+_configure_lock = threading.Lock()
+
+def configure_logging(level: Optional[str] = None, json_lines: Optional[bool] = None,
+                      sample: Optional[Dict[str, float]] = None, handler: Optional[logging.Handler] = None,
+                      force: bool = False) -> logging.Logger:
+    """Route every game logger through the queue; arguments default to the environment.
+
+    Only the first call configures anything unless force is given, so the
+    server entry point and anything importing it can both call this.
+    """
+    global pipeline
+    with _configure_lock:
+        root = get_logger_root()
+        if pipeline is not None and not force:
+            return root
+        stop_logging()
+
+        level = (level or os.environ.get('BEANSTOCK_LOG_LEVEL', 'INFO')).upper()
+        if json_lines is None:
+            json_lines = os.environ.get('BEANSTOCK_LOG_FORMAT', 'text').lower() == 'json'
+        if sample is None:
+            sample = parse_sample_rates(os.environ.get('BEANSTOCK_LOG_SAMPLE', ''))
+
+        output = handler or _StdoutHandler()
+        if json_lines:
+            output.setFormatter(JSONLinesFormatter())
+        else:
+            output.setFormatter(logging.Formatter(TEXT_FORMAT, '%H:%M:%S'))
+
+        root.setLevel(level)
+        new_pipeline = LogPipeline(output, Sampler(sample))
+        new_pipeline.start()
+        pipeline = new_pipeline
+        return root
+
+def stop_logging():
+    """Write out whatever is queued; game loggers fall back to plain logging"""
+    global pipeline
+    current, pipeline = pipeline, None
+    if current is not None:
+        current.stop()
+
+atexit.register(stop_logging)
+
+def log_stats() -> Dict[str, Any]:
+    """Records enqueued, dropped on a full queue and sampled out"""
+    current = pipeline
+    if current is None:
+        return {'enabled': False}
+    return {
+        'enabled': True,
+        'level': logging.getLevelName(get_logger_root().level),
+        'enqueued': current.enqueued,
+        'dropped': current.dropped,
+        'sampled_out': current.sampler.sampled_out,
+        'queued': current.queue.qsize()
+    }
@@ -0,0 +1,202 @@
+"""
+Grow A Beanstock - Metrics
+Request counters, latency histograms and game gauges, served by Run.py at
+/api/metrics in the Prometheus text format.
+
+Every thread records into its own shard without taking a lock; a scrape adds
+the shards up and folds in those of threads that have exited. Latencies land
+in log-linear (HDR-style) buckets: four per doubling, so any bucket's bounds
+are within 25% of each other from 8us up to about a minute.
+"""
+
+import threading
+import time
+from collections import deque
+from typing import Any, Dict, List, Optional, Tuple
+
+from Setup import event_hooks, session_store
+
+SUB_BUCKET_BITS = 2  # 2**2 = 4 buckets per doubling
+MAX_LATENCY_US = (1 << 26) - 1  # ~67s; anything slower is counted in the last bucket
+FIRST_EXPORTED_BUCKET = 19  # Buckets below 64us are exported folded into the 64us one
+ACTIVE_PLAYER_SECONDS = 300  # Players seen this recently count as active
+EVENT_RATE_WINDOW = 60.0  # Seconds of scrapes the event rates are averaged over
+PROMETHEUS_CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def bucket_index(us: int) -> int:
+    """Histogram bucket for a latency in whole microseconds"""
+    if us > MAX_LATENCY_US:
+        us = MAX_LATENCY_US
+    shift = us.bit_length() - SUB_BUCKET_BITS - 1
+    if shift <= 0:
+        return us
+    return (shift << SUB_BUCKET_BITS) + (us >> shift)
+
+def bucket_upper_us(index: int) -> int:
+    """Largest whole-microsecond latency counted in a bucket"""
+    sub_buckets = 1 << SUB_BUCKET_BITS
+    if index < 2 * sub_buckets:
+        return index
+    shift = (index >> SUB_BUCKET_BITS) - 1
+    return (((index & (sub_buckets - 1)) + sub_buckets + 1) << shift) - 1
+
+NUM_BUCKETS = bucket_index(MAX_LATENCY_US) + 1
+
+
+class _Shard:
+    """One thread's counts; only that thread writes to it"""
+    __slots__ = ('thread', 'requests', 'latency', 'events')
+
+    def __init__(self, thread: Optional[threading.Thread]):
+        self.thread = thread
+        self.requests: Dict[Tuple[str, str, int], int] = {}  # (route, method, status) -> count
+        self.latency: Dict[Tuple[str, str], List[int]] = {}  # (route, method) -> bucket counts + total us
+        self.events: Dict[str, int] = {}
+
+    def merge(self, other: '_Shard'):
+        """Add another shard's counts into this one"""
+        for key, count in list(other.requests.items()):
+            self.requests[key] = self.requests.get(key, 0) + count
+        for key, hist in list(other.latency.items()):
+            mine = self.latency.setdefault(key, [0] * (NUM_BUCKETS + 1))
+            for i, count in enumerate(list(hist)):
+                mine[i] += count
+        for event, count in list(other.events.items()):
+            self.events[event] = self.events.get(event, 0) + count
+
+
+class Metrics:
+    """Registry of per-thread shards plus the totals of threads that have exited"""
+    def __init__(self, max_live_shards: int = 64):
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._shards: List[_Shard] = []
+        self._retired = _Shard(None)
+        self.max_live_shards = max_live_shards  # Sweep exited threads once there are this many shards
+        self.started_at = time.time()
+        self._event_history: deque = deque()  # (time, event totals) at recent scrapes
+
+    def _shard(self) -> _Shard:
+        shard = getattr(self._local, 'shard', None)
+        if shard is None:
+            shard = self._local.shard = _Shard(threading.current_thread())
+            with self._lock:
+                self._shards.append(shard)
+                if len(self._shards) > self.max_live_shards:
+                    self._sweep()
+        return shard
+
+    def _sweep(self):
+        """Fold the shards of exited threads into the retired totals; caller holds the lock"""
+        live = []
+        for shard in self._shards:
+            if shard.thread.is_alive():
+                live.append(shard)
+            else:
+                self._retired.merge(shard)
+        self._shards = live
+        self.max_live_shards = max(self.max_live_shards, 2 * len(live))
+
+    def observe_request(self, route: str, method: str, status: int, duration_us: int):
+        """Count one request and its latency"""
+        shard = self._shard()
+        key = (route, method, status)
+        shard.requests[key] = shard.requests.get(key, 0) + 1
+        hist = shard.latency.get((route, method))
+        if hist is None:
+            hist = shard.latency[(route, method)] = [0] * (NUM_BUCKETS + 1)
+        hist[bucket_index(duration_us)] += 1
+        hist[NUM_BUCKETS] += duration_us
+
+    def count_event(self, session_id: str, event: str, data: Dict[str, Any]):
+        """event_hooks callback counting committed game events by type"""
+        events = self._shard().events
+        events[event] = events.get(event, 0) + 1
+
+    def totals(self) -> _Shard:
+        """Everything recorded so far, summed over threads"""
+        with self._lock:
+            self._sweep()
+            shards = list(self._shards)
+            total = _Shard(None)
+            total.merge(self._retired)
+        for shard in shards:
+            total.merge(shard)
+        return total
+
+    def event_rates(self, events: Dict[str, int], now: float) -> Dict[str, float]:
+        """Events per second since the oldest scrape in the rate window"""
+        with self._lock:
+            history = self._event_history
+            history.append((now, dict(events)))
+            while len(history) > 2 and history[1][0] <= now - EVENT_RATE_WINDOW:
+                history.popleft()
+            then, previous = history[0]
+        if now - then <= 0:
+            return {event: 0.0 for event in events}
+        return {event: (count - previous.get(event, 0)) / (now - then) for event, count in events.items()}
+
+
+def _labels(**labels: Any) -> str:
+    """Prometheus label set, with backslashes, quotes and newlines escaped"""
+    pairs = []
+    for name, value in labels.items():
+        value = str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        pairs.append(f'{name}="{value}"')
+    return '{' + ','.join(pairs) + '}'
+
+def _game_gauges() -> Dict[str, float]:
+    """Player and plant counts, read without taking any player's lock"""
+    now = time.monotonic()
+    states = session_store.states()
+    return {
+        'players_in_memory': len(states),
+        'players_active': sum(1 for state in states if now - state.last_access <= ACTIVE_PLAYER_SECONDS),
+        'plant_instances': sum(len(state.plant_instances) for state in states)
+    }
+
+def render_prometheus(registry: Optional[Metrics] = None) -> str:
+    """All metrics in the Prometheus text exposition format"""
+    registry = registry or metrics
+    totals = registry.totals()
+    now = time.time()
+    lines = []
+
+    lines.append('# HELP beanstock_http_requests_total Requests handled, by route, method and status')
+    lines.append('# TYPE beanstock_http_requests_total counter')
+    for (route, method, status), count in sorted(totals.requests.items()):
+        lines.append(f"beanstock_http_requests_total{_labels(route=route, method=method, status=status)} {count}")
+
+    lines.append('# HELP beanstock_http_request_duration_seconds Request latency, by route and method')
+    lines.append('# TYPE beanstock_http_request_duration_seconds histogram')
+    for (route, method), hist in sorted(totals.latency.items()):
+        label = _labels(route=route, method=method)[:-1]
+        cumulative = sum(hist[:FIRST_EXPORTED_BUCKET])
+        for index in range(FIRST_EXPORTED_BUCKET, NUM_BUCKETS):
+            cumulative += hist[index]
+            lines.append(f'beanstock_http_request_duration_seconds_bucket{label},le="{(bucket_upper_us(index) + 1) / 1e6:g}"}} {cumulative}')
+        lines.append(f'beanstock_http_request_duration_seconds_bucket{label},le="+Inf"}} {cumulative}')
+        lines.append(f"beanstock_http_request_duration_seconds_sum{label}}} {hist[NUM_BUCKETS] / 1e6:.6f}")
+        lines.append(f"beanstock_http_request_duration_seconds_count{label}}} {cumulative}")
+
+    lines.append('# HELP beanstock_game_events_total Committed game events (level_up, shop_refresh, planted, plant_ready)')
+    lines.append('# TYPE beanstock_game_events_total counter')
+    for event, count in sorted(totals.events.items()):
+        lines.append(f"beanstock_game_events_total{_labels(event=event)} {count}")
+    lines.append(f'# HELP beanstock_game_events_per_second Game events per second over the last {EVENT_RATE_WINDOW:g}s of scrapes')
+    lines.append('# TYPE beanstock_game_events_per_second gauge')
+    for event, rate in sorted(registry.event_rates(totals.events, now).items()):
+        lines.append(f"beanstock_game_events_per_second{_labels(event=event)} {rate:.3f}")
+
+    for name, value in _game_gauges().items():
+        lines.append(f'# TYPE beanstock_{name} gauge')
+        lines.append(f"beanstock_{name} {value}")
+    lines.append('# TYPE beanstock_uptime_seconds gauge')
+    lines.append(f"beanstock_uptime_seconds {now - registry.started_at:.0f}")
+    return '\n'.join(lines) + '\n'
+
+
+# Global metrics registry, fed by Run.py's request hooks and by game events
+metrics = Metrics()
+event_hooks.append(metrics.count_event)
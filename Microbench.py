@@ -0,0 +1,416 @@
+"""
+Grow A Beanstock - Microbenchmarks
+Repeatable timings of the Setup.py hot paths across garden sizes and player
+counts, written as JSON and compared against a stored baseline so a slowdown
+shows up before it ships.
+
+Each case is calibrated to run for a fixed time per repeat, then repeated with
+the garbage collector paused; the median repeat is the result and the spread
+between the quartiles says how much to trust it. Cases that need fresh state
+on every call (a huge XP grant, plants all coming due) time their reset on its
+own and subtract it. A fixed reference workload is timed next to every case,
+and runs are compared relative to it, so a machine that is busier or slower
+today doesn't read as a regression.
+
+Usage:
+    python Microbench.py                        # run everything, compare with the baseline
+    python Microbench.py --filter pots          # only cases whose name contains "pots"
+    python Microbench.py --json results.json    # also write the results ('-' for stdout)
+    python Microbench.py --save-baseline        # make this run the new baseline
+    python Microbench.py --quick                # fewer, shorter repeats for a smoke test
+
+Exits with status 1 when any case is slower than the baseline by more than
+--threshold (default 25%) in every repeat. Baselines are only comparable on the machine that
+recorded them, so record a fresh one after moving to new hardware.
+"""
+
+import argparse
+import contextlib
+import gc
+import io
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from Catalog import get_catalog
+from Logs import configure_logging
+from Setup import GameState, PlantInstance, Pot, get_pots_data, get_shop_data, np
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'microbench_baseline.json')
+REPEATS = 11
+REPEAT_SECONDS = 0.025  # Target duration of one repeat
+QUICK_REPEATS = 3
+QUICK_REPEAT_SECONDS = 0.005
+REGRESSION_THRESHOLD = 0.25
+NOISY_SPREAD = 0.10  # Interquartile range above this fraction of the median marks a result as noisy
+
+Step = Callable[[], Any]
+
+
+def make_player(seed: int, pots: int = 12) -> GameState:
+    """A seeded player with `pots` pots, all planted, plants at assorted levels"""
+    state = GameState(seed=seed)
+    if pots != len(state.pots):
+        state.pots = [Pot(i) for i in range(pots)]
+        state.pot_versions = [0] * pots
+    species_ids = list(get_catalog().species)
+    now = time.time()
+    for pot in state.pots:
+        instance_id = state.allocate_instance_id()
+        instance = PlantInstance(species_ids[(seed + pot.index) % len(species_ids)], now, state.generate_rarity())
+        instance.level = 1 + (seed * 7 + pot.index * 13) % 300
+        state.plant_instances[instance_id] = instance
+        pot.state = 'growing'
+        pot.instance_id = instance_id
+    state.rebuild_ready_queue()
+    return state
+
+def _cycle(players: List[GameState]) -> Callable[[], GameState]:
+    """Round-robin over the players, so more players means a colder cache"""
+    index = [0]
+    count = len(players)
+    def next_player() -> GameState:
+        index[0] = (index[0] + 1) % count
+        return players[index[0]]
+    return next_player
+
+def _first_instance(state: GameState) -> int:
+    return next(iter(state.plant_instances))
+
+
+# Each case builds (step, reset) for a list of players; reset may be None
+def case_refresh_shop(players):
+    next_player = _cycle(players)
+    def step():
+        state = next_player()
+        state.shop.refresh_shop(state.rolls)
+    return step, None
+
+def case_generate_rarity(players):
+    next_player = _cycle(players)
+    return lambda: next_player().generate_rarity(), None
+
+def case_add_plant_experience_small(players):
+    next_player = _cycle(players)
+    targets = {id(state): _first_instance(state) for state in players}
+    def step():
+        state = next_player()
+        state.add_plant_experience(targets[id(state)], 1)
+    return step, None
+
+def case_add_plant_experience_huge(players):
+    next_player = _cycle(players)
+    targets = {id(state): _first_instance(state) for state in players}
+    current = [players[0]]
+    def reset():
+        state = current[0] = next_player()
+        instance = state.plant_instances[targets[id(state)]]
+        instance.level, instance.experience, instance.clipper_unlocked = 1, 0, False
+    def step():
+        reset()
+        state = current[0]
+        state.add_plant_experience(targets[id(state)], 10 ** 15)  # Hundreds of levels in one grant
+    return step, reset
+
+def case_add_clipper_experience(players):
+    next_player = _cycle(players)
+    targets = {id(state): _first_instance(state) for state in players}
+    current = [players[0]]
+    def reset():
+        state = current[0] = next_player()
+        instance = state.plant_instances[targets[id(state)]]
+        # Clippers don't survive a save, so unlock them here rather than in make_player
+        instance.clipper_unlocked, instance.clipper_level, instance.clipper_experience = True, 1, 0
+    def step():
+        reset()
+        state = current[0]
+        state.add_clipper_experience(targets[id(state)], 2000)  # A few clipper levels
+    return step, reset
+
+def case_get_plant_level_multipliers(players):
+    next_player = _cycle(players)
+    instance_ids = {id(state): list(state.plant_instances) for state in players}
+    def step():
+        state = next_player()
+        for instance_id in instance_ids[id(state)]:
+            state.get_plant_level_multipliers(instance_id)
+    return step, None
+
+def case_update_plants_none_due(players):
+    next_player = _cycle(players)
+    return lambda: next_player().update_plants(), None
+
+def case_update_plants_all_due(players):
+    next_player = _cycle(players)
+    current = [players[0]]
+    def reset():
+        state = current[0] = next_player()
+        for pot in state.pots:
+            pot.state = 'growing'
+            instance = state.plant_instances[pot.instance_id]
+            instance.ready_state = 'growing'
+            instance.planted_at = 0
+        state.rebuild_ready_queue()
+    def step():
+        reset()
+        current[0].update_plants()
+    return step, reset
+
+def case_get_pots_data(players):
+    next_player = _cycle(players)
+    current = [players[0]]
+    def reset():
+        state = current[0] = next_player()
+        state.touch_all()  # Nothing cached: every pot view is rebuilt
+    def step():
+        reset()
+        get_pots_data(current[0])
+    return step, reset
+
+def case_get_pots_data_cached(players):
+    next_player = _cycle(players)
+    return lambda: get_pots_data(next_player()), None
+
+def case_get_shop_data(players):
+    next_player = _cycle(players)
+    current = [players[0]]
+    def reset():
+        state = current[0] = next_player()
+        state.touch_shop()
+    def step():
+        reset()
+        get_shop_data(current[0])
+    return step, reset
+
+def case_get_shop_data_cached(players):
+    next_player = _cycle(players)
+    return lambda: get_shop_data(next_player()), None
+
+def case_save_game(players):
+    next_player = _cycle(players)
+    return lambda: next_player().save_game(), None
+
+GARDENS = (12, 48, 192)
+PLAYER_COUNTS = (1, 1000)
+
+# name -> (case, garden sizes, player counts)
+CASES: Dict[str, Tuple[Callable, Tuple[int, ...], Tuple[int, ...]]] = {
+    'shop.refresh_shop': (case_refresh_shop, (12,), PLAYER_COUNTS),
+    'generate_rarity': (case_generate_rarity, (12,), PLAYER_COUNTS),
+    'add_plant_experience.small': (case_add_plant_experience_small, (12,), PLAYER_COUNTS),
+    'add_plant_experience.huge': (case_add_plant_experience_huge, (12,), PLAYER_COUNTS),
+    'add_clipper_experience': (case_add_clipper_experience, (12,), PLAYER_COUNTS),
+    'get_plant_level_multipliers': (case_get_plant_level_multipliers, GARDENS, (1, 100)),
+    'update_plants.none_due': (case_update_plants_none_due, GARDENS, PLAYER_COUNTS),
+    'update_plants.all_due': (case_update_plants_all_due, GARDENS, (1, 100)),
+    'get_pots_data': (case_get_pots_data, GARDENS, (1, 100)),
+    'get_pots_data.cached': (case_get_pots_data_cached, GARDENS, (1, 100)),
+    'get_shop_data': (case_get_shop_data, (12,), PLAYER_COUNTS),
+    'get_shop_data.cached': (case_get_shop_data_cached, (12,), PLAYER_COUNTS),
+    'save_game': (case_save_game, GARDENS, (1, 100)),
+}
+
+
+def reference_step() -> float:
+    """Fixed plain-Python work (dict, float and loop overhead) to measure the machine's speed by"""
+    values = {}
+    for i in range(64):
+        values[i] = i * 1.5
+    return sum(values.values())
+
+def _time_loop(fn: Step, iterations: int) -> int:
+    start = time.perf_counter_ns()
+    for _ in range(iterations):
+        fn()
+    return time.perf_counter_ns() - start
+
+def _calibrate(fn: Step, seconds: float) -> int:
+    """Iterations of fn that take about `seconds`"""
+    iterations = 1
+    while True:
+        elapsed = _time_loop(fn, iterations) / 1e9
+        if elapsed >= seconds / 5 or iterations >= 10_000_000:
+            return max(1, int(iterations * seconds / max(elapsed, 1e-9)))
+        iterations *= 10
+
+def summarize(samples: List[float], iterations: int) -> Dict[str, Any]:
+    """Median, fastest and interquartile spread of per-call timings"""
+    quartiles = statistics.quantiles(samples, n=4) if len(samples) >= 2 else [samples[0]] * 3
+    median = statistics.median(samples)
+    return {
+        'median_ns': round(median, 1),
+        'min_ns': round(min(samples), 1),
+        'iqr_ns': round(quartiles[2] - quartiles[0], 1),
+        'noisy': median > 0 and (quartiles[2] - quartiles[0]) / median > NOISY_SPREAD,
+        'iterations': iterations,
+        'repeats': len(samples)
+    }
+
+def run_suite(name_filter: str = '', repeats: int = REPEATS,
+              seconds: float = REPEAT_SECONDS) -> Tuple[Dict[str, Dict[str, Any]], float]:
+    """Time every case (whose name contains name_filter) over its garden sizes and player counts.
+
+    Repeats run in rounds, one repeat of every case per round, so a burst of
+    load on the machine spoils one sample of a few cases rather than every
+    sample of one. Returns the results and the reference workload's time.
+    """
+    prepared = []
+    populations: Dict[Tuple[int, int], List[GameState]] = {}
+    for name, (case, gardens, player_counts) in CASES.items():
+        if name_filter not in name:
+            continue
+        for pots in gardens:
+            for count in player_counts:
+                # Cases change plant levels and shops, so every case gets its own copy of the players
+                if (pots, count) not in populations:
+                    populations[(pots, count)] = [make_player(seed, pots) for seed in range(count)]
+                players = [GameState.from_save_data(state.save_data()) for state in populations[(pots, count)]]
+                step, reset = case(players)
+                _time_loop(step, count)  # One-off costs such as building level tables stay out of the results
+                prepared.append((f"{name}[pots={pots},players={count}]", step, reset, _calibrate(step, seconds)))
+    prepared.append(('reference', reference_step, None, _calibrate(reference_step, seconds)))
+
+    samples: Dict[str, List[float]] = {key: [] for key, _, _, _ in prepared}
+    reset_samples: Dict[str, List[float]] = {key: [] for key, _, reset, _ in prepared if reset is not None}
+    gc_was_enabled = gc.isenabled()
+    gc.collect()
+    gc.disable()
+    try:
+        for _ in range(repeats):
+            for key, step, reset, iterations in prepared:
+                samples[key].append(_time_loop(step, iterations) / iterations)
+                if reset is not None:
+                    reset_samples[key].append(_time_loop(reset, iterations) / iterations)
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+
+    results = {}
+    for key, _, reset, iterations in prepared:
+        if reset is not None:
+            # Subtracting the typical reset keeps its own noise out of each sample
+            reset_ns = statistics.median(reset_samples[key])
+            samples[key] = [max(sample - reset_ns, 0.0) for sample in samples[key]]
+        results[key] = summarize(samples[key], iterations)
+    reference = results.pop('reference')
+    return results, reference['median_ns']
+
+def metadata() -> Dict[str, Any]:
+    """Where and on what these numbers were measured"""
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__)), timeout=10).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        commit = ''
+    return {
+        'recorded_at': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+        'commit': commit or None,
+        'python': platform.python_version(),
+        'implementation': platform.python_implementation(),
+        'machine': platform.machine(),
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+        'numpy': np.__version__ if np is not None else None
+    }
+
+def compare(results: Dict[str, Dict[str, Any]], baseline: Dict[str, Dict[str, Any]],
+            threshold: float = REGRESSION_THRESHOLD, scale: float = 1.0) -> Dict[str, List[Tuple[str, float]]]:
+    """Cases slower or faster than the baseline by more than threshold, with their ratio.
+
+    The baseline is first scaled by how much slower the machine ran the
+    reference workload this time (scale). The medians then have
+    to move by more than the threshold, and the whole run has to move with
+    them: a regression's fastest repeat is slower than the baseline's median,
+    so one unlucky run isn't flagged.
+    """
+    changes: Dict[str, List[Tuple[str, float]]] = {'regressions': [], 'improvements': [], 'new': []}
+    for key, result in results.items():
+        before = baseline.get(key)
+        if before is None or not before.get('median_ns'):
+            changes['new'].append((key, 0.0))
+            continue
+        expected, expected_min = before['median_ns'] * scale, before['min_ns'] * scale
+        ratio = result['median_ns'] / expected
+        if ratio > 1 + threshold and result['min_ns'] > expected:
+            changes['regressions'].append((key, ratio))
+        elif ratio < 1 / (1 + threshold) and expected_min > result['median_ns']:
+            changes['improvements'].append((key, ratio))
+    return changes
+
+
+def _format_ns(ns: float) -> str:
+    if ns >= 1e6:
+        return f"{ns / 1e6:.2f}ms"
+    if ns >= 1e3:
+        return f"{ns / 1e3:.2f}us"
+    return f"{ns:.0f}ns"
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Microbenchmarks for the Setup.py hot paths")
+    parser.add_argument('--filter', default='', help="only run cases whose name contains this")
+    parser.add_argument('--json', metavar='PATH', help="write results as JSON ('-' for stdout)")
+    parser.add_argument('--baseline', default=BASELINE_PATH, help="baseline file to compare with")
+    parser.add_argument('--save-baseline', action='store_true', help="write this run to the baseline file")
+    parser.add_argument('--threshold', type=float, default=REGRESSION_THRESHOLD,
+                        help="slowdown fraction that counts as a regression")
+    parser.add_argument('--quick', action='store_true', help="fewer, shorter repeats")
+    args = parser.parse_args(argv)
+
+    configure_logging(level='WARNING')
+    quiet = args.json == '-'
+    out = sys.stderr if quiet else sys.stdout
+    baseline: Dict[str, Any] = {}
+    if os.path.exists(args.baseline) and not args.save_baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+
+    repeats, seconds = (QUICK_REPEATS, QUICK_REPEAT_SECONDS) if args.quick else (REPEATS, REPEAT_SECONDS)
+    with contextlib.redirect_stdout(io.StringIO()) if quiet else contextlib.nullcontext():
+        results, reference_ns = run_suite(args.filter, repeats, seconds)
+    document = {'meta': {**metadata(), 'reference_ns': reference_ns}, 'results': results}
+
+    before_reference = baseline.get('meta', {}).get('reference_ns')
+    scale = reference_ns / before_reference if before_reference else 1.0
+    baseline = baseline.get('results', {})
+    for key, result in results.items():
+        before = baseline.get(key)
+        versus = (f"{result['median_ns'] / (before['median_ns'] * scale):>6.2f}x baseline"
+                  if before and before.get('median_ns') else "      (new)")
+        noisy = ' noisy' if result['noisy'] else ''
+        print(f"⏱️  {key:<58} {_format_ns(result['median_ns']):>10} ±{_format_ns(result['iqr_ns']):>9} {versus}{noisy}", file=out)
+    if before_reference:
+        print(f"🖥️  Reference workload ran {scale:.2f}x as long as when the baseline was recorded", file=out)
+
+    if args.json == '-':
+        print(json.dumps(document, indent=2))
+    elif args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(document, f, indent=2)
+    if args.save_baseline:
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(document, f, indent=2)
+            f.write('\n')
+        print(f"💾 Baseline saved to {args.baseline}", file=out)
+        return 0
+    if not baseline:
+        print("ℹ️  No baseline to compare with; record one with --save-baseline", file=out)
+        return 0
+
+    changes = compare(results, baseline, args.threshold, scale)
+    for key, ratio in changes['improvements']:
+        print(f"🚀 {key} is {1 / ratio:.2f}x faster than the baseline", file=out)
+    for key, ratio in changes['regressions']:
+        print(f"🐢 {key} is {ratio:.2f}x slower than the baseline", file=out)
+    if changes['regressions']:
+        print(f"❌ {len(changes['regressions'])} regression(s) over {args.threshold:.0%}", file=out)
+        return 1
+    print(f"✅ No regressions over {args.threshold:.0%} against the baseline", file=out)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
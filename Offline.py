@@ -0,0 +1,191 @@
+"""
+Grow A Beanstock - Offline Progression
+Catches a garden up on the time its player was away. Beans only spawn in the
+browser, so instead of replaying its timers every plant's time away is split
+into a handful of segments (one per clipper level reached) and the expected
+beans, coins and clipper XP of each segment are worked out in closed form. A
+week away resolves as fast as a minute.
+"""
+
+import math
+import time
+from typing import Any, Dict, Optional
+
+from Catalog import get_catalog
+from Setup import (GameState, PlantSpecies, MAX_CLIPPER_LEVEL, CLIPPER_XP_REQUIRED,
+                   get_level_multipliers)
+
+OFFLINE_MIN_SECONDS = 300  # Shorter gaps are a player still playing; rare plants spawn minutes apart
+MAX_VINE_BEANS = 20  # Beans stop spawning once this many wait on a vine
+CLIPPER_XP_PER_BEAN = 0.5
+
+# Seconds between beans at spawn rate 1.0 (mirrors getSpawnIntervalForPlant in js/game-manager.js)
+SPAWN_BASE_INTERVALS = {
+    'common': 12.0,
+    'uncommon': 20.0,
+    'rare': 40.0,
+    'legendary': 80.0,
+    'mythical': 160.0,
+    'ultra_mythical': 320.0,
+    'godly': 600.0
+}
+
+# Base bean rolls before the plant's special_chance multiplier, and what each is worth
+SHINY_CHANCE = 0.015
+GOLDEN_CHANCE = 0.015
+BIG_CHANCE = 0.02
+MASSIVE_CHANCE = 0.005
+SHINY_VALUE = 3.0
+GOLDEN_VALUE = 6.0
+BIG_VALUE = 3.0
+MASSIVE_VALUE = 6.0
+
+# Plant XP for a hand-picked bean (mirrors collectBean); finish is checked before size
+PICK_XP = {'golden': 10, 'shiny': 6, 'massive': 8, 'big': 4, 'normal': 2}
+
+
+def spawn_rate(species: PlantSpecies, level: int) -> float:
+    """Beans per second a ready plant of this level grows"""
+    interval = SPAWN_BASE_INTERVALS.get(species.rarity, 8.0)
+    return get_level_multipliers(level)['spawn_rate'] / interval
+
+def bean_chances(special_chance: float) -> Dict[str, float]:
+    """Chance of each special bean roll at a plant's special_chance multiplier"""
+    shiny, golden = SHINY_CHANCE * special_chance, GOLDEN_CHANCE * special_chance
+    big, massive = BIG_CHANCE * special_chance, MASSIVE_CHANCE * special_chance
+
+    # A roll past 1.0 can't happen, so scale the chances back if they overflow
+    finish_total, size_total = shiny + golden, big + massive
+    if finish_total > 1:
+        shiny, golden = shiny / finish_total, golden / finish_total
+    if size_total > 1:
+        big, massive = big / size_total, massive / size_total
+    return {'shiny': shiny, 'golden': golden, 'big': big, 'massive': massive}
+
+def expected_bean_value(species: PlantSpecies, level: int) -> float:
+    """Average coins per bean, including the chance of shiny/golden and big/massive beans"""
+    multipliers = get_level_multipliers(level)
+    chances = bean_chances(multipliers['special_chance'])
+    finish = 1 + chances['shiny'] * (SHINY_VALUE - 1) + chances['golden'] * (GOLDEN_VALUE - 1)
+    size = 1 + chances['big'] * (BIG_VALUE - 1) + chances['massive'] * (MASSIVE_VALUE - 1)
+    return species.base_sell * multipliers['money'] * finish * size
+
+def expected_pick_xp(level: int) -> float:
+    """Average plant XP for a bean the player picks by hand"""
+    chances = bean_chances(get_level_multipliers(level)['special_chance'])
+    plain = 1 - chances['shiny'] - chances['golden']
+    size_xp = (chances['massive'] * PICK_XP['massive'] + chances['big'] * PICK_XP['big']
+               + (1 - chances['massive'] - chances['big']) * PICK_XP['normal'])
+    return chances['golden'] * PICK_XP['golden'] + chances['shiny'] * PICK_XP['shiny'] + plain * size_xp
+
+def clipper_interval(clipper_level: int) -> float:
+    """Seconds between clipper collections (mirrors createOrUpdateClipper)"""
+    return max(0.8, 2.5 - clipper_level * 0.06)
+
+def project_plant(species: PlantSpecies, level: int, seconds: float, clipper_level: int = 0,
+                  clipper_experience: float = 0, beans: float = 0) -> Dict[str, float]:
+    """Expected outcome of a ready plant left alone for some seconds.
+
+    Without a clipper beans just pile up on the vine. With one, it collects
+    min(clip_rate * t, beans + spawn_rate * t) beans; the clipper's level only
+    changes when its XP crosses a threshold, so the time is walked one clipper
+    level at a time rather than one tick at a time.
+    """
+    rate = spawn_rate(species, level)
+    if clipper_level <= 0:
+        return {'collected': 0.0, 'beans_waiting': min(MAX_VINE_BEANS, beans + rate * seconds),
+                'clipper_xp': 0.0, 'clipper_level': clipper_level}
+
+    collected = 0.0
+    remaining = seconds
+    level_xp = clipper_experience
+    while remaining > 0:
+        clip_rate = 1 / clipper_interval(clipper_level)
+
+        # Time until this segment's collections finish the current clipper level
+        if clipper_level < MAX_CLIPPER_LEVEL:
+            needed = max(0.0, (CLIPPER_XP_REQUIRED[clipper_level] - level_xp) / CLIPPER_XP_PER_BEAN)
+            to_level = max(needed / clip_rate, (needed - beans) / rate if rate > 0 else math.inf)
+        else:
+            to_level = math.inf
+
+        step = min(remaining, to_level)
+        picked = min(clip_rate * step, beans + rate * step)
+        beans = min(MAX_VINE_BEANS, max(0.0, beans + rate * step - picked))
+        collected += picked
+        remaining -= step
+        if step == to_level:
+            level_xp = 0.0
+            clipper_level += 1
+        else:
+            level_xp += picked * CLIPPER_XP_PER_BEAN
+
+    return {'collected': collected, 'beans_waiting': beans,
+            'clipper_xp': collected * CLIPPER_XP_PER_BEAN, 'clipper_level': clipper_level}
+
+def catch_up(state: GameState, now: Optional[float] = None) -> Optional[Dict[str, Any]]:
+    """Credit the player for time away since they were last seen.
+
+    Called when the page loads without an open event stream; other requests and
+    open streams only stamp last_seen. When the gap is short this only stamps it
+    too. Returns a report of what happened while away, or None.
+    """
+    now = time.time() if now is None else now
+
+    # Fast path without the lock: a stale read only delays catch-up to the next page load
+    if now - state.last_seen < OFFLINE_MIN_SECONDS:
+        state.last_seen = now
+        return None
+
+    with state.transaction():
+        away_since = state.last_seen
+        elapsed = now - away_since
+        state.last_seen = now
+        if elapsed < OFFLINE_MIN_SECONDS:
+            return None
+
+        state.update_plants()
+
+        coins = 0
+        plants = []
+        catalog = get_catalog()
+        for pot in state.pots:
+            instance = state.plant_instances.get(pot.instance_id) if pot.instance_id else None
+            if pot.state != 'ready' or instance is None:
+                continue
+            species = catalog.species.get(instance.species_id)
+            if species is None:
+                continue
+
+            # Plants that ripened while away only spawn from their ready time
+            seconds = now - max(away_since, instance.planted_at + species.grow_time)
+            if seconds <= 0:
+                continue
+            clipper_level = instance.clipper_level if instance.clipper_unlocked else 0
+            projection = project_plant(species, instance.level, seconds, clipper_level,
+                                       instance.clipper_experience)
+
+            earned = int(projection['collected'] * expected_bean_value(species, instance.level))
+            coins += earned
+            if projection['clipper_xp'] > 0:
+                state.add_clipper_experience(pot.instance_id, projection['clipper_xp'])
+            plants.append({
+                'pot_index': pot.index,
+                'instance_id': pot.instance_id,
+                'species_id': instance.species_id,
+                'seconds': seconds,
+                'beans_collected': int(projection['collected']),
+                'beans_waiting': int(projection['beans_waiting']),
+                'coins': earned,
+                'clipper_xp': projection['clipper_xp'],
+                'clipper_level': instance.clipper_level
+            })
+
+        if coins:
+            state.coins += coins
+            state.touch_coins()
+
+        report = {'away_seconds': elapsed, 'coins': coins, 'plants': plants}
+        state.offline_report = report
+        state.emit('offline_progress', report)
+        return report
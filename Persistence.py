@@ -0,0 +1,223 @@
+"""
+Grow A Beanstock - Persistence
+Incremental autosave for every player's garden. Game states mark themselves
+dirty when they change, a background thread writes only the dirty players on
+an interval (or sooner once enough have piled up), and startup restores
+everything that was saved (or, with a bounded session store, players are loaded
+on demand instead). Request threads only touch the disk to load cold players.
+"""
+
+import json
+import os
+import threading
+import time
+from collections import deque
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from Logs import get_logger
+from Setup import GameState, SessionStore, change_hooks, session_store
+
+SAVE_DIRECTORY = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'saves')
+FLUSH_INTERVAL = 5.0  # Seconds between flushes
+FLUSH_THRESHOLD = 500  # Flush early once this many players are dirty
+FLUSH_HISTORY = 120  # Flush records kept for stats
+
+log = get_logger('autosave')
+
+
+class JSONFileBackend:
+    """Stores each player as one JSON file, replaced atomically on write"""
+    def __init__(self, directory: str = SAVE_DIRECTORY):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, session_id: str) -> str:
+        return os.path.join(self.directory, f"{session_id}.json")
+
+    def save_many(self, saves: Dict[str, Dict[str, Any]]) -> int:
+        """Write several players' save data, returning bytes written"""
+        written = 0
+        for session_id, save_data in saves.items():
+            path = self._path(session_id)
+            temp_path = f"{path}.tmp"
+            data = json.dumps(save_data).encode('utf-8')
+            with open(temp_path, 'wb') as f:
+                f.write(data)
+            os.replace(temp_path, path)
+            written += len(data)
+        return written
+
+    def load(self, session_id: str) -> Optional[Dict[str, Any]]:
+        try:
+            with open(self._path(session_id), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def load_all(self) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        for filename in os.listdir(self.directory):
+            if filename.endswith('.json'):
+                session_id = filename[:-len('.json')]
+                save_data = self.load(session_id)
+                if save_data is not None:
+                    yield session_id, save_data
+
+
+class AutosaveManager:
+    """Tracks dirty players and flushes them to a storage backend in the background"""
+    def __init__(self, backend, store: SessionStore = session_store,
+                 interval: float = FLUSH_INTERVAL, threshold: int = FLUSH_THRESHOLD):
+        self.backend = backend
+        self.store = store
+        self.interval = interval
+        self.threshold = threshold
+        self._dirty: Dict[str, GameState] = {}
+        self._dirty_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._flush_lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._running = False
+        self.history: deque = deque(maxlen=FLUSH_HISTORY)
+        self.totals = {'flushes': 0, 'players': 0, 'bytes': 0, 'errors': 0}
+
+    def mark_dirty(self, state: GameState):
+        """Called from request threads; only records the player, never blocks on I/O"""
+        if state.session_id is None:
+            return
+        with self._dirty_lock:
+            self._dirty[state.session_id] = state
+            pending = len(self._dirty)
+        if pending >= self.threshold:
+            self._wake.set()
+
+    @property
+    def pending(self) -> int:
+        return len(self._dirty)
+
+    def load_state(self, session_id: str) -> Optional[GameState]:
+        """Session store loader: unsaved changes in memory win over what is in storage"""
+        with self._dirty_lock:
+            state = self._dirty.get(session_id)
+        if state is not None:
+            return state
+        try:
+            save_data = self.backend.load(session_id)
+            return GameState.from_save_data(save_data) if save_data is not None else None
+        except (ValueError, KeyError, TypeError) as e:
+            log.warning("⚠️ Could not load save for %s: %s", session_id, e)
+            return None
+
+    def restore(self) -> int:
+        """Load every saved player into the session store, returning how many were loaded"""
+        restored = 0
+        for session_id, save_data in self.backend.load_all():
+            try:
+                self.store.put(session_id, GameState.from_save_data(save_data))
+                restored += 1
+            except (ValueError, KeyError, TypeError) as e:
+                log.warning("⚠️ Could not restore save for %s: %s", session_id, e)
+        return restored
+
+    def flush(self) -> Dict[str, Any]:
+        """Write every dirty player now and record how long it took"""
+        with self._flush_lock:
+            with self._dirty_lock:
+                dirty, self._dirty = self._dirty, {}
+            if not dirty:
+                return {}
+
+            start = time.perf_counter()
+            saves = {}
+            for session_id, state in dirty.items():
+                # Serialize under the player's lock, but write outside it; dirty
+                # players are also the ones worth compacting
+                with state.lock:
+                    state.compact()
+                    saves[session_id] = state.save_data()
+                    state.dirty = False
+                    state.last_save = time.time()
+
+            try:
+                written = self.backend.save_many(saves)
+            except OSError as e:
+                # Put the players back so the next flush retries them
+                with self._dirty_lock:
+                    for session_id, state in dirty.items():
+                        self._dirty.setdefault(session_id, state)
+                self.totals['errors'] += 1
+                log.error("❌ Autosave failed: %s", e)
+                return {}
+
+            record = {
+                'at': time.time(),
+                'players': len(saves),
+                'bytes': written,
+                'seconds': time.perf_counter() - start
+            }
+            self.history.append(record)
+            self.totals['flushes'] += 1
+            self.totals['players'] += record['players']
+            self.totals['bytes'] += written
+            return record
+
+    def stats(self) -> Dict[str, Any]:
+        """Flush latency and bytes written, overall and for the recent window"""
+        recent: List[Dict[str, Any]] = list(self.history)
+        latencies = sorted(r['seconds'] for r in recent)
+        return {
+            'pending_players': self.pending,
+            'totals': dict(self.totals),
+            'recent_flushes': len(recent),
+            'recent_bytes_per_flush': sum(r['bytes'] for r in recent) / len(recent) if recent else 0,
+            'recent_max_flush_ms': latencies[-1] * 1000 if latencies else 0,
+            'recent_median_flush_ms': latencies[len(latencies) // 2] * 1000 if latencies else 0,
+        }
+
+    def start(self):
+        """Register for change notifications and start the flusher thread"""
+        if self._running:
+            return
+        self._running = True
+        change_hooks.append(self.mark_dirty)
+        self._thread = threading.Thread(target=self._run, daemon=True, name='autosave')
+        self._thread.start()
+
+    def stop(self):
+        """Stop the flusher and write whatever is still dirty"""
+        if not self._running:
+            return
+        self._running = False
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.interval + 5)
+        if self.mark_dirty in change_hooks:
+            change_hooks.remove(self.mark_dirty)
+        self.flush()
+
+    def _run(self):
+        while self._running:
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                self.totals['errors'] += 1
+                log.exception("❌ Autosave error: %s", e)
+
+
+# Global autosave manager (started by Run.py)
+autosave: Optional[AutosaveManager] = None
+
+def start_autosave(backend=None, preload: bool = True, **kwargs) -> AutosaveManager:
+    """Restore saved gardens (or load them on demand) and start autosaving"""
+    global autosave
+    if autosave is None:
+        autosave = AutosaveManager(backend or JSONFileBackend(), **kwargs)
+        if preload:
+            restored = autosave.restore()
+            log.info("💾 Restored %s saved garden(s)", restored)
+        else:
+            autosave.store.loader = autosave.load_state
+            log.info("💾 Loading saved gardens on demand")
+        autosave.start()
+    return autosave
@@ -0,0 +1,260 @@
+"""
+Grow A Beanstock - Request Profiler
+Opt-in cProfile sampling of request handling. When switched on, a fraction of
+requests (or those sent with the X-Beanstock-Profile header, if allowed) run
+their view function and the game calls it makes under cProfile. The profiles
+are added up per route and can be dumped as pstats or as flamegraph-compatible
+collapsed stacks.
+
+Nothing is hooked in while it is off: attaching replaces the app's
+dispatch_request only when a rate or the header trigger is set, and turning
+it off puts the original back.
+
+Configured from the environment when Run.py starts:
+    BEANSTOCK_PROFILE_RATE    fraction of requests to profile, e.g. 0.01 (default 0)
+    BEANSTOCK_PROFILE_HEADER  1 to profile requests carrying X-Beanstock-Profile: 1
+"""
+
+import cProfile
+import io
+import marshal
+import os
+import pstats
+import random
+import threading
+from collections import Counter, defaultdict
+from typing import Any, Dict, List, Optional
+
+PROFILE_HEADER = 'X-Beanstock-Profile'
+MAX_STACK_DEPTH = 64  # Deeper call paths are cut off in collapsed stacks
+MIN_STACK_US = 1  # Collapsed stack lines below this many microseconds are left out
+
+
+class RequestProfiler:
+    """Aggregated cProfile results of sampled requests, by route"""
+    def __init__(self, rate: float = 0.0, header_trigger: bool = False):
+        self.rate = rate
+        self.header_trigger = header_trigger
+        self.app = None
+        self._original_dispatch = None
+        self._busy = threading.Lock()  # cProfile profiles one request at a time
+        self._stats_lock = threading.Lock()
+        self._stats: Dict[str, pstats.Stats] = {}
+        self.profiled: Counter = Counter()  # Requests profiled per route
+        self.skipped_busy = 0  # Sampled while another request was being profiled
+
+    @property
+    def enabled(self) -> bool:
+        return self.rate > 0 or self.header_trigger
+
+    def attach(self, app):
+        """Hook into app's request dispatch if profiling is enabled"""
+        self.app = app
+        self._install()
+
+    def configure(self, rate: Optional[float] = None, header_trigger: Optional[bool] = None):
+        """Change the sampling rate or header trigger, hooking in or out as needed"""
+        if rate is not None:
+            self.rate = min(1.0, max(0.0, rate))
+        if header_trigger is not None:
+            self.header_trigger = header_trigger
+        self._install()
+
+    def _install(self):
+        if self.app is None:
+            return
+        if self.enabled and self._original_dispatch is None:
+            self._original_dispatch = self.app.dispatch_request
+            # An instance attribute shadows Flask.dispatch_request for this app only
+            self.app.dispatch_request = self._dispatch
+        elif not self.enabled and self._original_dispatch is not None:
+            del self.app.dispatch_request
+            self._original_dispatch = None
+
+    def _dispatch(self):
+        from flask import request
+        original = self._original_dispatch
+        if original is None:  # Turned off while this request was starting
+            return self.app.dispatch_request()
+        sampled = random.random() < self.rate or (self.header_trigger and request.headers.get(PROFILE_HEADER) == '1')
+        if not sampled:
+            return original()
+        if not self._busy.acquire(blocking=False):
+            self.skipped_busy += 1
+            return original()
+        try:
+            profile = cProfile.Profile()
+            try:
+                return profile.runcall(original)
+            finally:
+                route = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+                self._add(route, profile)
+        finally:
+            self._busy.release()
+
+    def _add(self, route: str, profile: cProfile.Profile):
+        with self._stats_lock:
+            stats = self._stats.get(route)
+            if stats is None:
+                self._stats[route] = pstats.Stats(profile)
+            else:
+                stats.add(profile)
+            self.profiled[route] += 1
+
+    def stats(self, route: Optional[str] = None) -> Optional[pstats.Stats]:
+        """Profiles added up for one route, or for every route; None if nothing was profiled"""
+        with self._stats_lock:
+            routes = [route] if route else list(self._stats)
+            combined = None
+            for name in routes:
+                stats = self._stats.get(name)
+                if stats is None:
+                    continue
+                if combined is None:
+                    combined = pstats.Stats(stream=io.StringIO())
+                combined.add(stats)
+            return combined
+
+    def reset(self):
+        """Forget every profile collected so far"""
+        with self._stats_lock:
+            self._stats.clear()
+            self.profiled.clear()
+            self.skipped_busy = 0
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            'enabled': self.enabled,
+            'rate': self.rate,
+            'header_trigger': self.header_trigger,
+            'profiled': dict(self.profiled),
+            'skipped_busy': self.skipped_busy
+        }
+
+
+# Sort orders pstats accepts by name ('cumulative', 'tottime', 'calls', ...)
+SORT_KEYS = frozenset(pstats.Stats.sort_arg_dict_default)
+
+def stats_text(stats: pstats.Stats, sort: str = 'cumulative', limit: int = 40) -> str:
+    """The usual pstats table, top `limit` functions by `sort`"""
+    stream = io.StringIO()
+    stats.stream = stream
+    stats.sort_stats(sort).print_stats(limit)
+    return stream.getvalue()
+
+def stats_bytes(stats: pstats.Stats) -> bytes:
+    """Stats in the marshal format pstats.Stats() and snakeviz load"""
+    return marshal.dumps(stats.stats)
+
+def _frame_label(func: tuple) -> str:
+    filename, line, name = func
+    if filename == '~':  # Built-ins have no file
+        label = name
+    else:
+        label = f"{os.path.basename(filename)}:{name}:{line}"
+    return label.replace(';', ',').replace(' ', '_')
+
+def _root_functions(raw: Dict[tuple, tuple], callees: Dict[tuple, Dict[tuple, tuple]]) -> List[tuple]:
+    """Functions to start walking from: one entry into each group of profiled code nothing else calls.
+
+    A recursive entry point lists itself (or the functions it recurses
+    through) as callers, so roots are found per strongly connected group of
+    the call graph rather than by looking for functions with no callers.
+    """
+    # Tarjan's algorithm, iteratively so deep call graphs don't hit the recursion limit
+    index: Dict[tuple, int] = {}
+    low: Dict[tuple, int] = {}
+    group_of: Dict[tuple, int] = {}
+    groups: List[List[tuple]] = []
+    stack: List[tuple] = []
+    on_stack: set = set()
+    for start in raw:
+        if start in index:
+            continue
+        work = [(start, iter(callees.get(start, ())))]
+        index[start] = low[start] = len(index)
+        stack.append(start)
+        on_stack.add(start)
+        while work:
+            func, children = work[-1]
+            for callee in children:
+                if callee not in index:
+                    index[callee] = low[callee] = len(index)
+                    stack.append(callee)
+                    on_stack.add(callee)
+                    work.append((callee, iter(callees.get(callee, ()))))
+                    break
+                if callee in on_stack:
+                    low[func] = min(low[func], index[callee])
+            else:
+                work.pop()
+                if work:
+                    low[work[-1][0]] = min(low[work[-1][0]], low[func])
+                if low[func] == index[func]:
+                    group = []
+                    while True:
+                        member = stack.pop()
+                        on_stack.discard(member)
+                        group_of[member] = len(groups)
+                        group.append(member)
+                        if member == func:
+                            break
+                    groups.append(group)
+
+    roots = []
+    for number, group in enumerate(groups):
+        if any(group_of.get(caller) not in (None, number) for func in group for caller in raw[func][4]):
+            continue  # Reached from other profiled code
+        # Enter the group where it was called from outside the profile, else where most time was spent
+        entries = [func for func in group if not raw[func][4] or any(caller not in raw for caller in raw[func][4])]
+        roots.extend(entries or [max(group, key=lambda func: raw[func][3])])
+    return roots
+
+def collapsed_stacks(stats: pstats.Stats) -> str:
+    """Flamegraph-compatible "frame;frame;frame microseconds" lines.
+
+    cProfile records caller/callee pairs rather than whole stacks, so each
+    path's time is estimated by splitting a function's time between its
+    callers in proportion to the time each caller spent in it. A function's
+    own time already includes its recursive calls, so those are folded into
+    the frame that is on the path instead of being walked again.
+    """
+    raw = stats.stats
+    callees: Dict[tuple, Dict[tuple, tuple]] = defaultdict(dict)
+    for func, (_, _, _, _, callers) in raw.items():
+        for caller, edge in callers.items():
+            if caller in raw:
+                callees[caller][func] = edge
+
+    lines: Counter = Counter()
+    def walk(func: tuple, path: List[str], on_path: set, share: float):
+        _, _, self_time, total_time, _ = raw[func]
+        path.append(_frame_label(func))
+        if len(path) >= MAX_STACK_DEPTH:
+            # Too deep to split any further; everything below is charged to this frame
+            frame_us = total_time * share * 1e6
+        else:
+            frame_us = self_time * share * 1e6
+            on_path.add(func)
+            for callee, edge in callees.get(func, {}).items():
+                if callee in on_path:
+                    continue  # Recursion: already counted in the callee's own time up the path
+                callee_us = edge[3] * share * 1e6
+                if callee_us >= MIN_STACK_US:
+                    walk(callee, path, on_path, share * edge[3] / raw[callee][3])
+                else:
+                    # Paths under a microsecond get no line of their own, which also keeps the walk from exploding
+                    frame_us += callee_us
+            on_path.discard(func)
+        if frame_us >= MIN_STACK_US:
+            lines[';'.join(path)] += frame_us
+        path.pop()
+
+    for root in _root_functions(raw, callees):
+        walk(root, [], set(), 1.0)
+    return ''.join(f"{stack} {round(us)}\n" for stack, us in sorted(lines.items()))
+
+
+# Global request profiler (attached to the app by Run.py)
+profiler = RequestProfiler(float(os.environ.get('BEANSTOCK_PROFILE_RATE', '0') or 0),
+                           os.environ.get('BEANSTOCK_PROFILE_HEADER', '') == '1')
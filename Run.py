@@ -1,19 +1,37 @@
-from flask import Flask, render_template, send_from_directory, jsonify, request
+from flask import Flask, render_template, send_from_directory, jsonify, request, g
+import functools
+import hmac
+import math
 import os
 import sys
 import threading
 import time
 sys.path.append('.')
 
+from Logs import configure_logging, get_logger, log_stats
+
+configure_logging()
+log = get_logger('server')
+purchase_log = get_logger('shop.purchase')
+money_log = get_logger('money')
+garden_log = get_logger('garden')
+xp_log = get_logger('xp')
+
 # Import with error handling for deployment
 try:
-    from Setup import get_game_state, get_shop_data, get_pots_data, initialize_game
+    from Setup import (get_game_state, get_shop_data, get_pots_data, initialize_game,
+                       resolve_session, get_state_etag, get_state_delta, parse_since, parse_instance_id,
+                       parse_xp_amount, SESSION_COOKIE_NAME, SESSION_MAX_AGE)
 except ImportError as e:
-    print(f"Import error: {e}")
+    log.error("Import error: %s", e)
     # Fallback functions for deployment issues
+    SESSION_COOKIE_NAME = 'beanstock_session'
+    SESSION_MAX_AGE = 60 * 60 * 24 * 365
     def get_game_state():
         return type('GameState', (), {"coins": 120, "pots": []})()
-    def get_shop_data():
+    def resolve_session(session_id):
+        return session_id, get_game_state(), False
+    def get_shop_data(state=None):
         return {
             "slots": [
                 {
@@ -43,19 +61,166 @@ except ImportError as e:
             ],
             "refresh_at": 0
         }
-    def get_pots_data():
+    def get_pots_data(state=None, since=-1):
         return []
+    def get_state_etag(state, part='all'):
+        return 'fallback'
+    def get_state_delta(state, since):
+        return None
+    def parse_since(state, since):
+        return None if since is None else -1
+    def parse_instance_id(value):
+        return value if isinstance(value, int) and not isinstance(value, bool) and value > 0 else None
+    def parse_xp_amount(value):
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            return None
+        return value if math.isfinite(value) and value >= 0 else None
     def initialize_game():
         pass
 
 app = Flask(__name__, template_folder='.', static_folder='.')
 
+# Faster JSON and gzip are optional; without them Flask's own jsonify is used uncompressed
+try:
+    from Serialize import FastJSONProvider, compress_response
+    app.json = FastJSONProvider(app)
+except ImportError:
+    def compress_response(response, request):
+        return response
+
+# Request metrics are optional; without them /api/metrics has nothing to report
+try:
+    from Metrics import PROMETHEUS_CONTENT_TYPE, metrics, render_prometheus
+except ImportError:
+    metrics = None
+
+# Request profiling is optional and off unless BEANSTOCK_PROFILE_RATE or BEANSTOCK_PROFILE_HEADER is set
+try:
+    from Profiler import collapsed_stacks, profiler, stats_bytes, stats_text, SORT_KEYS
+    profiler.attach(app)
+except ImportError:
+    profiler = None
+
+# Built asset variants are optional; without a build (python AssetPipeline.py) Assets/ is served as it is
+try:
+    from AssetPipeline import BUILD_DIR, get_asset_manifest
+except ImportError:
+    get_asset_manifest = None
+
+# Cached static serving is optional; without it files go through send_from_directory as they are
+try:
+    from Static import is_hashed_name, static_files
+    def send_static(directory, filename, mimetype=None, immutable=False):
+        return static_files.send(directory, filename, mimetype=mimetype, immutable=immutable)
+except ImportError:
+    static_files = None
+    def is_hashed_name(filename):
+        return False
+    def send_static(directory, filename, mimetype=None, immutable=False):
+        return send_from_directory(directory, filename, mimetype=mimetype)
+
+# Offline progression is optional; without it gardens just pause while players are away
+try:
+    from Offline import catch_up
+except ImportError:
+    def catch_up(state, now=None):
+        return None
+
+def has_open_stream(session_id):
+    """Whether the player is watching the game through an open event stream"""
+    try:
+        from Events import event_server
+    except ImportError:
+        return False
+    return event_server is not None and event_server.is_streaming(session_id)
+
+def get_player_state(page_load=False):
+    """Get the GameState belonging to the player making this request"""
+    if 'game_state' not in g:
+        session_id, state, is_new = resolve_session(request.cookies.get(SESSION_COOKIE_NAME))
+        g.session_id = session_id
+        g.game_state = state
+        g.new_session = is_new
+        
+        if page_load and not has_open_stream(session_id):
+            # Credit whatever the garden produced while the player was away
+            catch_up(state)
+        else:
+            # The browser is open and spawning its own beans, so this isn't time away
+            state.last_seen = time.time()
+    return g.game_state
+
+def not_modified(etag=None):
+    """Empty 304 response telling the client its copy is current"""
+    response = app.response_class(status=304)
+    if etag:
+        response.set_etag(etag)
+    return response
+
+def conditional_json(state, part, build, fresh=False):
+    """Serve build() as JSON with an ETag, or 304 if the client already has this version (and not fresh)"""
+    with state.lock:
+        etag = get_state_etag(state, part)
+        if not fresh and request.if_none_match.contains(etag):
+            return not_modified(etag)
+        response = jsonify(build())
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+# Admin endpoints need this token in an X-Beanstock-Admin-Token header; without one set
+# they only answer requests from this machine
+ADMIN_TOKEN = os.environ.get('BEANSTOCK_ADMIN_TOKEN', '')
+LOOPBACK_ADDRESSES = ('127.0.0.1', '::1')
+
+def admin_only(view):
+    """Refuse an admin endpoint to anyone without the admin token (or off this machine if there is none)"""
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        if ADMIN_TOKEN:
+            allowed = hmac.compare_digest(request.headers.get('X-Beanstock-Admin-Token', ''), ADMIN_TOKEN)
+        else:
+            allowed = request.remote_addr in LOOPBACK_ADDRESSES
+        if not allowed:
+            log.warning("🔒 Refused %s %s from %s", request.method, request.path, request.remote_addr)
+            return jsonify({'success': False, 'message': 'Admin access required'}), 403
+        return view(*args, **kwargs)
+    return wrapper
+
+@app.before_request
+def start_request_timer():
+    """Note when the request started, for its latency metric"""
+    g.request_started_ns = time.perf_counter_ns()
+
+# Registered before the other after_request hooks so it runs after them and times their work too
+@app.after_request
+def record_request_metrics(response):
+    """Count the request and its latency under its route pattern"""
+    if metrics is not None and 'request_started_ns' in g:
+        route = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+        metrics.observe_request(route, request.method, response.status_code,
+                                (time.perf_counter_ns() - g.request_started_ns) // 1000)
+    return response
+
+@app.after_request
+def set_session_cookie(response):
+    """Hand new players their session cookie"""
+    if g.get('new_session'):
+        response.set_cookie(SESSION_COOKIE_NAME, g.session_id, max_age=SESSION_MAX_AGE,
+                            httponly=True, samesite='Lax')
+    return response
+
+@app.after_request
+def compress(response):
+    """Gzip large JSON responses for clients that accept it"""
+    return compress_response(response, request)
+
 # Initialize game on server start with error handling
 try:
     initialize_game()
-    print("✅ Game initialized successfully")
+    log.info("✅ Game initialized successfully")
 except Exception as e:
-    print(f"❌ Game initialization error: {e}")
+    log.error("❌ Game initialization error: %s", e)
 
 @app.route('/')
 def index():
@@ -63,37 +228,82 @@ def index():
 
 @app.route('/Assets/<path:filename>')
 def assets(filename):
-    return send_from_directory('Assets', filename)
+    """Serve the smallest built variant the client accepts, or the original"""
+    if get_asset_manifest is not None:
+        manifest = get_asset_manifest()
+        variant = manifest.best_variant(filename, request.accept_mimetypes)
+        if variant is not None:
+            response = send_static(BUILD_DIR, variant['file'], mimetype=variant['mimetype'])
+            if manifest.has_alternatives(filename):
+                response.vary.add('Accept')
+            return response
+    return send_static('Assets', filename)
+
+@app.route('/build/assets/<path:filename>')
+def built_assets(filename):
+    """Built variants by their content-hashed names (see build/assets/manifest.json)"""
+    return send_static(BUILD_DIR, filename, immutable=is_hashed_name(filename))
+
+@app.route('/atlases/<name>')
+def atlas_image(name):
+    """A sprite family's atlas image (beans, seeds or vines), WebP when the client accepts it"""
+    variant = get_asset_manifest().best_atlas(name, request.accept_mimetypes) if get_asset_manifest else None
+    if variant is None:
+        return jsonify({'error': f'No atlas named {name!r}; build them with python AssetPipeline.py'}), 404
+    response = send_static(BUILD_DIR, variant['file'], mimetype=variant['mimetype'])
+    response.vary.add('Accept')
+    return response
+
+@app.route('/api/atlases')
+def api_atlases():
+    """Where each species' bean, seed and vine sprite sits in its family's atlas"""
+    atlases = get_asset_manifest().atlases if get_asset_manifest else {}
+    response = jsonify({name: {
+        'width': atlas['width'],
+        'height': atlas['height'],
+        'url': f"/atlases/{name}",
+        'files': {variant['mimetype']: f"/build/assets/{variant['file']}" for variant in atlas['variants']},
+        'sprites': atlas['sprites']
+    } for name, atlas in atlases.items()})
+    response.headers['Cache-Control'] = 'no-cache'
+    response.add_etag()
+    return response.make_conditional(request)
 
 @app.route('/Sound/<path:filename>')
 def sounds(filename):
-    return send_from_directory('Sound', filename)
+    return send_static('Sound', filename)
 
 @app.route('/css/<path:filename>')
 def css_files(filename):
-    return send_from_directory('css', filename)
+    return send_static('css', filename)
 
 @app.route('/js/<path:filename>')
 def js_files(filename):
-    return send_from_directory('js', filename)
+    return send_static('js', filename)
 
 # Legacy routes for backwards compatibility
 @app.route('/styles.css')
 def styles():
-    return send_from_directory('.', 'styles.css')
+    return send_static('.', 'styles.css')
 
 @app.route('/game.js')
 def game_js():
-    return send_from_directory('.', 'game.js')
+    return send_static('.', 'game.js')
 
 @app.route('/api/shop')
 def api_shop():
     try:
-        shop_data = get_shop_data()
-        print(f"✅ Shop data retrieved: {len(shop_data.get('slots', []))} items")
-        return jsonify(shop_data)
+        state = get_player_state()
+        since = parse_since(state, request.args.get('since'))
+        if since is not None:
+            # Delta request: nothing to send unless the shop changed after the client's version
+            with state.lock:
+                state.refresh_shop_if_due()
+                if state.shop_version <= since:
+                    return not_modified()
+        return conditional_json(state, 'shop', lambda: get_shop_data(state))
     except Exception as e:
-        print(f"❌ Shop data error: {e}")
+        log.exception("❌ Shop data error: %s", e)
         # Return fallback data with correct prices from user specifications
         return jsonify({
             "slots": [
@@ -165,20 +375,27 @@ def api_shop():
 @app.route('/api/pots')
 def api_pots():
     try:
-        pots_data = get_pots_data()
-        print(f"✅ Pots data retrieved: {len(pots_data)} pots")
-        return jsonify(pots_data)
+        state = get_player_state()
+        since = parse_since(state, request.args.get('since'))
+        if since is not None:
+            # Delta request: only pots changed after the client's version
+            pots_data = get_pots_data(state, since)
+            if not pots_data:
+                return not_modified()
+            return jsonify(pots_data)
+        return conditional_json(state, 'pots', lambda: get_pots_data(state))
     except Exception as e:
-        print(f"❌ Pots data error: {e}")
+        log.exception("❌ Pots data error: %s", e)
         return jsonify({"error": str(e), "pots": []})
 
 @app.route('/api/game-state')
 def api_game_state():
+    # Polling clients send the last cursor they saw and get only what changed
+    since = request.args.get('since')
     try:
-        state = get_game_state()
-        print(f"✅ Game state retrieved: {getattr(state, 'coins', 120)} coins")
+        state = get_player_state(page_load=since is None)
     except Exception as e:
-        print(f"❌ Game state error: {e}")
+        log.exception("❌ Game state error: %s", e)
         # Return fallback game state
         return jsonify({
             "coins": 120,
@@ -186,15 +403,31 @@ def api_game_state():
             "error": str(e)
         })
     
+    if since is not None:
+        delta = get_state_delta(state, parse_since(state, since))
+        if delta is None:
+            return not_modified()
+        return jsonify(delta)
+    
     # Reset clipper states on page load (clippers don't persist between sessions)
     # This is called when the page first loads
-    state.reset_all_clipper_states()
-    
-    return jsonify({
-        'coins': state.coins,
-        'shop': get_shop_data(),
-        'pots': get_pots_data()
-    })
+    with state.transaction():
+        state.reset_all_clipper_states()
+        
+        def build():
+            # Only taken once the response is known not to be a 304, so the report isn't lost
+            offline_report, state.offline_report = getattr(state, 'offline_report', None), None
+            return {
+                'coins': state.coins,
+                'shop': get_shop_data(state),
+                'pots': get_pots_data(state),
+                'version': state.version,
+                'cursor': state.cursor,
+                'offline': offline_report
+            }
+        
+        # A pending offline report is news even when nothing else changed
+        return conditional_json(state, 'all', build, fresh=getattr(state, 'offline_report', None) is not None)
 
 @app.route('/api/buy-seed', methods=['POST'])
 def api_buy_seed():
@@ -202,195 +435,310 @@ def api_buy_seed():
     slot_index = data.get('slot_index')
     pot_index = data.get('pot_index')
     
-    print(f"🛒 DEBUG: Purchase request - slot_index: {slot_index}, pot_index: {pot_index}")
-    
-    state = get_game_state()
-    print(f"💰 DEBUG: Player coins: {state.coins}")
-    print(f"🏪 DEBUG: Shop has {len(state.shop.slots)} slots")
+    state = get_player_state()
     
-    if slot_index < len(state.shop.slots):
-        slot = state.shop.slots[slot_index]
-        print(f"📦 DEBUG: Slot {slot_index} - species: {slot.species_id}, stock: {slot.stock}, price: {slot.base_price}")
-    else:
-        print(f"❌ DEBUG: Invalid slot index {slot_index}")
-    
-    success = state.buy_seed(slot_index, pot_index)
-    print(f"✅ DEBUG: Purchase result: {success}")
-    
-    return jsonify({
-        'success': success,
-        'coins': state.coins,
-        'shop': get_shop_data(),
-        'pots': get_pots_data()
-    })
+    # Hold the player's transaction so the purchase and the response see the same state
+    with state.transaction():
+        coins = state.coins
+        success = state.buy_seed(slot_index, pot_index)
+        purchase_log.debug("🛒 Purchase slot %s into pot %s: %s (coins %s -> %s)",
+                           slot_index, pot_index, 'bought' if success else 'refused', coins, state.coins)
+        
+        return jsonify({
+            'success': success,
+            'coins': state.coins,
+            'shop': get_shop_data(state),
+            'pots': get_pots_data(state)
+        })
 
 @app.route('/api/update-money', methods=['POST'])
 def api_update_money():
-    print("💰 DEBUG: Money update request received")
     data = request.json
     new_coins = data.get('coins')
     
     if new_coins is None or new_coins < 0:
-        print("❌ DEBUG: Invalid coins value:", new_coins)
+        money_log.debug("❌ Invalid coins value: %r", new_coins)
         return jsonify({'success': False, 'message': 'Invalid coins value'}), 400
     
-    state = get_game_state()
-    old_coins = state.coins
-    state.coins = new_coins
+    state = get_player_state()
+    old_coins = state.set_coins(new_coins)
     
-    print(f"💰 DEBUG: Money updated - {old_coins} → {new_coins}")
+    money_log.debug("💰 Money updated - %s → %s", old_coins, new_coins)
     
     return jsonify({
         'success': True,
-        'coins': state.coins,
-        'message': f'Money updated to {state.coins}'
+        'coins': new_coins,
+        'message': f'Money updated to {new_coins}'
     })
 
 @app.route('/api/burn-plant', methods=['POST'])
 def api_burn_plant():
-    print("🔥 DEBUG: Burn plant request received")
     data = request.json
     pot_index = data.get('pot_index')
     
     if pot_index is None or pot_index < 0:
-        print("❌ DEBUG: Invalid pot_index value:", pot_index)
+        garden_log.debug("❌ Invalid pot_index value: %r", pot_index)
         return jsonify({'success': False, 'message': 'Invalid pot index'}), 400
     
-    state = get_game_state()
-    
-    # Validate pot index
-    if pot_index >= len(state.pots):
-        print(f"❌ DEBUG: Pot index {pot_index} out of range, have {len(state.pots)} pots")
-        return jsonify({'success': False, 'message': 'Pot index out of range'}), 400
-    
-    pot = state.pots[pot_index]
-    
-    # Check if pot has a plant to burn
-    if pot.state == 'empty':
-        print(f"❌ DEBUG: Pot {pot_index} is already empty")
-        return jsonify({'success': False, 'message': 'Pot is already empty'}), 400
-    
-    # Remove plant instance if it exists
-    if pot.instance_id and pot.instance_id in state.plant_instances:
-        del state.plant_instances[pot.instance_id]
-        print(f"🔥 DEBUG: Removed plant instance {pot.instance_id}")
-    
-    # Clear pot
-    pot.instance_id = None
-    pot.state = 'empty'
-    
-    print(f"🔥 DEBUG: Burned plant in pot {pot_index}, pot is now empty")
-    
-    return jsonify({
-        'success': True,
-        'message': f'Plant burned in pot {pot_index}',
-        'pots': get_pots_data()
-    })
+    state = get_player_state()
+    
+    with state.transaction():
+        result = state.burn_plant(pot_index)
+        
+        if not result['success']:
+            garden_log.debug("❌ Cannot burn pot %s: %s", pot_index, result['message'])
+            return jsonify({'success': False, 'message': result['message']}), 400
+        
+        garden_log.debug("🔥 Burned plant %s in pot %s, pot is now empty", result['instance_id'], pot_index)
+        
+        return jsonify({
+            'success': True,
+            'message': f'Plant burned in pot {pot_index}',
+            'pots': get_pots_data(state)
+        })
 
 @app.route('/api/add-clipper-experience', methods=['POST'])
 def api_add_clipper_experience():
-    print("✂️ DEBUG: Add clipper experience request received")
     data = request.json
-    instance_id = data.get('instance_id')
-    xp_amount = data.get('xp_amount', 0.5)
+    instance_id = parse_instance_id(data.get('instance_id'))
+    xp_amount = parse_xp_amount(data.get('xp_amount', 0.5))
     
-    if not instance_id:
-        print("❌ DEBUG: Invalid instance_id:", instance_id)
+    if instance_id is None:
+        xp_log.debug("❌ Invalid instance_id: %r", data.get('instance_id'))
         return jsonify({'success': False, 'message': 'Invalid instance ID'}), 400
-    
-    state = get_game_state()
-    result = state.add_clipper_experience(instance_id, xp_amount)
-    
-    if result.get('leveled_up'):
-        print(f"✂️ DEBUG: Clipper {instance_id} leveled up from {result['old_level']} to {result['new_level']}!")
-    
-    return jsonify({
-        'success': True,
-        'result': result,
-        'pots': get_pots_data()
-    })
+    if xp_amount is None:
+        xp_log.debug("❌ Invalid xp_amount: %r", data.get('xp_amount'))
+        return jsonify({'success': False, 'message': 'Invalid XP amount'}), 400
+    
+    state = get_player_state()
+    
+    with state.transaction():
+        result = state.add_clipper_experience(instance_id, xp_amount)
+        
+        if result.get('leveled_up'):
+            xp_log.debug("✂️ Clipper %s leveled up from %s to %s!", instance_id, result['old_level'], result['new_level'])
+        
+        return jsonify({
+            'success': True,
+            'result': result,
+            'pots': get_pots_data(state)
+        })
 
 @app.route('/api/add-plant-experience', methods=['POST'])
 def api_add_plant_experience():
-    print("⭐ DEBUG: Add plant experience request received")
     data = request.json
-    instance_id = data.get('instance_id')
-    xp_amount = data.get('xp_amount', 1)
+    instance_id = parse_instance_id(data.get('instance_id'))
+    xp_amount = parse_xp_amount(data.get('xp_amount', 1))
     
-    if not instance_id:
-        print("❌ DEBUG: Invalid instance_id:", instance_id)
+    if instance_id is None:
+        xp_log.debug("❌ Invalid instance_id: %r", data.get('instance_id'))
         return jsonify({'success': False, 'message': 'Invalid instance ID'}), 400
+    if xp_amount is None:
+        xp_log.debug("❌ Invalid xp_amount: %r", data.get('xp_amount'))
+        return jsonify({'success': False, 'message': 'Invalid XP amount'}), 400
+    
+    state = get_player_state()
+    
+    with state.transaction():
+        result = state.add_plant_experience(instance_id, xp_amount)
+        
+        if result['leveled_up']:
+            xp_log.debug("🎉 Plant %s leveled up from %s to %s!%s", instance_id, result['old_level'], result['new_level'],
+                         ' Clippers unlocked!' if result.get('clipper_unlocked') else '')
+        
+        return jsonify({
+            'success': True,
+            'result': result,
+            'pots': get_pots_data(state)
+        })
+
+@app.route('/api/catalog')
+def api_catalog():
+    """Every species' static data, prebuilt when the catalog was loaded"""
+    try:
+        from Catalog import get_catalog
+    except ImportError:
+        return jsonify({'species': []})
+    
+    catalog = get_catalog()
+    if request.if_none_match.contains(catalog.etag):
+        return not_modified(catalog.etag)
+    response = app.response_class(catalog.json, mimetype='application/json')
+    response.set_etag(catalog.etag)
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+@app.route('/api/admin/reload-catalog', methods=['POST'])
+@admin_only
+def api_reload_catalog():
+    """Reload plantdata.json and swap in the new species without a restart"""
+    from Catalog import reload_catalog
+    try:
+        catalog = reload_catalog()
+    except (OSError, ValueError) as e:
+        log.error("❌ Catalog reload failed, keeping the current species: %s", e)
+        return jsonify({'success': False, 'message': str(e)}), 400
+    log.info("📚 Catalog reloaded: generation %s, %s species", catalog.generation, len(catalog.species))
+    return jsonify({'success': True, 'generation': catalog.generation, 'species': len(catalog.species)})
+
+@app.route('/api/stream-info')
+def api_stream_info():
+    """Tell the client where to open its server-sent event stream"""
+    try:
+        from Events import event_server
+    except ImportError:
+        event_server = None
     
-    state = get_game_state()
-    result = state.add_plant_experience(instance_id, xp_amount)
+    if event_server is None:
+        return jsonify({'enabled': False})
     
-    if result['leveled_up']:
-        print(f"🎉 DEBUG: Plant {instance_id} leveled up from {result['old_level']} to {result['new_level']}!")
-        if result.get('clipper_unlocked'):
-            print(f"✂️ DEBUG: Clippers unlocked for plant {instance_id}!")
+    # Make sure the player exists (and has a cookie) before the stream connects
+    get_player_state()
+    return jsonify({'enabled': True, 'port': event_server.port, 'path': '/events'})
+
+@app.route('/api/admin/autosave')
+@admin_only
+def api_autosave_stats():
+    """Autosave flush latency and bytes written"""
+    try:
+        from Persistence import autosave
+    except ImportError:
+        autosave = None
+    
+    if autosave is None:
+        return jsonify({'enabled': False})
+    return jsonify({
+        'enabled': True,
+        'backend': type(autosave.backend).__name__,
+        'players_in_memory': len(autosave.store),
+        'evictions': autosave.store.evictions,
+        **autosave.stats()
+    })
+
+@app.route('/api/metrics')
+def api_metrics():
+    """Request counters, latency histograms and game gauges in Prometheus text format"""
+    if metrics is None:
+        return jsonify({'enabled': False})
+    return app.response_class(render_prometheus(), content_type=PROMETHEUS_CONTENT_TYPE)
+
+@app.route('/api/admin/profile', methods=['GET', 'POST'])
+@admin_only
+def api_profile():
+    """Turn request profiling on or off (POST), or dump what it has collected (GET)"""
+    if profiler is None:
+        return jsonify({'enabled': False})
+    
+    if request.method == 'POST':
+        data = request.get_json(silent=True) or {}
+        try:
+            rate = float(data['rate']) if data.get('rate') is not None else None
+        except (TypeError, ValueError):
+            rate = math.nan
+        if rate is not None and not 0 <= rate <= 1:
+            return jsonify({'success': False, 'message': 'rate must be a number between 0 and 1'}), 400
+        header_trigger = data.get('header')
+        if header_trigger is not None and not isinstance(header_trigger, bool):
+            return jsonify({'success': False, 'message': 'header must be true or false'}), 400
+        if data.get('reset'):
+            profiler.reset()
+        profiler.configure(rate=rate, header_trigger=header_trigger)
+        log.info("🔬 Profiling rate %s, header trigger %s", profiler.rate, profiler.header_trigger)
+        return jsonify({'success': True, **profiler.summary()})
+    
+    output = request.args.get('format', 'summary')
+    if output == 'summary':
+        return jsonify(profiler.summary())
+    stats = profiler.stats(request.args.get('route'))
+    if stats is None:
+        return jsonify({'success': False, 'message': 'No requests profiled yet'}), 404
+    if output == 'text':
+        sort = request.args.get('sort', 'cumulative')
+        if sort not in SORT_KEYS:
+            return jsonify({'success': False, 'message': f"Unknown sort '{sort}'; use one of {', '.join(sorted(SORT_KEYS))}"}), 400
+        body = stats_text(stats, sort, request.args.get('limit', 40, type=int))
+        return app.response_class(body, mimetype='text/plain')
+    if output == 'collapsed':
+        return app.response_class(collapsed_stacks(stats), mimetype='text/plain')
+    if output == 'pstats':
+        response = app.response_class(stats_bytes(stats), mimetype='application/octet-stream')
+        response.headers['Content-Disposition'] = 'attachment; filename=beanstock.pstats'
+        return response
+    return jsonify({'success': False, 'message': f"Unknown format '{output}'; use summary, text, collapsed or pstats"}), 400
+
+@app.route('/api/admin/logging')
+@admin_only
+def api_logging_stats():
+    """Log records queued, dropped and sampled out"""
+    return jsonify(log_stats())
+
+# Upper bound on events per batch so one request can't hold a player's lock for long
+MAX_EXPERIENCE_BATCH = 1000
+
+@app.route('/api/add-experience-batch', methods=['POST'])
+def api_add_experience_batch():
+    data = request.json or {}
+    raw_events = data.get('events')
+    
+    if not isinstance(raw_events, list) or len(raw_events) > MAX_EXPERIENCE_BATCH:
+        return jsonify({'success': False, 'message': f'events must be a list of at most {MAX_EXPERIENCE_BATCH} items'}), 400
+    
+    events = []
+    for event in raw_events:
+        if not isinstance(event, dict):
+            return jsonify({'success': False, 'message': 'Invalid event'}), 400
+        instance_id = parse_instance_id(event.get('instance_id'))
+        kind = event.get('kind', 'plant')
+        xp_amount = parse_xp_amount(event.get('xp_amount', 1 if kind == 'plant' else 0.5))
+        if instance_id is None or kind not in ('plant', 'clipper') or xp_amount is None:
+            return jsonify({'success': False, 'message': f'Invalid event: {event}'}), 400
+        events.append((instance_id, kind, xp_amount))
+    
+    state = get_player_state()
+    results = state.apply_experience_batch(events)
+    
+    leveled = [r for r in results if r.get('leveled_up')]
+    if leveled:
+        xp_log.debug("🎉 Experience batch of %s events leveled up %s instance(s)", len(events), len(leveled))
     
     return jsonify({
         'success': True,
-        'result': result,
-        'pots': get_pots_data()
+        'applied': len(events),
+        'results': results
     })
 
 @app.route('/api/plant-from-inventory', methods=['POST'])
 def api_plant_from_inventory():
-    print("🌱 DEBUG: Plant from inventory request received")
     data = request.json
     species_name = data.get('species_name')
     pot_index = data.get('pot_index')
     
     if not species_name or pot_index is None:
-        print(f"❌ DEBUG: Invalid data - species_name: {species_name}, pot_index: {pot_index}")
+        garden_log.debug("❌ Invalid data - species_name: %r, pot_index: %r", species_name, pot_index)
         return jsonify({'success': False, 'message': 'Invalid species name or pot index'}), 400
     
-    state = get_game_state()
-    
-    # Validate pot index and check if pot is available
-    if pot_index >= len(state.pots):
-        print(f"❌ DEBUG: Pot index {pot_index} out of range, have {len(state.pots)} pots")
-        return jsonify({'success': False, 'message': 'Pot index out of range'}), 400
-    
-    pot = state.pots[pot_index]
-    if pot.state != 'empty':
-        print(f"❌ DEBUG: Pot {pot_index} is not empty, state: {pot.state}")
-        return jsonify({'success': False, 'message': 'Pot is not available for planting'}), 400
-    
-    # Find the species in the plant species
-    from Setup import PLANT_SPECIES, PlantInstance
-    species_id = None
-    for sid, species in PLANT_SPECIES.items():
-        if species.name == species_name:
-            species_id = sid
-            break
-    
-    if not species_id:
-        print(f"❌ DEBUG: Species '{species_name}' not found")
-        return jsonify({'success': False, 'message': 'Species not found'}), 400
-    
-    # Create plant instance
-    instance_id = f"plant_{time.time()}_{pot_index}"
-    rarity = state.generate_rarity()
-    instance = state.plant_instances[instance_id] = PlantInstance(species_id, time.time(), rarity)
-    
-    # Plant in pot
-    pot.instance_id = instance_id
-    pot.state = 'growing'
-    
-    print(f"🌱 DEBUG: Successfully planted {species_name} (instance_id: {instance_id}) in pot {pot_index}")
-    
-    return jsonify({
-        'success': True,
-        'instance_id': instance_id,
-        'pots': get_pots_data()
-    })
+    state = get_player_state()
+    
+    with state.transaction():
+        result = state.plant_from_inventory(species_name, pot_index)
+        
+        if not result['success']:
+            garden_log.debug("❌ Cannot plant %s in pot %s: %s", species_name, pot_index, result['message'])
+            return jsonify({'success': False, 'message': result['message']}), 400
+        
+        instance_id = result['instance_id']
+        garden_log.debug("🌱 Planted %s (instance_id: %s) in pot %s", species_name, instance_id, pot_index)
+        
+        return jsonify({
+            'success': True,
+            'instance_id': instance_id,
+            'pots': get_pots_data(state)
+        })
 
 def console_command_listener():
     """Listen for console commands in a separate thread"""
     print("\n🎮 Console Commands Available:")
-    print("   Startslot  - Launch the slot machine mini-game")
+    print("   Startslot  - Launch the slot machine mini-game (on the latest player's garden, or: startslot <session>)")
     print("   Level24    - Level up all plants to level 24 (one away from clippers)")       
     print("   Level25    - Level up to 25 (unlocks clippers, 3x money)")
     print("   Level50    - Level up to 50 (4x money multiplier)")
@@ -400,14 +748,19 @@ def console_command_listener():
     try:
         while True:
             try:
-                command = input("").strip().lower()
+                command, _, argument = input("").strip().partition(' ')
+                command, argument = command.lower(), argument.strip()
                 
                 if command == "startslot":
                     print("🎰 Starting Slot Machine Mini-Game...")
                     try:
+                        from Setup import session_store
+                        if argument and session_store.lookup(argument) is None:
+                            print(f"❌ No garden for session '{argument}'")
+                            continue
                         # Import and start slot machine in a separate thread
                         from SlotMachine import start_slot_machine
-                        slot_thread = threading.Thread(target=start_slot_machine, daemon=True)
+                        slot_thread = threading.Thread(target=start_slot_machine, args=(argument or None,), daemon=True)
                         slot_thread.start()
                     except ImportError as e:
                         print(f"❌ Error: Could not import slot machine: {e}")
@@ -417,33 +770,25 @@ def console_command_listener():
                 elif command == "level24":
                     print("⚡ DEBUG: Leveling up all plants to level 24...")
                     try:
-                        from Setup import get_game_state
-                        state = get_game_state()
+                        from Setup import session_store
                         
-                        # Level up all existing plant instances to level 24
-                        for instance_id, plant in state.plant_instances.items():
-                            plant.level = 24
-                            plant.experience = 0  # Reset XP to 0 at new level
-                            plant.clipper_unlocked = False  # Not unlocked yet
-                            plant.clipper_level = 0
-                            plant.clipper_experience = 0
+                        # Console commands apply to every player's garden
+                        for state in session_store.states():
+                            # Level up all existing plant instances to level 24
+                            for instance_id, plant in state.plant_instances.items():
+                                plant.level = 24
+                                plant.experience = 0  # Reset XP to 0 at new level
+                                plant.clipper_unlocked = False  # Not unlocked yet
+                                plant.clipper_level = 0
+                                plant.clipper_experience = 0
                             
-                            # Calculate proper XP requirement for level 25
-                            species_id = plant.species_id
-                            required_xp = state.get_experience_required_for_level(25, species_id)
-                            print(f"   ✅ Leveled up plant {instance_id} to level 24 (needs {required_xp} XP for level 25)")
-                        
-                        # Update all pots to reflect the new levels
-                        for pot in state.pots:
-                            if pot.instance_id and pot.instance_id in state.plant_instances:
-                                plant = state.plant_instances[pot.instance_id]
-                                pot.level = 24
-                                pot.experience = 0
-                                # Use the proper XP calculation from the game's formula
-                                pot.required_xp = state.get_experience_required_for_level(25, plant.species_id)
-                                pot.clipper_unlocked = False
-                                pot.clipper_level = 0
-                                print(f"   ✅ Updated pot {pot.instance_id} to level 24 (needs {pot.required_xp} XP for level 25)")
+                                # Calculate proper XP requirement for level 25
+                                species_id = plant.species_id
+                                required_xp = state.get_experience_required_for_level(25, species_id)
+                                print(f"   ✅ Leveled up plant {instance_id} to level 24 (needs {required_xp} XP for level 25)")
+
+                            # Objects were edited directly, so invalidate cached views
+                            state.touch_all()
                         
                         print("🎉 All plants have been leveled up to level 24!")
                         print("   Collect a few beans to reach level 25 and unlock auto-clippers!")
@@ -454,29 +799,22 @@ def console_command_listener():
                 elif command == "level25":
                     print("⚡ DEBUG: Leveling up all plants to level 25 with clippers...")
                     try:
-                        from Setup import get_game_state
-                        state = get_game_state()
+                        from Setup import session_store
                         
-                        # Level up all existing plant instances to level 25
-                        for instance_id, plant in state.plant_instances.items():
-                            plant.level = 25
-                            plant.experience = 0
-                            plant.clipper_unlocked = True  # Clippers unlocked!
-                            plant.clipper_level = 1
-                            plant.clipper_experience = 0
+                        # Console commands apply to every player's garden
+                        for state in session_store.states():
+                            # Level up all existing plant instances to level 25
+                            for instance_id, plant in state.plant_instances.items():
+                                plant.level = 25
+                                plant.experience = 0
+                                plant.clipper_unlocked = True  # Clippers unlocked!
+                                plant.clipper_level = 1
+                                plant.clipper_experience = 0
                             
-                            print(f"   ✅ Leveled up plant {instance_id} to level 25 with clippers!")
-                        
-                        # Update all pots to reflect the new levels
-                        for pot in state.pots:
-                            if pot.instance_id and pot.instance_id in state.plant_instances:
-                                plant = state.plant_instances[pot.instance_id]
-                                pot.level = 25
-                                pot.experience = 0
-                                pot.required_xp = state.get_experience_required_for_level(26, plant.species_id)
-                                pot.clipper_unlocked = True
-                                pot.clipper_level = 1
-                                print(f"   ✅ Updated pot {pot.instance_id} to level 25 with clippers!")
+                                print(f"   ✅ Leveled up plant {instance_id} to level 25 with clippers!")
+
+                            # Objects were edited directly, so invalidate cached views
+                            state.touch_all()
                         
                         print("🎉 All plants have been leveled up to level 25!")
                         print("✂️  Auto-clippers are now active!")
@@ -488,16 +826,19 @@ def console_command_listener():
                 elif command == "level50":
                     print("🔥 Leveling up all plants to level 50...")
                     try:
-                        from Setup import get_game_state
-                        state = get_game_state()
+                        from Setup import session_store
                         
-                        for instance_id, plant in state.plant_instances.items():
-                            plant.level = 50
-                            plant.experience = 0
-                            plant.clipper_unlocked = True
-                            plant.clipper_level = 5
-                            plant.clipper_experience = 0
-                            print(f"   ✅ Plant {instance_id} at level 50!")
+                        # Console commands apply to every player's garden
+                        for state in session_store.states():
+                            for instance_id, plant in state.plant_instances.items():
+                                plant.level = 50
+                                plant.experience = 0
+                                plant.clipper_unlocked = True
+                                plant.clipper_level = 5
+                                plant.clipper_experience = 0
+                                print(f"   ✅ Plant {instance_id} at level 50!")
+                            # Objects were edited directly, so invalidate cached views
+                            state.touch_all()
                         
                         print("🔥 Level 50 ACTIVATED!")
                         print("💰 Money multiplier: 4x")
@@ -509,16 +850,19 @@ def console_command_listener():
                 elif command == "level100":
                     print("⚡ Leveling up all plants to level 100...")
                     try:
-                        from Setup import get_game_state
-                        state = get_game_state()
+                        from Setup import session_store
                         
-                        for instance_id, plant in state.plant_instances.items():
-                            plant.level = 100
-                            plant.experience = 0
-                            plant.clipper_unlocked = True
-                            plant.clipper_level = 10
-                            plant.clipper_experience = 0
-                            print(f"   ✅ Plant {instance_id} at level 100!")
+                        # Console commands apply to every player's garden
+                        for state in session_store.states():
+                            for instance_id, plant in state.plant_instances.items():
+                                plant.level = 100
+                                plant.experience = 0
+                                plant.clipper_unlocked = True
+                                plant.clipper_level = 10
+                                plant.clipper_experience = 0
+                                print(f"   ✅ Plant {instance_id} at level 100!")
+                            # Objects were edited directly, so invalidate cached views
+                            state.touch_all()
                         
                         print("⚡ Level 100 ACTIVATED!")
                         print("💰 Money multiplier: 5.5x")
@@ -528,13 +872,31 @@ def console_command_listener():
                     except Exception as e:
                         print(f"❌ Error: {e}")
                 
+                elif command == "reload":
+                    try:
+                        from Catalog import reload_catalog
+                        catalog = reload_catalog()
+                        print(f"📚 Catalog reloaded: generation {catalog.generation}, {len(catalog.species)} species")
+                    except (OSError, ValueError) as e:
+                        print(f"❌ Catalog reload failed, keeping the current species: {e}")
+                
+                elif command == "reloadassets":
+                    if get_asset_manifest is None:
+                        print("❌ Asset pipeline not available")
+                    else:
+                        from AssetPipeline import reload_asset_manifest
+                        manifest = reload_asset_manifest()
+                        print(f"🖼️ Asset manifest reloaded: {len(manifest.assets)} built assets")
+                
                 elif command == "help":
                     print("\n🎮 Available Commands:")
-                    print("   startslot  - Launch the slot machine mini-game")
+                    print("   startslot  - Launch the slot machine mini-game [session id, default: latest player]")
                     print("   level24    - Level up to 24 (one away from clippers)")
                     print("   level25    - Level up to 25 (unlocks clippers, 3x money)")
                     print("   level50    - Level up to 50 (4x money)")
                     print("   level100   - Level up to 100 (5.5x money)")
+                    print("   reload     - Reload plant species from plantdata.json")
+                    print("   reloadassets - Serve the latest python AssetPipeline.py build")
                     print("   help       - Show this help message")
                     print("")
                 
@@ -549,7 +911,7 @@ def console_command_listener():
                 break
                 
     except Exception as e:
-        print(f"Console listener error: {e}")
+        log.error("Console listener error: %s", e)
 
 def find_available_port(start_port=5001, max_attempts=10):
     """Find an available port starting from start_port"""
@@ -564,7 +926,7 @@ def find_available_port(start_port=5001, max_attempts=10):
     return None
 
 if __name__ == '__main__':
-    print("Starting Grow A Beanstock game server...")
+    log.info("Starting Grow A Beanstock game server...")
     
     # Use port 5000 specifically to match JavaScript expectations
     port = 5000
@@ -575,15 +937,42 @@ if __name__ == '__main__':
         with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
             s.bind(('0.0.0.0', port))
     except OSError:
-        print("❌ Port 5000 is already in use. Trying to find alternative...")
+        log.warning("❌ Port 5000 is already in use. Trying to find alternative...")
         port = find_available_port(5001)
         if not port:
-            print("❌ Could not find an available port. Please check what's using ports 5000-5010 and stop those processes.")
+            log.error("❌ Could not find an available port. Please check what's using ports 5000-5010 and stop those processes.")
             import sys
             sys.exit(1)
     
-    print(f"🚀 Server starting on: http://localhost:{port}")
-    print(f"🌱 Open your browser and go to: http://localhost:{port}")
+    log.info("🚀 Server starting on: http://localhost:%s", port)
+    log.info("🌱 Open your browser and go to: http://localhost:%s", port)
+    
+    # Restore saved gardens and keep saving changed ones in the background.
+    # BEANSTOCK_STORAGE=sqlite keeps players in SQLite, loads them on demand and
+    # caps how many stay in memory (BEANSTOCK_MAX_PLAYERS).
+    try:
+        import atexit
+        from Persistence import start_autosave
+        if os.environ.get('BEANSTOCK_STORAGE', 'json').lower() == 'sqlite':
+            from Setup import session_store
+            from Storage import SQLiteBackend
+            session_store.max_players = int(os.environ.get('BEANSTOCK_MAX_PLAYERS', 10000))
+            atexit.register(start_autosave(SQLiteBackend(), preload=False).stop)
+            log.info("🗄️ SQLite storage, up to %s players in memory", session_store.max_players)
+        else:
+            atexit.register(start_autosave().stop)
+    except Exception as e:
+        log.error("❌ Could not start autosave: %s", e)
+    
+    # Push shop refreshes, ready plants and level-ups over server-sent events
+    events_port = find_available_port(port + 1)
+    if events_port:
+        try:
+            from Events import start_event_stream
+            start_event_stream(port=events_port, page_port=port)
+            log.info("📡 Event stream on: http://localhost:%s/events", events_port)
+        except Exception as e:
+            log.error("❌ Could not start event stream: %s", e)
     
     # Start console command listener in a separate thread
     console_thread = threading.Thread(target=console_command_listener, daemon=True)
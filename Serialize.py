@@ -0,0 +1,80 @@
+"""
+Grow A Beanstock - Response Serialization
+JSON encoding and compression for API responses. Flask's jsonify goes through
+FastJSONProvider, which uses orjson when it is installed and the standard
+library otherwise, and compress_response gzips JSON bodies over a size
+threshold for clients that accept it. The species fields inside shop and pot
+views are prebuilt once per species by the catalog (see Catalog.py).
+"""
+
+import gzip
+import json
+from typing import Any
+
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # orjson is optional; the standard library encoder is the fallback
+    orjson = None
+
+GZIP_MIN_BYTES = 1024  # Smaller bodies fit in a packet or two either way
+GZIP_LEVEL = 5  # Most of level 9's savings at a fraction of the CPU
+COMPRESSIBLE_MIMETYPES = ('application/json',)
+
+if orjson is not None:
+    ORJSON_OPTIONS = orjson.OPT_SERIALIZE_NUMPY  # Non-string keys fall back to the standard library
+
+
+def encode(obj: Any) -> bytes:
+    """Compact JSON for obj, as bytes"""
+    if orjson is not None:
+        try:
+            return orjson.dumps(obj, default=DefaultJSONProvider.default, option=ORJSON_OPTIONS)
+        except TypeError:
+            pass  # e.g. integers beyond 64 bits, which the standard library handles
+    return json.dumps(obj, default=DefaultJSONProvider.default, separators=(',', ':')).encode('utf-8')
+
+def gzip_bytes(data: bytes) -> bytes:
+    """Gzip data with a fixed header, so equal bodies compress to equal bytes"""
+    return gzip.compress(data, compresslevel=GZIP_LEVEL, mtime=0)
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """Flask JSON provider backed by orjson when available"""
+    def dumps(self, obj: Any, **kwargs: Any) -> str:
+        if kwargs:  # Options like indent only the standard library understands
+            return super().dumps(obj, **kwargs)
+        return encode(obj).decode('utf-8')
+
+    def loads(self, s, **kwargs: Any) -> Any:
+        if orjson is not None and not kwargs:
+            try:
+                return orjson.loads(s)
+            except orjson.JSONDecodeError:
+                pass  # Let the standard library accept (or report) it
+        return super().loads(s, **kwargs)
+
+    def response(self, *args: Any, **kwargs: Any):
+        if (self.compact is None and self._app.debug) or self.compact is False:
+            return super().response(*args, **kwargs)
+        # Skip the str round trip: the body is handed to the response as bytes
+        return self._app.response_class(encode(self._prepare_response_obj(args, kwargs)), mimetype=self.mimetype)
+
+
+def compress_response(response, request):
+    """Gzip a JSON response in place when the client accepts it and it is big enough"""
+    if (response.direct_passthrough or response.is_streamed or response.status_code != 200
+            or response.mimetype not in COMPRESSIBLE_MIMETYPES or 'Content-Encoding' in response.headers):
+        return response
+
+    body = response.get_data()
+    if len(body) < GZIP_MIN_BYTES:
+        return response
+    response.vary.add('Accept-Encoding')
+    if not request.accept_encodings['gzip']:
+        return response
+
+    response.set_data(gzip_bytes(body))
+    response.headers['Content-Encoding'] = 'gzip'
+    return response
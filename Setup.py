@@ -3,29 +3,41 @@ Grow A Beanstock - Game Setup and Initialization
 This file contains the core game logic, data structures, and initialization.
 """
 
+import functools
+import heapq
+import itertools
 import json
+import math
+import random
+import secrets
+import threading
 import time
+from array import array
+from collections import OrderedDict
+from contextlib import contextmanager
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional, Any
-
-class PlantSpecies:
-    """Defines a plant species with growth characteristics"""
-    def __init__(self, id: str, name: str, type: str, grow_time: int, base_sell: int, seed_cost: int, rarity: str = 'common'):
-        self.id = id
-        self.name = name
-        self.type = type  # 'picker' or 'cutter'
-        self.grow_time = grow_time  # seconds to first ready
-        self.base_sell = base_sell
-        self.seed_cost = seed_cost
-        self.rarity = rarity  # Rarity tier for shop spawn chances
+from typing import Callable, Dict, List, Optional, Any
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional; bulk level stats fall back to plain Python
+    np = None
+
+from Catalog import CurrentSpecies, PlantSpecies, catalog_hooks, get_catalog
+from Logs import get_logger
+
+purchase_log = get_logger('shop.purchase')
 
 class PlantInstance:
     """Represents a specific planted seed with its characteristics"""
+    __slots__ = ('species_id', 'planted_at', 'picks_done', 'rarity', 'ready_state',
+                 'level', 'experience', 'clipper_unlocked', 'clipper_level', 'clipper_experience')
+
     def __init__(self, species_id: str, planted_at: float, rarity: Dict[str, str]):
         self.species_id = species_id
         self.planted_at = planted_at
         self.picks_done = 0
-        self.rarity = rarity  # {'size': 'normal'|'large'|'massive', 'finish': 'none'|'shiny'|'golden'}
+        self.rarity = rarity  # Shared entry of RARITY_COMBOS: {'size': ..., 'finish': ...}, never mutated
         self.ready_state = 'growing'  # 'growing'|'ready'|'harvested'
         
         # Leveling system
@@ -33,130 +45,560 @@ class PlantInstance:
         self.experience = 0
         self.clipper_unlocked = False
         self.clipper_level = 0
+        self.clipper_experience = 0
 
 class Pot:
     """Represents a planting pot"""
+    __slots__ = ('index', 'state', 'instance_id')
+
     def __init__(self, index: int):
         self.index = index
         self.state = 'empty'  # 'empty'|'growing'|'ready'|'harvested'
-        self.instance_id: Optional[str] = None
+        self.instance_id: Optional[int] = None
 
 class ShopSlot:
     """Represents a shop slot with species and pricing"""
+    __slots__ = ('species_id', 'stock', 'base_price', 'purchases_this_roll')
+
     def __init__(self, species_id: str, stock: int, base_price: int):
         self.species_id = species_id
         self.stock = stock
         self.base_price = base_price
         self.purchases_this_roll = 0
 
+    def current_price(self) -> int:
+        """Price of the next purchase, including the repeat purchase tax"""
+        if self.purchases_this_roll == 1:
+            return int(self.base_price * 1.1)  # +10%
+        if self.purchases_this_roll > 1:
+            return int(self.base_price * 1.25)  # +25%
+        return self.base_price
+
 class Shop:
     """Manages the seed shop"""
-    def __init__(self):
+    def __init__(self, rng=None):
         self.refresh_at = time.time() + 180  # 3 minutes from now
         self.slots: List[ShopSlot] = []
-        self.refresh_shop()
+        self.refresh_shop(rng)
 
-    def refresh_shop(self):
+    def refresh_shop(self, rng=None):
         """Refresh shop with new seeds based on rarity spawn chances"""
-        import random
-        self.slots = []
-        
-        # Get all species grouped by rarity
-        species_by_rarity = {}
-        for species_id, species in PLANT_SPECIES.items():
-            rarity = species.rarity
-            if rarity not in species_by_rarity:
-                species_by_rarity[rarity] = []
-            species_by_rarity[rarity].append(species_id)
-        
-        # Track already spawned species to prevent duplicates
-        spawned_species = set()
-        max_slots = 8
-        attempts = 0
-        max_attempts = 50  # Prevent infinite loops
-        
-        while len(self.slots) < max_slots and attempts < max_attempts:
-            attempts += 1
-            spawned = False
-            rarities = list(RARITY_CONFIG.keys())
-            # Shuffle rarities for random selection order
-            random.shuffle(rarities)
-            
-            for rarity in rarities:
-                config = RARITY_CONFIG[rarity]
-                if random.random() < config['spawn_chance']:
-                    # This rarity spawns! Pick a random species from this rarity that we haven't spawned yet
-                    if rarity in species_by_rarity:
-                        available_species = [s for s in species_by_rarity[rarity] if s not in spawned_species]
-                        if available_species:  # Only spawn if we have species left in this rarity
-                            species_id = random.choice(available_species)
-                            species = PLANT_SPECIES[species_id]
-                            
-                            # Generate random quantity based on rarity
-                            quantity = random.randint(config['min_qty'], config['max_qty'])
-                            
-                            slot = ShopSlot(species_id, quantity, species.seed_cost)
-                            self.slots.append(slot)
-                            spawned_species.add(species_id)
-                            spawned = True
-                            break
-            
-            # If nothing spawned and we have few slots, try to force spawn a common that we haven't used
-            if not spawned and len(self.slots) < 4 and 'common' in species_by_rarity:
-                available_commons = [s for s in species_by_rarity['common'] if s not in spawned_species]
-                if available_commons:
-                    species_id = random.choice(available_commons)
-                    species = PLANT_SPECIES[species_id]
-                    config = RARITY_CONFIG['common']
-                    quantity = random.randint(config['min_qty'], config['max_qty'])
-                    slot = ShopSlot(species_id, quantity, species.seed_cost)
-                    self.slots.append(slot)
-                    spawned_species.add(species_id)
-        
+        self.slots = get_shop_sampler().draw(rng)
         self.refresh_at = time.time() + 180  # Next refresh in 3 minutes
 
+def get_experience_base(seed_cost: int) -> int:
+    """Base XP per level for a seed-cost tier - MUCH HARDER PROGRESSION"""
+    # Significantly higher base XP requirements
+    if seed_cost <= 120:
+        return 20  # Much harder even for cheap plants
+    elif seed_cost <= 600:
+        return 35  # Very hard for snap pea tier
+    elif seed_cost <= 2000:
+        return 50  # Extremely hard for mid-tier
+    elif seed_cost <= 20000:
+        return 75  # Brutally hard for expensive plants
+    elif seed_cost <= 100000:
+        return 110  # Insanely hard for rare plants
+    else:
+        return 150  # Nearly impossible for ultra-rare plants
+
+def experience_for_level(base_xp: int, level: int) -> int:
+    """XP needed to go from level - 1 to level"""
+    # Exponential growth - gets dramatically harder at higher levels
+    level_multiplier = 1.0 + (level - 1) * 0.6 + math.pow(level - 1, 1.4) * 0.15
+    return int(base_xp * level_multiplier)
+
+class LevelTable:
+    """Precomputed per-level and cumulative XP for one seed-cost tier.
+    
+    Tables grow lazily as plants reach new levels and are shared by every
+    player, so resolving any XP grant is a binary search instead of one loop
+    iteration per level gained.
+    """
+    def __init__(self, base_xp: int):
+        self.base_xp = base_xp
+        self.required = [0, base_xp]  # required[level]: XP to reach level from level - 1
+        self.cumulative = [0, 0]  # cumulative[level]: total XP to reach level from level 1
+        self._lock = threading.Lock()
+
+    def _extend(self, max_level: int):
+        with self._lock:
+            required = self.required
+            cumulative = self.cumulative
+            for level in range(len(required), max_level + 1):
+                xp = experience_for_level(self.base_xp, level)
+                required.append(xp)
+                cumulative.append(cumulative[-1] + xp)
+
+    def required_for(self, level: int) -> int:
+        """XP needed to go from level - 1 to level"""
+        if level < 1:
+            return experience_for_level(self.base_xp, level)
+        if level >= len(self.required):
+            self._extend(max(level, 2 * len(self.required)))
+        return self.required[level]
+
+    def resolve(self, level: int, experience: float) -> tuple:
+        """Apply banked XP at a level, returning (new_level, leftover_experience).
+        
+        Matches leveling one step at a time exactly: the leftover is the same
+        single subtraction of an integer total.
+        """
+        if experience < self.required_for(level + 1):
+            return level, experience
+        if not math.isfinite(experience):
+            raise ValueError(f"Cannot level up with {experience} XP")
+        
+        cumulative = self.cumulative
+        start = cumulative[level]
+        while cumulative[-1] - start <= experience:
+            self._extend(2 * len(cumulative))
+            cumulative = self.cumulative
+        
+        # Largest target level whose cost from `level` fits in the banked XP
+        low, high = level, len(cumulative) - 1
+        while high - low > 1:
+            middle = (low + high) // 2
+            if cumulative[middle] - start <= experience:
+                low = middle
+            else:
+                high = middle
+        return low, experience - (cumulative[low] - start)
+
+# Shared leveling tables, one per base XP tier
+LEVEL_TABLES: Dict[int, LevelTable] = {}
+
+def get_level_table_for_base(base_xp: int) -> LevelTable:
+    """Leveling table for a base XP tier"""
+    table = LEVEL_TABLES.get(base_xp)
+    if table is None:
+        table = LEVEL_TABLES.setdefault(base_xp, LevelTable(base_xp))
+    return table
+
+def get_level_table(species_id: str) -> LevelTable:
+    """Leveling table for a species' seed-cost tier"""
+    return get_level_table_for_base(get_experience_base(get_catalog().species[species_id].seed_cost))
+
+def get_level_multipliers(level: int) -> Dict[str, float]:
+    """Get all level-based multipliers for a plant level - BALANCED INFINITE SCALING"""
+    # MONEY MULTIPLIER: Much more conservative scaling
+    # Level 1: 1x, Level 10: 1.3x, Level 25: 1.7x, Level 50: 2x, Level 100: 2.5x
+    # Uses much smaller square root multiplier for diminishing returns
+    money_multiplier = 1.0 + math.sqrt(level - 1) * 0.15
+    
+    # SPAWN RATE: Much slower progression, especially at low levels
+    # Level 1: 0.7x (slower than base), Level 10: 1x, Level 25: 1.2x, Level 50: 1.4x, Level 100: 1.8x
+    if level <= 5:
+        spawn_rate_multiplier = 0.6 + (level - 1) * 0.08  # Very slow progression from 0.6x to 0.9x for levels 1-5
+    else:
+        spawn_rate_multiplier = 0.9 + math.sqrt(level - 5) * 0.1  # Gradual increase after level 5
+    
+    # SPECIAL CHANCE: Better rare beans but not insane
+    # Level 1: 1x, Level 25: 2x, Level 50: 3x, Level 100: 4x
+    special_chance_multiplier = 1.0 + math.log(level + 1) * 0.3
+    
+    return {
+        "money": money_multiplier,
+        "spawn_rate": spawn_rate_multiplier,
+        "special_chance": special_chance_multiplier
+    }
+
+# Memo of (level, base_xp) -> (multipliers, XP required for the next level)
+LEVEL_STATS_MEMO: Dict[tuple, tuple] = {}
+LEVEL_STATS_MEMO_LIMIT = 100000
+BULK_NUMPY_THRESHOLD = 8  # Below this many misses NumPy's call overhead isn't worth it
+
+def get_bulk_level_stats(keys: List[tuple]) -> List[tuple]:
+    """(multipliers, required_xp) for many (level, base_xp) pairs in one pass.
+    
+    Misses are computed as whole arrays with NumPy when it is installed and
+    memoized. The returned dicts are shared, so callers must not mutate them.
+    """
+    memo = LEVEL_STATS_MEMO
+    # Read the shared memo once per key: another thread may clear it while this one computes
+    found: Dict[tuple, tuple] = {}
+    missing = []
+    for key in set(keys):
+        stats = memo.get(key)
+        if stats is None:
+            missing.append(key)
+        else:
+            found[key] = stats
+    if missing:
+        if np is not None and len(missing) >= BULK_NUMPY_THRESHOLD:
+            levels = np.array([level for level, _ in missing], dtype=np.float64)
+            money = 1.0 + np.sqrt(levels - 1) * 0.15
+            spawn_rate = np.where(levels <= 5, 0.6 + (levels - 1) * 0.08,
+                                  0.9 + np.sqrt(np.maximum(levels - 5, 0)) * 0.1)
+            special_chance = 1.0 + np.log(levels + 1) * 0.3
+            multipliers = [
+                {"money": m, "spawn_rate": r, "special_chance": c}
+                for m, r, c in zip(money.tolist(), spawn_rate.tolist(), special_chance.tolist())
+            ]
+        else:
+            multipliers = [get_level_multipliers(level) for level, _ in missing]
+        
+        if len(memo) + len(missing) > LEVEL_STATS_MEMO_LIMIT:
+            memo.clear()
+        for (level, base_xp), level_multipliers in zip(missing, multipliers):
+            required_xp = get_level_table_for_base(base_xp).required_for(level + 1)
+            found[(level, base_xp)] = memo[(level, base_xp)] = (level_multipliers, required_xp)
+    
+    return [found[key] for key in keys]
+
+# Clipper XP needed to advance from each clipper level (max clipper level is 25)
+MAX_CLIPPER_LEVEL = 25
+CLIPPER_XP_REQUIRED = tuple(100 * (level ** 1.2) for level in range(MAX_CLIPPER_LEVEL))
+
+# Plant rarity rolls: size Normal 65% / Large 30% / Massive 5%, finish None 94% / Silver Shiny 3% / Golden 3%
+SIZE_RARITIES = ('normal', 'large', 'massive')
+SIZE_THRESHOLDS = (0.65, 0.95)
+FINISH_RARITIES = ('none', 'shiny', 'golden')
+FINISH_THRESHOLDS = (0.94, 0.97)
+# Every plant shares one of these nine dicts instead of carrying its own copy, so treat them as read-only
+RARITY_COMBOS = [{'size': size, 'finish': finish} for size in SIZE_RARITIES for finish in FINISH_RARITIES]
+_RARITY_INDEX = {(combo['size'], combo['finish']): combo for combo in RARITY_COMBOS}
+RANDOM_BLOCK_SIZE = 256  # Uniform draws generated per buffer refill
+BULK_ROLL_THRESHOLD = 64  # Smaller batches roll faster one plant at a time
+
+class RandomBuffer:
+    """Refillable stream of uniform [0, 1) draws for one player.
+    
+    Draws are generated a block at a time (by NumPy when available) and
+    handed out through a C-level iterator, so a single roll never calls back
+    into Python until the block runs out. Seeding it makes every roll drawn
+    through it reproducible; anything that takes an rng with a random()
+    method can use it.
+    """
+    def __init__(self, seed: Optional[int] = None, block_size: int = RANDOM_BLOCK_SIZE):
+        self.seed = seed
+        self.block_size = block_size
+        self.refills = 0
+        self._generator = np.random.default_rng(seed) if np is not None else random.Random(seed)
+        self._stream = itertools.chain.from_iterable(self._blocks())
+        self.random: Callable[[], float] = self._stream.__next__
+    
+    def _blocks(self):
+        # Packed doubles keep an idle player's buffer at 8 bytes a draw instead of a list of floats
+        while True:
+            self.refills += 1
+            if np is not None:
+                block = array('d')
+                block.frombytes(self._generator.random(self.block_size).tobytes())
+                yield block
+            else:
+                draw = self._generator.random
+                yield array('d', [draw() for _ in range(self.block_size)])
+    
+    def uniforms(self, count: int):
+        """count draws at once (a NumPy array when NumPy is available), continuing the same stream"""
+        values = itertools.islice(self._stream, count)
+        if np is not None:
+            return np.fromiter(values, dtype=float, count=count)
+        return list(values)
+
+def roll_rarity(rng=None) -> Dict[str, str]:
+    """Roll size and finish rarity for one plant"""
+    draw = (rng or random).random
+    size_roll = draw()
+    finish_roll = draw()
+    return RARITY_COMBOS[
+        (0 if size_roll < SIZE_THRESHOLDS[0] else 3 if size_roll < SIZE_THRESHOLDS[1] else 6)
+        + (0 if finish_roll < FINISH_THRESHOLDS[0] else 1 if finish_roll < FINISH_THRESHOLDS[1] else 2)
+    ]
+
+def intern_rarity(rarity: Dict[str, str]) -> Dict[str, str]:
+    """The shared RARITY_COMBOS entry equal to a rarity dict (e.g. one read back from a save)"""
+    return _RARITY_INDEX.get((rarity.get('size'), rarity.get('finish'))) or dict(rarity)
+
+def roll_rarities(count: int, rng=None) -> List[Dict[str, str]]:
+    """Roll size and finish rarities for count plants at once.
+    
+    With a RandomBuffer and NumPy, big batches are classified in one
+    vectorized pass; either way the draws are consumed size then finish per
+    plant, so a seeded buffer gives the same plants on both paths.
+    """
+    rng = rng or random
+    if np is None or count < BULK_ROLL_THRESHOLD or not isinstance(rng, RandomBuffer):
+        return [roll_rarity(rng) for _ in range(count)]
+    
+    rolls = rng.uniforms(2 * count).reshape(count, 2)
+    combos = (np.searchsorted(SIZE_THRESHOLDS, rolls[:, 0], side='right') * len(FINISH_RARITIES)
+              + np.searchsorted(FINISH_THRESHOLDS, rolls[:, 1], side='right'))
+    return [RARITY_COMBOS[combo] for combo in combos.tolist()]
+
+def transactional(method):
+    """Run a GameState method inside the player's transaction"""
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self.transaction():
+            return method(self, *args, **kwargs)
+    return wrapper
+
 class GameState:
     """Main game state manager"""
-    def __init__(self):
+    def __init__(self, seed: Optional[int] = None):
+        # Seeded players roll their shop and plants from their own buffer;
+        # others share the random module until they first plant
+        self._rolls: Optional[RandomBuffer] = RandomBuffer(seed) if seed is not None else None
+        
         self.coins = 120  # Starting coins
         self.pots: List[Pot] = [Pot(i) for i in range(12)]
-        self.plant_instances: Dict[str, PlantInstance] = {}
-        self.shop = Shop()
+        self.plant_instances: Dict[int, PlantInstance] = {}
+        self.next_instance_id = 1  # Instance IDs are never reused, so stale client events can't hit a newer plant
+        self.shop = Shop(self._rolls)
         self.last_save = time.time()
+        self.last_seen = time.time()  # Last request from the player, for offline progression
+        self.offline_report: Optional[Dict[str, Any]] = None
+        
+        # Per-player lock: request threads for different players never contend
+        self.lock = threading.RLock()
+        
+        # Versioning: every mutation bumps `version`, and each pot and the shop
+        # remember the version they last changed at so clients can fetch deltas.
+        # The epoch keeps ETags from one server run matching another's.
+        self.epoch = secrets.token_hex(4)
+        self.version = 0
+        self.coins_version = 0
+        self.shop_version = 0
+        self.pot_versions: List[int] = [0] * len(self.pots)
+        self._pot_view_cache: Dict[int, tuple] = {}
+        self._shop_view_cache: Optional[tuple] = None
+        self.dirty = False  # Changed since last written to storage
+        self.last_access = time.monotonic()  # For evicting idle players from memory
+        self.catalog_generation = get_catalog().generation  # Species data the cached views were built from
+        
+        # Min-heap of (ready_at, pot_index, instance_id) for growing plants, so
+        # update_plants only touches plants whose deadline has passed
+        self._ready_heap: List[tuple] = []
+        
+        # Game events (level-ups, ready plants, shop refreshes) are queued during
+        # a transaction and handed to event_hooks only once it commits
+        self.session_id: Optional[str] = None
+        self._pending_events: List[tuple] = []
+        self._transaction_depth = 0
+        # Plant instances' fields as they were before the outermost transaction first changed them
+        self._instance_undo: Optional[Dict[int, tuple]] = None
         
         # Reset all clipper states on initialization (they don't persist)
         self.reset_all_clipper_states()
 
+    @contextmanager
+    def transaction(self):
+        """Apply a group of mutations all-or-nothing.
+
+        Mutations for one player are serialized, and if anything inside the
+        block raises, coins, pots, shop stock and plant instances (including
+        their levels, experience and clippers) are restored. Only the
+        outermost transaction takes a snapshot; a nested one that raises is
+        rolled back by the transaction around it.
+        """
+        with self.lock:
+            if self._transaction_depth:
+                self._transaction_depth += 1
+                try:
+                    yield self
+                finally:
+                    self._transaction_depth -= 1
+                return
+
+            self._transaction_depth = 1
+            self._instance_undo = {}
+            events_mark = len(self._pending_events)
+            snapshot = (
+                self.coins,
+                [(pot.state, pot.instance_id) for pot in self.pots],
+                self.shop.refresh_at,
+                list(self.shop.slots),
+                [(slot.stock, slot.purchases_this_roll) for slot in self.shop.slots],
+                dict(self.plant_instances),
+                list(self._ready_heap),
+            )
+            try:
+                yield self
+            except Exception:
+                del self._pending_events[events_mark:]
+                coins, pots, refresh_at, slots, slot_counts, plant_instances, ready_heap = snapshot
+                self.coins = coins
+                for pot, (state, instance_id) in zip(self.pots, pots):
+                    pot.state = state
+                    pot.instance_id = instance_id
+                self.shop.refresh_at = refresh_at
+                self.shop.slots = slots
+                for slot, (stock, purchases) in zip(slots, slot_counts):
+                    slot.stock = stock
+                    slot.purchases_this_roll = purchases
+                self.plant_instances = plant_instances
+                for instance, values in self._instance_undo.values():
+                    for field, value in zip(PlantInstance.__slots__, values):
+                        setattr(instance, field, value)
+                self._ready_heap = ready_heap
+                # Views cached during the failed block must not be served again
+                self.touch_all()
+                raise
+            finally:
+                self._transaction_depth = 0
+                self._instance_undo = None
+            
+            if self._pending_events:
+                events, self._pending_events = self._pending_events, []
+                for hook in event_hooks:
+                    for event, data in events:
+                        hook(self.session_id, event, data)
+
+    def _remember_instance(self, instance_id: int, instance: 'PlantInstance'):
+        """Record an instance's fields the first time a transaction changes it, so a rollback can restore them"""
+        undo = self._instance_undo
+        if undo is not None and instance_id not in undo:
+            undo[instance_id] = (instance, tuple(getattr(instance, field) for field in PlantInstance.__slots__))
+
+    def emit(self, event: str, data: Dict[str, Any]):
+        """Queue a game event for listeners; free when nobody is listening"""
+        if event_hooks and self.session_id:
+            self._pending_events.append((event, data))
+
+    def next_event_at(self) -> float:
+        """When the next time-driven change (shop refresh or a plant ripening) is due"""
+        with self.lock:
+            heap = self._ready_heap
+            # Drop entries for plants that were burned or replanted since being queued
+            while heap and self.pots[heap[0][1]].instance_id != heap[0][2]:
+                heapq.heappop(heap)
+            if heap:
+                return min(self.shop.refresh_at, heap[0][0])
+            return self.shop.refresh_at
+
+    def allocate_instance_id(self) -> int:
+        """Next plant instance ID for this player"""
+        instance_id = self.next_instance_id
+        self.next_instance_id += 1
+        return instance_id
+
+    def compact(self) -> int:
+        """Drop plant instances no pot holds and stale ready-queue entries, returning how many were dropped.
+
+        Dicts never shrink on delete, so the instance map is rebuilt at its
+        live size as well. Nothing a client can see changes, so no versions
+        are bumped.
+        """
+        with self.lock:
+            live = {pot.instance_id for pot in self.pots if pot.instance_id is not None}
+            dropped = len(self.plant_instances) - len(live & self.plant_instances.keys())
+            if dropped:
+                self.plant_instances = {k: v for k, v in self.plant_instances.items() if k in live}
+            
+            pots = self.pots
+            heap = [entry for entry in self._ready_heap
+                    if pots[entry[1]].state == 'growing' and pots[entry[1]].instance_id == entry[2]]
+            if len(heap) != len(self._ready_heap):
+                dropped += len(self._ready_heap) - len(heap)
+                heapq.heapify(heap)
+                self._ready_heap = heap
+            return dropped
+
+    def schedule_ready(self, pot_index: int, instance_id: int):
+        """Queue a newly planted instance for its ready transition"""
+        instance = self.plant_instances[instance_id]
+        ready_at = instance.planted_at + get_catalog().species[instance.species_id].grow_time
+        heapq.heappush(self._ready_heap, (ready_at, pot_index, instance_id))
+
+    def rebuild_ready_queue(self):
+        """Rebuild the ready-time queue from the pots, e.g. after loading or editing them directly"""
+        with self.lock:
+            self._ready_heap = []
+            for pot in self.pots:
+                if pot.state == 'growing' and pot.instance_id in self.plant_instances:
+                    self.schedule_ready(pot.index, pot.instance_id)
+
+    def _bump_version(self) -> int:
+        self.version += 1
+        # Tell persistence the first time this player changes since their last save
+        if not self.dirty:
+            self.dirty = True
+            for hook in change_hooks:
+                hook(self)
+        return self.version
+
+    def touch_coins(self):
+        """Record that the coin balance changed"""
+        self.coins_version = self._bump_version()
+
+    def touch_shop(self):
+        """Record that the shop slots changed"""
+        self.shop_version = self._bump_version()
+
+    def touch_pot(self, pot_index: int):
+        """Record that a pot (or the plant in it) changed"""
+        self.pot_versions[pot_index] = self._bump_version()
+
+    def touch_instance(self, instance_id: int):
+        """Record that a plant instance changed, touching the pot it lives in"""
+        for pot in self.pots:
+            if pot.instance_id == instance_id:
+                self.touch_pot(pot.index)
+
+    def sync_catalog(self):
+        """Invalidate every cached view once the species catalog has been reloaded"""
+        generation = get_catalog().generation
+        if self.catalog_generation != generation:
+            self.catalog_generation = generation
+            self.touch_all()
+
+    def touch_all(self):
+        """Mark everything changed, e.g. after editing objects directly"""
+        self.touch_coins()
+        self.touch_shop()
+        for pot in self.pots:
+            self.touch_pot(pot.index)
+
+    @property
+    def is_pristine(self) -> bool:
+        """Whether the player hasn't changed anything yet (shop refreshes don't count), so dropping it loses nothing"""
+        return self.coins_version == 0 and not any(self.pot_versions)
+
+    @property
+    def cursor(self) -> str:
+        """Delta cursor clients send back as `since`; the epoch tells versions from different runs apart"""
+        return f"{self.epoch}-{self.version}"
+
+    @property
+    def pots_version(self) -> int:
+        """Version at which any pot last changed"""
+        return max(self.pot_versions)
+
+    @transactional
     def reset_all_clipper_states(self):
         """Reset all clipper states - clippers don't persist between sessions"""
-        for instance in self.plant_instances.values():
+        for instance_id, instance in self.plant_instances.items():
+            if instance.clipper_unlocked or instance.clipper_level or instance.clipper_experience:
+                self.touch_instance(instance_id)
             instance.clipper_unlocked = False
             instance.clipper_level = 0
             instance.clipper_experience = 0
+
+    @transactional
+    def refresh_shop_if_due(self):
+        """Roll a new shop once the refresh time has passed"""
+        self.sync_catalog()
+        if time.time() >= self.shop.refresh_at:
+            self.shop.refresh_shop(self._rolls)
+            self.touch_shop()
+            self.emit('shop_refresh', {'refresh_at': self.shop.refresh_at, 'version': self.shop_version})
+    
+    @property
+    def rolls(self) -> RandomBuffer:
+        """This player's randomness buffer, created on first use"""
+        if self._rolls is None:
+            self._rolls = RandomBuffer()
+        return self._rolls
     
     def generate_rarity(self) -> Dict[str, str]:
         """Generate random rarity for a plant"""
-        import random
-        
-        # Size rarity: Normal 65%, Large 30%, Massive 5%
-        size_roll = random.random()
-        if size_roll < 0.65:
-            size = 'normal'
-        elif size_roll < 0.95:
-            size = 'large'
-        else:
-            size = 'massive'
-        
-        # Finish rarity: None 94%, Silver Shiny 3%, Golden 3%
-        finish_roll = random.random()
-        if finish_roll < 0.94:
-            finish = 'none'
-        elif finish_roll < 0.97:
-            finish = 'shiny'  # Silver shiny
-        else:
-            finish = 'golden'
-        
-        return {'size': size, 'finish': finish}
+        return roll_rarity(self.rolls)
+    
+    def generate_rarities(self, count: int) -> List[Dict[str, str]]:
+        """Generate rarities for many plants in one batch"""
+        return roll_rarities(count, self.rolls)
 
     def calculate_multiplier(self, rarity: Dict[str, str]) -> float:
         """Calculate sell price multiplier based on rarity"""
@@ -178,93 +620,82 @@ class GameState:
 
     def get_experience_required_for_level(self, level: int, species_id: str) -> int:
         """Calculate experience required for a specific level - MUCH HARDER PROGRESSION"""
-        species = PLANT_SPECIES[species_id]
-        
-        # Significantly higher base XP requirements
-        if species.seed_cost <= 120:
-            base_xp = 20  # Much harder even for cheap plants
-        elif species.seed_cost <= 600:
-            base_xp = 35  # Very hard for snap pea tier
-        elif species.seed_cost <= 2000:
-            base_xp = 50  # Extremely hard for mid-tier
-        elif species.seed_cost <= 20000:
-            base_xp = 75  # Brutally hard for expensive plants
-        elif species.seed_cost <= 100000:
-            base_xp = 110  # Insanely hard for rare plants
-        else:
-            base_xp = 150  # Nearly impossible for ultra-rare plants
-
-        # Exponential growth - gets dramatically harder at higher levels
-        import math
-        level_multiplier = 1.0 + (level - 1) * 0.6 + math.pow(level - 1, 1.4) * 0.15
-        
-        return int(base_xp * level_multiplier)
+        return get_level_table(species_id).required_for(level)
     
-    def add_plant_experience(self, instance_id: str, xp_amount: int) -> Dict[str, Any]:
+    @transactional
+    def add_plant_experience(self, instance_id: int, xp_amount: int) -> Dict[str, Any]:
         """Add experience to a plant and handle leveling up - INFINITE SCALING"""
         if instance_id not in self.plant_instances:
             return {"leveled_up": False, "new_level": 1}
         
         instance = self.plant_instances[instance_id]
+        self._remember_instance(instance_id, instance)
         old_level = instance.level
-        instance.experience += xp_amount
         
         # INFINITE LEVELING - NO CAP, NO RESET, JUST PURE PROGRESSION
-        while True:
-            required_xp = self.get_experience_required_for_level(instance.level + 1, instance.species_id)
-            if instance.experience >= required_xp:
-                instance.experience -= required_xp
-                instance.level += 1
-                
-                # Unlock clippers at level 25 but DON'T RESET
-                if instance.level == 25 and not getattr(instance, 'clipper_unlocked', False):
-                    instance.clipper_unlocked = True
-                    instance.clipper_level = 1
-                    instance.clipper_experience = 0
-            else:
-                break
+        table = get_level_table(instance.species_id)
+        instance.level, instance.experience = table.resolve(instance.level, instance.experience + xp_amount)
+        self.touch_instance(instance_id)
+        
+        # Unlock clippers at level 25 but DON'T RESET
+        if old_level < 25 <= instance.level and not instance.clipper_unlocked:
+            instance.clipper_unlocked = True
+            instance.clipper_level = 1
+            instance.clipper_experience = 0
+        
+        if instance.level > old_level:
+            self.emit('level_up', {
+                'instance_id': instance_id,
+                'kind': 'plant',
+                'old_level': old_level,
+                'new_level': instance.level,
+                'clipper_unlocked': instance.clipper_unlocked
+            })
         
         return {
             "leveled_up": instance.level > old_level,
             "old_level": old_level,
             "new_level": instance.level,
             "experience": instance.experience,
-            "clipper_unlocked": getattr(instance, 'clipper_unlocked', False),
-            "clipper_level": getattr(instance, 'clipper_level', 0)
+            "clipper_unlocked": instance.clipper_unlocked,
+            "clipper_level": instance.clipper_level
         }
     
-    def add_clipper_experience(self, instance_id: str, xp_amount: float) -> Dict[str, Any]:
+    @transactional
+    def add_clipper_experience(self, instance_id: int, xp_amount: float) -> Dict[str, Any]:
         """Add experience to a clipper and handle leveling up"""
         if instance_id not in self.plant_instances:
             return {"leveled_up": False, "new_level": 0}
         
         instance = self.plant_instances[instance_id]
         
-        # Initialize clipper attributes if not present
-        if not hasattr(instance, 'clipper_level'):
-            instance.clipper_level = 0
-        if not hasattr(instance, 'clipper_experience'):
-            instance.clipper_experience = 0
-        if not hasattr(instance, 'clipper_unlocked'):
-            instance.clipper_unlocked = False
-            
         # Only add XP if clippers are unlocked
         if not instance.clipper_unlocked:
             return {"leveled_up": False, "new_level": 0}
         
+        self._remember_instance(instance_id, instance)
         old_level = instance.clipper_level
         instance.clipper_experience += xp_amount
+        self.touch_instance(instance_id)
         
         # Check for clipper level up (max clipper level is 25)
-        while instance.clipper_level < 25:
+        while instance.clipper_level < MAX_CLIPPER_LEVEL:
             # Simpler XP requirement for clippers
-            required_xp = 100 * (instance.clipper_level ** 1.2)
+            required_xp = CLIPPER_XP_REQUIRED[instance.clipper_level]
             if instance.clipper_experience >= required_xp:
                 instance.clipper_experience -= required_xp
                 instance.clipper_level += 1
             else:
                 break
         
+        if instance.clipper_level > old_level:
+            self.emit('level_up', {
+                'instance_id': instance_id,
+                'kind': 'clipper',
+                'old_level': old_level,
+                'new_level': instance.clipper_level
+            })
+        
         return {
             "leveled_up": instance.clipper_level > old_level,
             "old_level": old_level,
@@ -272,85 +703,78 @@ class GameState:
             "experience": instance.clipper_experience
         }
     
-    def get_plant_level_multipliers(self, instance_id: str) -> Dict[str, float]:
+    def get_plant_level_multipliers(self, instance_id: int) -> Dict[str, float]:
         """Get all level-based multipliers for a plant - BALANCED INFINITE SCALING"""
         if instance_id not in self.plant_instances:
             return {"money": 1.0, "spawn_rate": 1.0, "special_chance": 1.0}
         
-        instance = self.plant_instances[instance_id]
-        level = instance.level
-        
-        # MONEY MULTIPLIER: Much more conservative scaling
-        # Level 1: 1x, Level 10: 1.3x, Level 25: 1.7x, Level 50: 2x, Level 100: 2.5x
-        # Uses much smaller square root multiplier for diminishing returns
-        import math
-        money_multiplier = 1.0 + math.sqrt(level - 1) * 0.15
-        
-        # SPAWN RATE: Much slower progression, especially at low levels
-        # Level 1: 0.7x (slower than base), Level 10: 1x, Level 25: 1.2x, Level 50: 1.4x, Level 100: 1.8x
-        if level <= 5:
-            spawn_rate_multiplier = 0.6 + (level - 1) * 0.08  # Very slow progression from 0.6x to 0.9x for levels 1-5
-        else:
-            spawn_rate_multiplier = 0.9 + math.sqrt(level - 5) * 0.1  # Gradual increase after level 5
+        return get_level_multipliers(self.plant_instances[instance_id].level)
+
+    @transactional
+    def apply_experience_batch(self, events: List[tuple]) -> List[Dict[str, Any]]:
+        """Apply many (instance_id, kind, xp_amount) events in one pass.
         
-        # SPECIAL CHANCE: Better rare beans but not insane
-        # Level 1: 1x, Level 25: 2x, Level 50: 3x, Level 100: 4x
-        special_chance_multiplier = 1.0 + math.log(level + 1) * 0.3
+        XP for the same instance and kind is summed first, so every instance
+        levels up at most once per batch. kind is 'plant' or 'clipper'.
+        """
+        totals: Dict[tuple, float] = {}
+        for instance_id, kind, xp_amount in events:
+            key = (instance_id, kind)
+            totals[key] = totals.get(key, 0) + xp_amount
         
-        return {
-            "money": money_multiplier,
-            "spawn_rate": spawn_rate_multiplier,
-            "special_chance": special_chance_multiplier
-        }
+        results = []
+        for (instance_id, kind), xp_amount in totals.items():
+            if kind == 'plant':
+                result = self.add_plant_experience(instance_id, xp_amount)
+                if instance_id in self.plant_instances:
+                    species_id = self.plant_instances[instance_id].species_id
+                    result['required_xp'] = self.get_experience_required_for_level(result['new_level'] + 1, species_id)
+            else:
+                result = self.add_clipper_experience(instance_id, xp_amount)
+            result['instance_id'] = instance_id
+            result['kind'] = kind
+            results.append(result)
+        return results
 
+    @transactional
     def buy_seed(self, slot_index: int, pot_index: int = -1) -> bool:
         """Buy a seed and optionally plant it in a pot. If pot_index is -1, add to inventory"""
-        print(f"🛒 DEBUG: buy_seed called with slot_index={slot_index}, pot_index={pot_index}")
-        
         if slot_index >= len(self.shop.slots):
-            print(f"❌ DEBUG: Invalid slot_index {slot_index}, shop has {len(self.shop.slots)} slots")
+            purchase_log.debug("❌ Invalid slot_index %s, shop has %s slots", slot_index, len(self.shop.slots))
             return False
         
         slot = self.shop.slots[slot_index]
-        print(f"📦 DEBUG: Slot found - species: {slot.species_id}, stock: {slot.stock}")
-        
         if slot.stock <= 0:
-            print(f"❌ DEBUG: No stock available, stock: {slot.stock}")
+            purchase_log.debug("❌ No stock available for %s", slot.species_id)
             return False
         
         # If pot_index is specified, check if pot is available
         if pot_index >= 0:
             if pot_index >= len(self.pots):
-                print(f"❌ DEBUG: Invalid pot_index {pot_index}, have {len(self.pots)} pots")
+                purchase_log.debug("❌ Invalid pot_index %s, have %s pots", pot_index, len(self.pots))
                 return False
             pot = self.pots[pot_index]
             if pot.state != 'empty':
-                print(f"❌ DEBUG: Pot {pot_index} is not empty, state: {pot.state}")
+                purchase_log.debug("❌ Pot %s is not empty, state: %s", pot_index, pot.state)
                 return False
         
         # Calculate price with repeat purchase tax
-        price = slot.base_price
-        if slot.purchases_this_roll > 0:
-            if slot.purchases_this_roll == 1:
-                price = int(price * 1.1)  # +10%
-            else:
-                price = int(price * 1.25)  # +25%
-        
-        print(f"💰 DEBUG: Price calculation - base: {slot.base_price}, final: {price}, player coins: {self.coins}")
-        
+        price = slot.current_price()
         if self.coins < price:
-            print(f"❌ DEBUG: Not enough coins, need: {price}, have: {self.coins}")
+            purchase_log.debug("❌ Not enough coins, need: %s, have: %s", price, self.coins)
             return False
         
         # Deduct coins and update slot
         self.coins -= price
         slot.stock -= 1
         slot.purchases_this_roll += 1
+        self.touch_coins()
+        self.touch_shop()
         
         if pot_index >= 0:
             # Plant directly in pot
             pot = self.pots[pot_index]
-            instance_id = f"plant_{time.time()}_{pot_index}"
+            instance_id = self.allocate_instance_id()
             rarity = self.generate_rarity()
             instance = PlantInstance(slot.species_id, time.time(), rarity)
             
@@ -358,29 +782,121 @@ class GameState:
             self.plant_instances[instance_id] = instance
             pot.instance_id = instance_id
             pot.state = 'growing'
+            self.schedule_ready(pot_index, instance_id)
+            self.touch_pot(pot_index)
+            self.emit('planted', {
+                'pot_index': pot_index,
+                'instance_id': instance_id,
+                'ready_at': instance.planted_at + get_catalog().species[instance.species_id].grow_time
+            })
         else:
             # Add to inventory (handled client-side for now)
             pass
         
         return True
 
+    @transactional
+    def plant_from_inventory(self, species_name: str, pot_index: int) -> Dict[str, Any]:
+        """Plant a seed the player already owns into an empty pot"""
+        if pot_index < 0 or pot_index >= len(self.pots):
+            return {"success": False, "message": "Pot index out of range"}
+        
+        pot = self.pots[pot_index]
+        if pot.state != 'empty':
+            return {"success": False, "message": "Pot is not available for planting"}
+        
+        species = get_catalog().by_name.get(species_name)
+        if species is None:
+            return {"success": False, "message": "Species not found"}
+        species_id = species.id
+        
+        instance_id = self.allocate_instance_id()
+        rarity = self.generate_rarity()
+        instance = self.plant_instances[instance_id] = PlantInstance(species_id, time.time(), rarity)
+        pot.instance_id = instance_id
+        pot.state = 'growing'
+        self.schedule_ready(pot_index, instance_id)
+        self.touch_pot(pot_index)
+        self.emit('planted', {
+            'pot_index': pot_index,
+            'instance_id': instance_id,
+            'ready_at': instance.planted_at + species.grow_time
+        })
+        
+        return {"success": True, "instance_id": instance_id}
+
+    @transactional
+    def burn_plant(self, pot_index: int) -> Dict[str, Any]:
+        """Destroy whatever is planted in a pot and empty it"""
+        if pot_index < 0 or pot_index >= len(self.pots):
+            return {"success": False, "message": "Pot index out of range"}
+        
+        pot = self.pots[pot_index]
+        if pot.state == 'empty':
+            return {"success": False, "message": "Pot is already empty"}
+        
+        burned_instance_id = pot.instance_id
+        if pot.instance_id and pot.instance_id in self.plant_instances:
+            self._remember_instance(pot.instance_id, self.plant_instances[pot.instance_id])
+            del self.plant_instances[pot.instance_id]
+        
+        pot.instance_id = None
+        pot.state = 'empty'
+        self.touch_pot(pot_index)
+        
+        return {"success": True, "instance_id": burned_instance_id}
+
+    @transactional
+    def set_coins(self, coins: int) -> int:
+        """Overwrite the player's coin balance (client-side money sync), returning the old one"""
+        old_coins = self.coins
+        self.coins = coins
+        if coins != old_coins:
+            self.touch_coins()
+        return old_coins
+
     def update_plants(self):
-        """Update all growing plants"""
+        """Update growing plants whose ready time has passed - O(1) when none are due"""
         current_time = time.time()
         
-        for pot in self.pots:
-            if pot.state == 'growing' and pot.instance_id:
-                instance = self.plant_instances[pot.instance_id]
-                species = PLANT_SPECIES[instance.species_id]
-                
-                # Check if plant is ready
-                if current_time >= instance.planted_at + species.grow_time:
+        with self.lock:
+            self.sync_catalog()
+            heap = self._ready_heap
+            if not heap or heap[0][0] > current_time:
+                return
+            
+            with self.transaction():
+                while heap and heap[0][0] <= current_time:
+                    ready_at, pot_index, instance_id = heapq.heappop(heap)
+                    pot = self.pots[pot_index]
+                    
+                    # Skip plants that were burned or replanted after being queued
+                    if pot.state != 'growing' or pot.instance_id != instance_id:
+                        continue
+                    instance = self.plant_instances.get(instance_id)
+                    if instance is None:
+                        continue
+                    
                     instance.ready_state = 'ready'
                     pot.state = 'ready'
+                    self.touch_pot(pot_index)
+                    self.emit('plant_ready', {
+                        'pot_index': pot_index,
+                        'instance_id': instance_id,
+                        'species_id': instance.species_id
+                    })
 
     def save_game(self) -> str:
         """Save game state to JSON"""
-        save_data = {
+        return json.dumps(self.save_data())
+
+    def save_data(self) -> Dict[str, Any]:
+        """Snapshot of everything that persists, as plain dicts and lists"""
+        with self.lock:
+            return self._save_data()
+
+    def _save_data(self) -> Dict[str, Any]:
+        return {
             'coins': self.coins,
             'pots': [{'index': p.index, 'state': p.state, 'instance_id': p.instance_id} for p in self.pots],
             'plant_instances': {
@@ -406,46 +922,62 @@ class GameState:
                     } for s in self.shop.slots
                 ]
             },
-            'last_save': time.time()
+            'next_instance_id': self.next_instance_id,
+            'last_save': time.time(),
+            'last_seen': self.last_seen
         }
-        return json.dumps(save_data)
 
-# Plant species definitions with rarity categories
-PLANT_SPECIES = {
-    # Common rarity
-    'beanstalk': PlantSpecies('beanstalk', 'Beanstalk', 'picker', 25, 14, 120, 'common'),
-    'snap_pea': PlantSpecies('snap_pea', 'Snap Pea', 'picker', 75, 90, 560, 'common'),
-    
-    # Uncommon rarity
-    'jellybean_vine': PlantSpecies('jellybean_vine', 'Jellybean Vine', 'picker', 90, 170, 1285, 'uncommon'),
-    'bamboo_bean': PlantSpecies('bamboo_bean', 'Bamboo-Bean', 'cutter', 120, 300, 5410, 'uncommon'),
-    'coffee_beanstalk': PlantSpecies('coffee_beanstalk', 'Coffee Beanstalk', 'picker', 120, 540, 9300, 'uncommon'),
-    
-    # Rare rarity
-    'thunder_pod': PlantSpecies('thunder_pod', 'Thunder Pod', 'cutter', 150, 970, 17000, 'rare'),
-    'frost_pea': PlantSpecies('frost_pea', 'Frost Pea', 'picker', 150, 2700, 31000, 'rare'),
-    'choco_vine': PlantSpecies('choco_vine', 'Choco Vine', 'picker', 180, 3500, 35200, 'rare'),
-    
-    # Legendary rarity
-    'ironvine': PlantSpecies('ironvine', 'Ironvine', 'cutter', 210, 15300, 90000, 'legendary'),
-    'honeyvine': PlantSpecies('honeyvine', 'Honeyvine', 'picker', 180, 19300, 180000, 'legendary'),
-    'sunbean': PlantSpecies('sunbean', 'Sunbean', 'picker', 240, 25500, 193000, 'legendary'),
-    
-    # Mythical rarity
-    'moonbean': PlantSpecies('moonbean', 'Moonbean', 'picker', 240, 43000, 253000, 'mythical'),
-    'cloud_creeper': PlantSpecies('cloud_creeper', 'Cloud Creeper', 'picker', 270, 49000, 295000, 'mythical'),
-    
-    # Ultra-Mythical rarity
-    'royal_stalk': PlantSpecies('royal_stalk', 'Royal Stalk', 'cutter', 300, 86000, 465000, 'ultra_mythical'),
-    'crystal_bean': PlantSpecies('crystal_bean', 'Crystal Bean', 'picker', 300, 120000, 600000, 'ultra_mythical'),
-    'neon_soy': PlantSpecies('neon_soy', 'Neon Soy', 'cutter', 330, 160000, 570000, 'ultra_mythical'),
-    
-    # Godly rarity
-    'vinecorn': PlantSpecies('vinecorn', 'Vinecorn', 'cutter', 240, 210000, 1200000, 'godly'),
-    'fire_pod': PlantSpecies('fire_pod', 'Fire Pod', 'cutter', 360, 280000, 1800000, 'godly'),
-    'shadow_bean': PlantSpecies('shadow_bean', 'Shadow Bean', 'picker', 300, 320000, 3182000, 'godly'),
-    'prism_stalk': PlantSpecies('prism_stalk', 'Prism Stalk', 'picker', 480, 340000, 5620000, 'godly')
-}
+    @classmethod
+    def from_save(cls, save_json: str) -> 'GameState':
+        """Rebuild a game state from save_game() output"""
+        return cls.from_save_data(json.loads(save_json))
+
+    @classmethod
+    def from_save_data(cls, data: Dict[str, Any]) -> 'GameState':
+        """Rebuild a game state from save_data() output"""
+        state = cls()
+        state.coins = data['coins']
+        
+        state.next_instance_id = data.get('next_instance_id', 1)
+        
+        # JSON turns integer keys into strings, and older saves used string IDs
+        # like "plant_<time>_<pot>"; the latter are given fresh integer IDs
+        saved_ids = {saved_id: parse_instance_id(saved_id) for saved_id in data['plant_instances']}
+        state.next_instance_id = max([state.next_instance_id] + [i + 1 for i in saved_ids.values() if i])
+        renamed = {saved_id: state.allocate_instance_id() for saved_id, i in saved_ids.items() if i is None}
+        for saved_id, saved in data['plant_instances'].items():
+            instance_id = saved_ids[saved_id] or renamed[saved_id]
+            instance = PlantInstance(saved['species_id'], saved['planted_at'], intern_rarity(saved['rarity']))
+            instance.picks_done = saved['picks_done']
+            instance.ready_state = saved['ready_state']
+            instance.level = saved['level']
+            instance.experience = saved['experience']
+            state.plant_instances[instance_id] = instance
+        
+        for saved in data['pots']:
+            while saved['index'] >= len(state.pots):
+                state.pots.append(Pot(len(state.pots)))
+                state.pot_versions.append(0)
+            pot = state.pots[saved['index']]
+            pot.state = saved['state']
+            saved_id = saved['instance_id']
+            pot.instance_id = renamed[saved_id] if saved_id in renamed else parse_instance_id(saved_id)
+        
+        state.shop.refresh_at = data['shop']['refresh_at']
+        state.shop.slots = []
+        for saved in data['shop']['slots']:
+            slot = ShopSlot(saved['species_id'], saved['stock'], saved['base_price'])
+            slot.purchases_this_roll = saved['purchases_this_roll']
+            state.shop.slots.append(slot)
+        
+        state.last_save = data.get('last_save', time.time())
+        state.last_seen = data.get('last_seen', state.last_save)
+        state.rebuild_ready_queue()
+        state.compact()
+        return state
+
+# Plant species by id, always from the current catalog (see Catalog.py and plantdata.json)
+PLANT_SPECIES = CurrentSpecies()
 
 # Rarity spawn chances and quantity ranges - Balanced progression
 RARITY_CONFIG = {
@@ -458,58 +990,405 @@ RARITY_CONFIG = {
     'godly': {'spawn_chance': 0.005, 'min_qty': 1, 'max_qty': 1}          # 0.5% chance, 1 stock only
 }
 
-# Global game instance
-game_state = None
+SHOP_MAX_SLOTS = 8
+SHOP_MAX_ATTEMPTS = 50  # Rolls per refresh before the shop settles for fewer slots
+SHOP_FORCED_COMMON_BELOW = 4  # A roll that spawns nothing adds a common while the shop has fewer slots
+
+class ShopSampler:
+    """Precomputed tables for rolling a shop in a bounded number of steps.
+    
+    Each shop roll shuffles the rarities and spawns the first one whose
+    spawn_chance hits and that still has unused species. For a given set of
+    rarities with species left, that makes the spawned rarity a fixed
+    distribution: P(r) = p_r * integral over u in [0, 1] of prod(1 - p_s * u)
+    over the other rarities s. Those distributions are built once as alias
+    tables for every set (and for the forced-common variant). A refresh then
+    draws the run of empty rolls before each slot from a geometric
+    distribution instead of rolling them one by one.
+    """
+    def __init__(self, species: Dict[str, PlantSpecies] = None, rarity_config: Dict[str, Dict[str, Any]] = None):
+        # Samplers built from the current catalog are rebuilt once it is reloaded
+        self.catalog_generation = get_catalog().generation if species is None else None
+        species = PLANT_SPECIES if species is None else species
+        self.rarity_config = RARITY_CONFIG if rarity_config is None else rarity_config
+        self.rarities = list(self.rarity_config)
+        self.species_by_rarity = {rarity: [s.id for s in species.values() if s.rarity == rarity]
+                                  for rarity in self.rarities}
+        self.seed_costs = {s.id: s.seed_cost for s in species.values()}
+        # Per rarity index: species ids, and (min_qty, number of possible quantities)
+        self.species_lists = [self.species_by_rarity[r] for r in self.rarities]
+        self.quantities = [(config['min_qty'], config['max_qty'] - config['min_qty'] + 1)
+                           for config in self.rarity_config.values()]
+        self.full_mask = sum(1 << i for i, ids in enumerate(self.species_lists) if ids)
+        self.common_bit = 1 << self.rarities.index('common') if 'common' in self.rarity_config else 0
+        
+        # (mask of rarities with species left, forced common) -> (spawn chance, alias probabilities, aliases)
+        self.tables: Dict[tuple, tuple] = {}
+        for mask in range(1 << len(self.rarities)):
+            weights = self._spawn_weights(mask)
+            spawn_chance = sum(weights)
+            self.tables[(mask, False)] = (spawn_chance,) + self._alias_table(weights)
+            if mask & self.common_bit:
+                forced = list(weights)
+                forced[self.rarities.index('common')] += 1 - spawn_chance
+                self.tables[(mask, True)] = (1.0,) + self._alias_table(forced)
+    
+    def _spawn_weights(self, mask: int) -> List[float]:
+        """Probability that one roll spawns each rarity, given which rarities have species left"""
+        chances = [self.rarity_config[r]['spawn_chance'] if mask >> i & 1 else 0.0
+                   for i, r in enumerate(self.rarities)]
+        weights = []
+        for i, chance in enumerate(chances):
+            # Coefficients of prod(1 - p_s * u) over the other rarities, integrated over [0, 1]
+            poly = [1.0]
+            for j, other in enumerate(chances):
+                if j != i and other:
+                    poly = [a - other * b for a, b in zip(poly + [0.0], [0.0] + poly)]
+            weights.append(chance * sum(c / (k + 1) for k, c in enumerate(poly)))
+        return weights
+    
+    @staticmethod
+    def _alias_table(weights: List[float]) -> tuple:
+        """Vose alias table for drawing an index proportional to weights"""
+        n = len(weights)
+        total = sum(weights)
+        if total <= 0:
+            return [1.0] * n, list(range(n))
+        scaled = [w * n / total for w in weights]
+        probabilities, aliases = [1.0] * n, list(range(n))
+        small = [i for i, w in enumerate(scaled) if w < 1]
+        large = [i for i, w in enumerate(scaled) if w >= 1]
+        while small and large:
+            low, high = small.pop(), large.pop()
+            probabilities[low], aliases[low] = scaled[low], high
+            scaled[high] -= 1 - scaled[low]
+            (small if scaled[high] < 1 else large).append(high)
+        return probabilities, aliases
+    
+    def draw(self, rng=None) -> List['ShopSlot']:
+        """Roll a fresh set of shop slots; same distribution as rolling attempt by attempt"""
+        uniform = (rng or random).random
+        remaining = [list(ids) for ids in self.species_lists]
+        mask = self.full_mask
+        slots: List[ShopSlot] = []
+        attempts = 0
+        
+        while len(slots) < SHOP_MAX_SLOTS and attempts < SHOP_MAX_ATTEMPTS and mask:
+            forced = len(slots) < SHOP_FORCED_COMMON_BELOW and bool(mask & self.common_bit)
+            spawn_chance, probabilities, aliases = self.tables[(mask, forced)]
+            
+            # Rolls that spawn nothing before the next slot are geometric
+            misses = 0
+            if spawn_chance < 1:
+                if spawn_chance <= 0:
+                    break
+                misses = int(math.log(1.0 - uniform()) / math.log(1.0 - spawn_chance))
+            attempts += misses + 1
+            if attempts > SHOP_MAX_ATTEMPTS:
+                break
+            
+            x = uniform() * len(probabilities)
+            index = int(x)
+            if x - index >= probabilities[index]:
+                index = aliases[index]
+            
+            available = remaining[index]
+            species_id = available.pop(int(uniform() * len(available)))
+            if not available:
+                mask &= ~(1 << index)
+            min_qty, span = self.quantities[index]
+            slots.append(ShopSlot(species_id, min_qty + int(uniform() * span), self.seed_costs[species_id]))
+        return slots
+
+# Shared shop sampler, built on first refresh
+_shop_sampler: Optional[ShopSampler] = None
 
-def initialize_game():
-    """Initialize the game state"""
-    global game_state
-    game_state = GameState()
-    return game_state
+def get_shop_sampler() -> ShopSampler:
+    """Shop sampler for the current species and rarity tables"""
+    global _shop_sampler
+    if _shop_sampler is None or _shop_sampler.catalog_generation != get_catalog().generation:
+        _shop_sampler = ShopSampler()
+    return _shop_sampler
 
-def get_game_state():
-    """Get current game state"""
-    global game_state
-    if game_state is None:
-        game_state = initialize_game()
-    return game_state
+# Rebuild the sampler as soon as the species change, not on some player's next shop refresh
+catalog_hooks.append(lambda catalog: get_shop_sampler())
+
+class SessionStore:
+    """Session-keyed store of independent GameState objects.
+
+    Players are spread over a fixed number of stripes, each guarded by its own
+    lock, so creating one player's garden never blocks lookups for another.
+    
+    With a loader and max_players set, the store acts as a cache in front of
+    storage: unknown players are loaded on demand, and once a stripe is over
+    its share of max_players the least recently used idle players are dropped
+    (persistence keeps unsaved ones until they are written).
+
+    Gardens handed to visitors without a session are anonymous until the
+    player changes something; only max_anonymous of those are kept, dropping
+    the oldest untouched ones first.
+    """
+    def __init__(self, num_stripes: int = 64, max_players: Optional[int] = None,
+                 loader: Optional[Callable[[str], Optional['GameState']]] = None,
+                 min_idle_seconds: float = 60.0, max_anonymous: int = 1000):
+        self.num_stripes = num_stripes
+        self._locks = [threading.Lock() for _ in range(num_stripes)]
+        self._stripes: List[Dict[str, GameState]] = [{} for _ in range(num_stripes)]
+        self.max_players = max_players
+        self.loader = loader
+        self.min_idle_seconds = min_idle_seconds
+        self.evictions = 0
+        self.max_anonymous = max_anonymous
+        self._anonymous: 'OrderedDict[str, GameState]' = OrderedDict()  # Oldest first
+        self._anonymous_lock = threading.Lock()
+
+    def _stripe_index(self, session_id: str) -> int:
+        return hash(session_id) % self.num_stripes
+
+    def get(self, session_id: str) -> Optional[GameState]:
+        """Get a player's state without creating it"""
+        return self._stripes[self._stripe_index(session_id)].get(session_id)
+
+    def get_or_create(self, session_id: str) -> GameState:
+        """Get a player's state, creating a fresh garden on first visit"""
+        return self.lookup(session_id, create=True)
+
+    def lookup(self, session_id: str, create: bool = False) -> Optional[GameState]:
+        """Get a player's state from memory or storage; None for an unknown player unless create is set"""
+        index = self._stripe_index(session_id)
+        stripe = self._stripes[index]
+
+        # Fast path: dict reads are atomic, only creation needs the stripe lock
+        state = stripe.get(session_id)
+        if state is not None:
+            state.last_access = time.monotonic()
+            return state
+
+        # Cold players are loaded outside the stripe lock so storage reads never block the stripe
+        loaded = self.loader(session_id) if self.loader is not None else None
+        if loaded is None and not create:
+            return None
+
+        with self._locks[index]:
+            state = stripe.get(session_id)
+            if state is None:
+                state = loaded if loaded is not None else GameState()
+                state.session_id = session_id
+                stripe[session_id] = state
+                if self.max_players:
+                    self._evict_idle(stripe)
+        state.last_access = time.monotonic()
+        return state
+
+    def _evict_idle(self, stripe: Dict[str, GameState]):
+        """Drop least recently used idle players once a stripe is over capacity; caller holds its lock"""
+        capacity = max(1, self.max_players // self.num_stripes)
+        if len(stripe) <= capacity:
+            return
+        
+        # Evict down to 90% so eviction work is amortized over many inserts
+        cutoff = time.monotonic() - self.min_idle_seconds
+        idle = [(state.last_access, session_id) for session_id, state in stripe.items()
+                if state.last_access < cutoff]
+        for _, session_id in heapq.nsmallest(len(stripe) - int(capacity * 0.9), idle):
+            del stripe[session_id]
+            self.evictions += 1
+
+    def create_anonymous(self, session_id: str) -> GameState:
+        """Give a new visitor a fresh garden, dropping the oldest untouched ones once there are too many"""
+        state = self.get_or_create(session_id)
+        with self._anonymous_lock:
+            self._anonymous[session_id] = state
+            while len(self._anonymous) > self.max_anonymous:
+                old_id, old_state = self._anonymous.popitem(last=False)
+                # Players who have changed something are kept like any other player
+                if old_state.is_pristine:
+                    index = self._stripe_index(old_id)
+                    with self._locks[index]:
+                        if self._stripes[index].get(old_id) is old_state:
+                            del self._stripes[index][old_id]
+                            self.evictions += 1
+        return state
+
+    def put(self, session_id: str, state: GameState):
+        """Replace a player's state"""
+        index = self._stripe_index(session_id)
+        state.session_id = session_id
+        with self._locks[index]:
+            self._stripes[index][session_id] = state
+
+    def remove(self, session_id: str) -> Optional[GameState]:
+        """Drop a player's state from the store"""
+        index = self._stripe_index(session_id)
+        with self._locks[index]:
+            return self._stripes[index].pop(session_id, None)
+
+    def most_recent(self) -> Optional[str]:
+        """Session id of the player who was active last, or None if the store is empty"""
+        latest = None
+        for stripe in self._stripes:
+            for session_id, state in list(stripe.items()):
+                if latest is None or state.last_access > latest[0]:
+                    latest = (state.last_access, session_id)
+        return latest[1] if latest else None
+
+    def session_ids(self) -> List[str]:
+        """Snapshot of all known session ids"""
+        ids = []
+        for stripe in self._stripes:
+            ids.extend(list(stripe.keys()))
+        return ids
+
+    def states(self) -> List[GameState]:
+        """Snapshot of all player states"""
+        states = []
+        for stripe in self._stripes:
+            states.extend(list(stripe.values()))
+        return states
+
+    def __len__(self) -> int:
+        return sum(len(stripe) for stripe in self._stripes)
+
+    def __contains__(self, session_id: str) -> bool:
+        return session_id in self._stripes[self._stripe_index(session_id)]
+
+# Callbacks receiving (session_id, event, data) for every committed game event
+event_hooks: List[Callable[[str, str, Dict[str, Any]], None]] = []
+
+# Callbacks receiving a GameState the first time it changes after being saved
+change_hooks: List[Callable[[GameState], None]] = []
+
+# Session used by local tools (console commands, slot machine) that have no cookie
+DEFAULT_SESSION_ID = 'default'
+SESSION_COOKIE_NAME = 'beanstock_session'
+SESSION_MAX_AGE = 60 * 60 * 24 * 365  # Keep gardens for a year
+
+# Global store of all player gardens
+session_store = SessionStore()
+
+def new_session_id() -> str:
+    """Generate an unguessable session token"""
+    return secrets.token_urlsafe(24)
+
+def is_valid_session_id(session_id: Optional[str]) -> bool:
+    """Check a client-supplied session token before using it as a key"""
+    if not session_id or len(session_id) > 64 or session_id == DEFAULT_SESSION_ID:
+        return False
+    return all(c.isalnum() or c in '-_' for c in session_id)
+
+def parse_instance_id(value: Any) -> Optional[int]:
+    """A plant instance ID from a request or save (an int or its decimal string), or None if it isn't one"""
+    if isinstance(value, int) and not isinstance(value, bool):
+        return value if value > 0 else None
+    if isinstance(value, str) and value.isascii() and value.isdigit():
+        return int(value) or None
+    return None
+
+def parse_xp_amount(value: Any) -> Optional[float]:
+    """An experience amount from a request (a finite number, zero or more), or None if it isn't one"""
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        return None
+    return value if math.isfinite(value) and value >= 0 else None
+
+def resolve_session(session_id: Optional[str]):
+    """Map a session cookie to (session_id, state, is_new), issuing a new id if needed.
+
+    Only ids this server issued (still in memory or in storage) are honored, so
+    a client can't pick its own id or take over the console's default garden.
+    """
+    state = session_store.lookup(session_id) if is_valid_session_id(session_id) else None
+    if state is not None:
+        return session_id, state, False
+    session_id = new_session_id()
+    return session_id, session_store.create_anonymous(session_id), True
+
+def initialize_game(session_id: str = DEFAULT_SESSION_ID):
+    """Initialize a fresh game state for a session"""
+    state = GameState()
+    session_store.put(session_id, state)
+    return state
+
+def get_game_state(session_id: str = DEFAULT_SESSION_ID):
+    """Get current game state for a session"""
+    return session_store.get_or_create(session_id)
 
 # Web API endpoints (for JavaScript integration)
-def get_shop_data():
+def get_shop_data(state: Optional[GameState] = None):
     """Get current shop data for frontend"""
-    state = get_game_state()
+    if state is None:
+        state = get_game_state()
     
+    with state.lock:
+        return _build_shop_data(state)
+
+def _build_shop_data(state: GameState):
+    """Build the shop view; caller must hold the player's lock"""
     # Check if shop needs refresh
-    current_time = time.time()
-    if current_time >= state.shop.refresh_at:
-        state.shop.refresh_shop()
+    state.refresh_shop_if_due()
     
-    return {
-        'slots': [
+    # Slot dicts only change when the shop version does
+    cached = state._shop_view_cache
+    if cached is None or cached[0] != state.shop_version:
+        fragments = get_catalog().shop_fragments
+        slots = [
             {
-                'species_id': slot.species_id,
-                'species_name': PLANT_SPECIES[slot.species_id].name,
-                'species_type': PLANT_SPECIES[slot.species_id].type,
-                'rarity': PLANT_SPECIES[slot.species_id].rarity,
+                **fragments[slot.species_id],
                 'stock': slot.stock,
                 'price': slot.base_price * (1.1 if slot.purchases_this_roll == 1 else 1.25 if slot.purchases_this_roll > 1 else 1.0),
                 'base_price': slot.base_price,
-                'purchases': slot.purchases_this_roll,
-                'grow_time': PLANT_SPECIES[slot.species_id].grow_time,
-                'base_sell': PLANT_SPECIES[slot.species_id].base_sell
+                'purchases': slot.purchases_this_roll
             } for slot in state.shop.slots
-        ],
+        ]
+        cached = state._shop_view_cache = (state.shop_version, slots)
+    
+    return {
+        'slots': cached[1],
         'refresh_at': state.shop.refresh_at,
-        'time_until_refresh': max(0, state.shop.refresh_at - time.time())
+        'time_until_refresh': max(0, state.shop.refresh_at - time.time()),
+        'version': state.shop_version
     }
 
-def get_pots_data():
-    """Get current pots data for frontend"""
-    state = get_game_state()
+def get_pots_data(state: Optional[GameState] = None, since: int = -1):
+    """Get current pots data for frontend (only pots changed after `since` if given)"""
+    if state is None:
+        state = get_game_state()
+    
+    with state.lock:
+        return _build_pots_data(state, since)
+
+def _build_pots_data(state: GameState, since: int = -1):
+    """Build the pots view (only pots changed after `since`); caller must hold the player's lock"""
     state.update_plants()
     
+    # Work out which pots need rebuilding, then compute their level stats in one batch
+    stale_pots = []
+    for pot in state.pots:
+        pot_version = state.pot_versions[pot.index]
+        if pot_version <= since:
+            continue
+        cached = state._pot_view_cache.get(pot.index)
+        if cached is None or cached[0] != pot_version:
+            stale_pots.append(pot)
+    
+    catalog = get_catalog()
+    stat_keys = []
+    for pot in stale_pots:
+        if pot.instance_id and pot.instance_id in state.plant_instances:
+            instance = state.plant_instances[pot.instance_id]
+            stat_keys.append((instance.level, get_experience_base(catalog.species[instance.species_id].seed_cost)))
+    level_stats = dict(zip(stat_keys, get_bulk_level_stats(stat_keys)))
+    
     pots_data = []
     for pot in state.pots:
+        pot_version = state.pot_versions[pot.index]
+        if pot_version <= since:
+            continue
+        
+        cached = state._pot_view_cache.get(pot.index)
+        if cached is not None and cached[0] == pot_version:
+            pots_data.append(cached[1])
+            continue
+        
         pot_data = {
             'index': pot.index,
             'state': pot.state,
@@ -518,31 +1397,76 @@ def get_pots_data():
         
         if pot.instance_id and pot.instance_id in state.plant_instances:
             instance = state.plant_instances[pot.instance_id]
-            species = PLANT_SPECIES[instance.species_id]
-            multipliers = state.get_plant_level_multipliers(pot.instance_id)
-            required_xp = state.get_experience_required_for_level(instance.level + 1, instance.species_id)
+            species = catalog.species[instance.species_id]
+            multipliers, required_xp = level_stats[(instance.level, get_experience_base(species.seed_cost))]
             
+            pot_data.update(catalog.pot_fragments[species.id])
             pot_data.update({
-                'species_name': species.name,
-                'species_type': species.type,
                 'planted_at': instance.planted_at,
                 'picks_done': instance.picks_done,
                 'rarity': instance.rarity,
                 'ready_state': instance.ready_state,
-                'grow_time': species.grow_time,
                 'level': instance.level,
                 'experience': instance.experience,
                 'required_xp': required_xp,
-                'clipper_unlocked': getattr(instance, 'clipper_unlocked', False),
-                'clipper_level': getattr(instance, 'clipper_level', 0),
-                'clipper_experience': getattr(instance, 'clipper_experience', 0),
+                'clipper_unlocked': instance.clipper_unlocked,
+                'clipper_level': instance.clipper_level,
+                'clipper_experience': instance.clipper_experience,
                 'multipliers': multipliers
             })
         
+        state._pot_view_cache[pot.index] = (pot_version, pot_data)
         pots_data.append(pot_data)
     
     return pots_data
 
+def get_state_etag(state: GameState, part: str = 'all') -> str:
+    """Opaque validator for a player's state (or just its 'pots' or 'shop' part)"""
+    with state.lock:
+        state.update_plants()
+        state.refresh_shop_if_due()
+        version = {'all': state.version, 'pots': state.pots_version, 'shop': state.shop_version}[part]
+        return f"{state.epoch}-{part}-{version}"
+
+def parse_since(state: GameState, since: Optional[str]) -> Optional[int]:
+    """The version a client's delta cursor ("<epoch>-<version>") asks for changes after.
+
+    None if no cursor was sent. A cursor from another epoch (a server restart,
+    or the garden being evicted and reloaded), one ahead of this state, or one
+    that doesn't parse gets -1, meaning everything.
+    """
+    if since is None:
+        return None
+    epoch, _, version = since.rpartition('-')
+    if epoch != state.epoch or not (version.isascii() and version.isdigit()) or int(version) > state.version:
+        return -1
+    return int(version)
+
+def get_state_delta(state: GameState, since: int) -> Optional[Dict[str, Any]]:
+    """Everything that changed after version `since`, or None if nothing did.
+    
+    Only changed pots are listed; 'shop' and 'coins' are included only when
+    they changed. Clients send the returned 'cursor' back as the next `since`
+    (see parse_since); -1 gets everything.
+    """
+    with state.lock:
+        state.update_plants()
+        state.refresh_shop_if_due()
+        if since >= state.version and since >= 0:
+            return None
+        
+        delta = {
+            'version': state.version,
+            'cursor': state.cursor,
+            'since': since,
+            'pots': _build_pots_data(state, since)
+        }
+        if state.coins_version > since:
+            delta['coins'] = state.coins
+        if state.shop_version > since:
+            delta['shop'] = _build_shop_data(state)
+        return delta
+
 if __name__ == "__main__":
     # Initialize game for testing
     game = initialize_game()
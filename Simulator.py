@@ -0,0 +1,319 @@
+"""
+Grow A Beanstock - Economy Simulator
+Plays synthetic players against GameState directly, with no server or
+browser, to balance the economy and plan capacity. Players are split across a
+process pool; each worker steps its players in lockstep on a simulated clock.
+Bean picking isn't replayed bean by bean: each step credits the expected coins
+and XP from Offline.py's spawn rates and bean values, so a step can span a
+whole shop rotation.
+
+Usage:
+    python Simulator.py --players 1000 --hours 100 --strategy roi
+    python Simulator.py --players 100000 --hours 1 --strategy cheapest --json
+"""
+
+import argparse
+import json
+import math
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple
+
+import Offline
+import Setup
+from Catalog import get_catalog
+from Logs import configure_logging
+from Setup import GameState, PLANT_SPECIES, get_level_table
+
+SIMULATION_EPOCH = 1_700_000_000.0  # Simulated wall clock start, fixed for reproducible runs
+CURVE_SAMPLE_PLAYERS = 256  # Players per worker whose coins feed the percentiles
+
+
+class SimulatedClock:
+    """Stand-in for the time module inside a simulation worker"""
+    def __init__(self, start: float = SIMULATION_EPOCH):
+        self.now = start
+
+    def time(self) -> float:
+        return self.now
+
+    def monotonic(self) -> float:
+        return self.now
+
+    def advance(self, seconds: float):
+        self.now += seconds
+
+    def __getattr__(self, name):
+        return getattr(time, name)
+
+
+@lru_cache(maxsize=None)
+def income_rates(species_id: str, level: int) -> Tuple[float, float]:
+    """Expected (coins, plant XP) per second from picking every bean a ready plant grows"""
+    species = PLANT_SPECIES[species_id]
+    beans_per_second = Offline.spawn_rate(species, level)
+    return (beans_per_second * Offline.expected_bean_value(species, level),
+            beans_per_second * Offline.expected_pick_xp(level))
+
+
+class Strategy:
+    """Decides what a simulated player buys, burns and replants.
+
+    act() is called once per decision interval and returns how many API
+    requests the player's actions would have cost.
+    """
+    name = 'base'
+
+    def act(self, state: GameState) -> int:
+        requests = 0
+        for pot in state.pots:
+            if pot.state != 'empty':
+                continue
+            slot_index = self.choose_slot(state)
+            if slot_index is None:
+                break
+            state.buy_seed(slot_index, pot.index)
+            requests += 1
+        return requests
+
+    def choose_slot(self, state: GameState) -> Optional[int]:
+        """Shop slot to buy for an empty pot, or None to leave it empty"""
+        raise NotImplementedError
+
+    @staticmethod
+    def affordable_slots(state: GameState):
+        for index, slot in enumerate(state.shop.slots):
+            price = slot.current_price()
+            if slot.stock > 0 and price <= state.coins:
+                yield index, slot, price
+
+
+class BuyCheapest(Strategy):
+    """Fill every empty pot with the cheapest seed in the shop"""
+    name = 'cheapest'
+
+    def choose_slot(self, state: GameState) -> Optional[int]:
+        best = min(self.affordable_slots(state), key=lambda option: option[2], default=None)
+        return best[0] if best else None
+
+
+class MaximizeROI(Strategy):
+    """Fill empty pots with the seed that pays back its price fastest"""
+    name = 'roi'
+
+    def choose_slot(self, state: GameState) -> Optional[int]:
+        best = max(self.affordable_slots(state),
+                   key=lambda option: income_rates(option[1].species_id, 1)[0] / max(1, option[2]),
+                   default=None)
+        return best[0] if best else None
+
+
+class BurnAndReplant(MaximizeROI):
+    """Like roi, but once every pot is full burn the weakest plant for a much better seed"""
+    name = 'replant'
+    upgrade_factor = 3.0  # New seed must earn this many times the weakest plant
+
+    def act(self, state: GameState) -> int:
+        requests = super().act(state)
+        if any(pot.state == 'empty' for pot in state.pots):
+            return requests
+
+        weakest, weakest_income = None, math.inf
+        for pot in state.pots:
+            instance = state.plant_instances.get(pot.instance_id)
+            if instance is not None:
+                income = income_rates(instance.species_id, instance.level)[0]
+                if income < weakest_income:
+                    weakest, weakest_income = pot.index, income
+        if weakest is None:
+            return requests
+
+        best = max(self.affordable_slots(state),
+                   key=lambda option: income_rates(option[1].species_id, 1)[0], default=None)
+        if best and income_rates(best[1].species_id, 1)[0] >= weakest_income * self.upgrade_factor:
+            state.burn_plant(weakest)
+            state.buy_seed(best[0], weakest)
+            requests += 2
+        return requests
+
+
+STRATEGIES = {strategy.name: strategy for strategy in (BuyCheapest, MaximizeROI, BurnAndReplant)}
+
+
+def _pick_beans(state: GameState, now: float, seconds: float, activity: float, carry: float) -> Tuple[float, int]:
+    """Collect the expected beans of every ready plant; returns new fractional coin carry and XP requests"""
+    earned = carry
+    picking = 0.0
+    species = get_catalog().species
+    for pot in state.pots:
+        if pot.state != 'ready':
+            continue
+        instance = state.plant_instances.get(pot.instance_id)
+        if instance is None:
+            continue
+        # Plants that ripened during this step only produce from their ready time
+        ready_for = min(seconds, now - instance.planted_at - species[instance.species_id].grow_time)
+        if ready_for <= 0:
+            continue
+        coins_rate, xp_rate = income_rates(instance.species_id, instance.level)
+        earned += coins_rate * ready_for * activity
+        picking = max(picking, ready_for)
+
+        # Most steps don't finish a level; bank those directly and only pay for
+        # a full add_plant_experience transaction when the plant levels up
+        xp = xp_rate * ready_for * activity
+        if instance.experience + xp < get_level_table(instance.species_id).required_for(instance.level + 1):
+            instance.experience += xp
+        else:
+            state.add_plant_experience(pot.instance_id, xp)
+
+    whole = int(earned)
+    if whole:
+        state.coins += whole
+        state.touch_coins()
+    # The client flushes queued XP at most once a second while beans are being picked
+    return earned - whole, int(picking * activity)
+
+def _snapshot(states: List[GameState]) -> Dict[str, Any]:
+    """Coins and level aggregates for one curve sample"""
+    levels = [instance.level for state in states for instance in state.plant_instances.values()]
+    return {
+        'coins_sum': sum(state.coins for state in states),
+        'coins_sample': [state.coins for state in states[:CURVE_SAMPLE_PLAYERS]],
+        'level_sum': sum(levels),
+        'plants': len(levels),
+        'max_level': max(levels, default=0),
+    }
+
+def simulate_chunk(players: int, hours: float, strategy_name: str, seed: int, step: float = 60.0,
+                   decision_interval: float = 60.0, sample_every: float = 3600.0,
+                   activity: float = 1.0) -> Dict[str, Any]:
+    """Play a group of players in lockstep on a simulated clock (runs inside a worker)"""
+    clock = SimulatedClock()
+    real_time = Setup.time
+    Setup.time = Offline.time = clock
+    random.seed(seed)
+    start = time.perf_counter()
+    # Purchases and level-ups are logged below WARNING; a worker that hasn't set up logging keeps only warnings
+    configure_logging(level='WARNING')
+    try:
+        strategy = STRATEGIES[strategy_name]()
+        # Every player rolls shops and plants from their own seeded buffer, so runs are reproducible
+        states = [GameState(seed=seed * 1_000_000 + i) for i in range(players)]
+        carries = [0.0] * players
+        requests = {'game-state': players, 'buy-seed': 0, 'xp-batch': 0}
+
+        samples = [dict(hour=0.0, **_snapshot(states))]
+        elapsed = 0.0
+        next_decision = 0.0
+        next_sample = sample_every
+        total = hours * 3600
+        while elapsed < total:
+            dt = min(step, total - elapsed)
+            clock.advance(dt)
+            elapsed += dt
+            decide = elapsed >= next_decision
+            for i, state in enumerate(states):
+                state.update_plants()
+                state.refresh_shop_if_due()
+                carries[i], xp_requests = _pick_beans(state, clock.now, dt, activity, carries[i])
+                requests['xp-batch'] += xp_requests
+                if decide:
+                    requests['buy-seed'] += strategy.act(state)
+            if decide:
+                next_decision += decision_interval
+            if elapsed >= next_sample or elapsed >= total:
+                samples.append(dict(hour=elapsed / 3600, **_snapshot(states)))
+                next_sample += sample_every
+    finally:
+        Setup.time = Offline.time = real_time
+
+    return {'players': players, 'samples': samples, 'requests': requests,
+            'seconds': time.perf_counter() - start}
+
+def _merge(chunks: List[Dict[str, Any]], hours: float) -> Dict[str, Any]:
+    """Combine worker results into curves and request rates"""
+    players = sum(chunk['players'] for chunk in chunks)
+    curve = []
+    for samples in zip(*(chunk['samples'] for chunk in chunks)):
+        coins = sorted(value for sample in samples for value in sample['coins_sample'])
+        plants = sum(sample['plants'] for sample in samples)
+        curve.append({
+            'hour': samples[0]['hour'],
+            'mean_coins': sum(sample['coins_sum'] for sample in samples) / players,
+            'p50_coins': coins[len(coins) // 2],
+            'p90_coins': coins[int(len(coins) * 0.9)],
+            'mean_level': sum(sample['level_sum'] for sample in samples) / plants if plants else 0,
+            'max_level': max(sample['max_level'] for sample in samples),
+        })
+
+    requests = {}
+    for chunk in chunks:
+        for route, count in chunk['requests'].items():
+            requests[route] = requests.get(route, 0) + count
+    simulated_seconds = hours * 3600
+    return {
+        'players': players,
+        'hours': hours,
+        'curve': curve,
+        'requests': requests,
+        'simulated_rps': sum(requests.values()) / simulated_seconds,
+        'rps_per_player': sum(requests.values()) / simulated_seconds / players,
+    }
+
+def run_simulation(players: int = 1000, hours: float = 10, strategy: str = 'roi', workers: Optional[int] = None,
+                   seed: int = 1, **options) -> Dict[str, Any]:
+    """Fan players out over a process pool and merge the results"""
+    if strategy not in STRATEGIES:
+        raise ValueError(f"Unknown strategy '{strategy}'. Available: {', '.join(STRATEGIES)}")
+    workers = workers or os.cpu_count() or 1
+    chunk_count = min(players, workers * 4)
+    sizes = [players // chunk_count + (1 if i < players % chunk_count else 0) for i in range(chunk_count)]
+
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(simulate_chunk, size, hours, strategy, seed * 100_003 + i, **options)
+                   for i, size in enumerate(sizes)]
+        chunks = [future.result() for future in futures]
+    wall_seconds = time.perf_counter() - start
+
+    result = _merge(chunks, hours)
+    result.update({'strategy': strategy, 'workers': workers, 'wall_seconds': wall_seconds,
+                   'player_hours_per_second': players * hours / wall_seconds})
+    return result
+
+def print_report(result: Dict[str, Any]):
+    print(f"🌱 {result['players']:,} players x {result['hours']:g}h ({result['strategy']}) on "
+          f"{result['workers']} worker(s) in {result['wall_seconds']:.1f}s "
+          f"({result['player_hours_per_second']:,.0f} player-hours/s)")
+    print(f"{'hour':>7} | {'mean coins':>15} | {'p50 coins':>15} | {'p90 coins':>15} | {'mean lvl':>8} | {'max lvl':>7}")
+    for point in result['curve']:
+        print(f"{point['hour']:>7.1f} | {point['mean_coins']:>15,.0f} | {point['p50_coins']:>15,} | "
+              f"{point['p90_coins']:>15,} | {point['mean_level']:>8.1f} | {point['max_level']:>7}")
+    print(f"📡 Simulated load: {result['simulated_rps']:,.1f} req/s "
+          f"({result['rps_per_player']:.3f} per player) - {result['requests']}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Headless Grow A Beanstock economy simulator")
+    parser.add_argument('--players', type=int, default=1000)
+    parser.add_argument('--hours', type=float, default=10)
+    parser.add_argument('--strategy', choices=sorted(STRATEGIES), default='roi')
+    parser.add_argument('--workers', type=int, default=None, help="Processes (default: one per core)")
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--step', type=float, default=60.0, help="Simulated seconds per step")
+    parser.add_argument('--decide-every', type=float, default=60.0, help="Simulated seconds between strategy decisions")
+    parser.add_argument('--activity', type=float, default=1.0, help="Fraction of beans players pick")
+    parser.add_argument('--sample-every', type=float, default=1.0, help="Hours between curve points")
+    parser.add_argument('--json', action='store_true', help="Print the result as JSON")
+    args = parser.parse_args()
+
+    result = run_simulation(args.players, args.hours, args.strategy, args.workers, args.seed,
+                            step=args.step, decision_interval=args.decide_every, activity=args.activity, sample_every=args.sample_every * 3600)
+    if args.json:
+        print(json.dumps(result, indent=2))
+    else:
+        print_report(result)
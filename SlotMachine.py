@@ -9,7 +9,11 @@ import math
 import time
 import os
 import sys
-from Setup import get_game_state, PLANT_SPECIES
+import logging
+from typing import Optional
+from Catalog import get_catalog
+from Logs import configure_logging, get_logger
+from Setup import session_store, DEFAULT_SESSION_ID, PLANT_SPECIES
 
 # Initialize Pygame
 pygame.init()
@@ -19,6 +23,8 @@ WINDOW_WIDTH = 1000
 WINDOW_HEIGHT = 700
 FPS = 60
 
+log = get_logger('slots')
+
 # Colors
 BLACK = (0, 0, 0)
 WHITE = (255, 255, 255)
@@ -32,7 +38,8 @@ DARK_GREEN = (0, 100, 0)
 BROWN = (139, 69, 19)
 
 class SlotMachine:
-    def __init__(self):
+    def __init__(self, session_id: str = DEFAULT_SESSION_ID):
+        self.session_id = session_id  # Whose garden the credits come from and go back to
         self.screen = pygame.display.set_mode((WINDOW_WIDTH, WINDOW_HEIGHT))
         pygame.display.set_caption("🎰 Beanstock Slot Machine 🎰")
         self.clock = pygame.time.Clock()
@@ -49,6 +56,7 @@ class SlotMachine:
         self.reel_speeds = [0, 0, 0]  # Individual reel speeds
         self.spin_start_time = 0
         self.credits = 0
+        self.saved_credits = 0  # Credits as of the last sync with the garden
         
         # Visual effects
         self.particles = []
@@ -66,50 +74,54 @@ class SlotMachine:
         self.font_medium = pygame.font.Font(None, 36)
         self.font_small = pygame.font.Font(None, 24)
         
-        print("🎰 Slot Machine initialized! Spin to win!")
+        log.info("🎰 Slot Machine initialized! Spin to win!")
 
     def load_assets(self):
         """Load bean images and other assets"""
         self.bean_images = {}
         assets_path = os.path.join(os.path.dirname(__file__), "Assets", "BasicBeans")
         
-        # Map species IDs to image filenames
-        bean_image_map = {
-            'beanstalk': 'beanstalkbean.png',
-            'snap_pea': 'Snappeabean.png',
-            'jellybean_vine': 'Jellybean.png',
-            'bamboo_bean': 'Bamboobean.png',
-            'coffee_beanstalk': 'Coffebean.png',
-            'thunder_pod': 'Thunderboltpeabean.png',
-            'frost_pea': 'Frostbean.png',
-            'choco_vine': 'Chocobean.png',
-            'ironvine': 'Ironbean.png',
-            'honeyvine': 'Honeybean.png',
-            'sunbean': 'Sunbean.png',
-            'moonbean': 'Moombean.png',
-            'cloud_creeper': 'Cloudbean.png',
-            'royal_stalk': 'Royalbean.png',
-            'crystal_bean': 'Crystalbean.png',
-            'neon_soy': 'Neonbean.png',
-            'vinecorn': 'Cornbean.png',
-            'fire_pod': 'Firebean.png',
-            'shadow_bean': 'Shadowbean.png',
-            'prism_stalk': 'Prysmbean.png'
-        }
+        # Bean image filenames come from the species catalog
+        bean_image_map = {species.id: species.assets['bean']
+                          for species in get_catalog().species.values() if 'bean' in species.assets}
+        
+        # One image for every bean when the sprite atlases have been built
+        atlas_frames = self.load_atlas_frames('beans')
         
         for species_id, filename in bean_image_map.items():
+            if species_id in atlas_frames:
+                self.bean_images[species_id] = pygame.transform.scale(atlas_frames[species_id], (100, 100))
+                continue
             try:
                 path = os.path.join(assets_path, filename)
                 image = pygame.image.load(path)
                 # Scale to slot size
                 self.bean_images[species_id] = pygame.transform.scale(image, (100, 100))
             except FileNotFoundError:
-                print(f"⚠️ Warning: Could not find {filename}")
+                log.warning("⚠️ Could not find %s", filename)
                 # Create a placeholder
                 placeholder = pygame.Surface((100, 100))
                 placeholder.fill((128, 128, 128))
                 self.bean_images[species_id] = placeholder
 
+    def load_atlas_frames(self, name):
+        """Frames of a sprite atlas built by AssetPipeline.py, by species id; empty without a build"""
+        try:
+            from AssetPipeline import BUILD_DIR, get_asset_manifest
+        except ImportError:
+            return {}
+        atlas = get_asset_manifest().atlases.get(name)
+        png = next((v for v in atlas['variants'] if v['mimetype'] == 'image/png'), None) if atlas else None
+        if png is None:
+            return {}
+        try:
+            sheet = pygame.image.load(os.path.join(BUILD_DIR, png['file']))
+        except (FileNotFoundError, pygame.error):
+            log.warning("⚠️ Could not load the %s atlas, loading images one by one", name)
+            return {}
+        return {species_id: sheet.subsurface(pygame.Rect(frame['x'], frame['y'], frame['w'], frame['h']))
+                for species_id, frame in atlas['sprites'].items()}
+
     def load_sounds(self):
         """Load sound effects"""
         self.sounds = {}
@@ -130,9 +142,9 @@ class SlotMachine:
                     path = os.path.join(sounds_path, filename)
                     self.sounds[sound_name] = pygame.mixer.Sound(path)
                 except (FileNotFoundError, pygame.error):
-                    print(f"⚠️ Warning: Could not load {filename}")
+                    log.warning("⚠️ Could not load %s", filename)
         except pygame.error:
-            print("⚠️ Warning: Could not initialize sound mixer")
+            log.warning("⚠️ Could not initialize sound mixer")
 
     def create_bean_list(self):
         """Create weighted list of beans based on rarity"""
@@ -155,24 +167,27 @@ class SlotMachine:
                 for _ in range(weight):
                     self.beans.append(species_id)
         
-        print(f"🎲 Created bean pool with {len(set(self.beans))} unique beans, {len(self.beans)} total weighted entries")
+        log.debug("🎲 Created bean pool with %s unique beans, %s total weighted entries", len(set(self.beans)), len(self.beans))
 
     def load_credits(self):
-        """Load credits from game state"""
+        """Load credits from the player's garden"""
         try:
-            game_state = get_game_state()
-            self.credits = game_state.coins
+            game_state = session_store.get_or_create(self.session_id)
+            self.credits = self.saved_credits = game_state.coins
         except Exception as e:
-            print(f"⚠️ Warning: Could not load game state: {e}")
-            self.credits = 1000  # Default credits
+            log.warning("⚠️ Could not load game state: %s", e)
+            self.credits = self.saved_credits = 1000  # Default credits
 
     def save_credits(self):
-        """Save credits back to game state"""
+        """Add what was won or lost since the last sync to the player's garden"""
         try:
-            game_state = get_game_state()
-            game_state.coins = self.credits
+            game_state = session_store.get_or_create(self.session_id)
+            # Apply the difference, so coins the player earned in the browser meanwhile are kept
+            with game_state.transaction():
+                game_state.set_coins(game_state.coins + self.credits - self.saved_credits)
+                self.credits = self.saved_credits = game_state.coins
         except Exception as e:
-            print(f"⚠️ Warning: Could not save game state: {e}")
+            log.warning("⚠️ Could not save game state: %s", e)
 
     def spin_reels(self):
         """Start spinning the reels"""
@@ -201,7 +216,7 @@ class SlotMachine:
         if 'spin' in self.sounds:
             self.sounds['spin'].play()
         
-        print(f"🎰 Spinning! Credits remaining: {self.credits}")
+        log.debug("🎰 Spinning! Credits remaining: %s", self.credits)
 
     def update_reels(self, dt):
         """Update reel positions during spin"""
@@ -242,7 +257,8 @@ class SlotMachine:
             self.beans[int(self.spin_positions[2])]
         ]
         
-        print(f"🎯 Result: {[PLANT_SPECIES[bean].name for bean in result_beans]}")
+        if log.isEnabledFor(logging.DEBUG):
+            log.debug("🎯 Result: %s", ', '.join(PLANT_SPECIES[bean].name for bean in result_beans))
         
         # Check for matches
         unique_beans = set(result_beans)
@@ -257,7 +273,7 @@ class SlotMachine:
             if 'big_win' in self.sounds:
                 self.sounds['big_win'].play()
             
-            print(f"🎉 JACKPOT! Three {bean_species.name}s! Won {payout} coins!")
+            log.info("🎉 JACKPOT! Three %ss! Won %s coins!", bean_species.name, payout)
             
         elif len(unique_beans) == 2:
             # Two of a kind
@@ -272,7 +288,7 @@ class SlotMachine:
                     if 'win' in self.sounds:
                         self.sounds['win'].play()
                     
-                    print(f"🎊 Two of a Kind! Two {bean_species.name}s! Won {payout} coins!")
+                    log.info("🎊 Two of a Kind! Two %ss! Won %s coins!", bean_species.name, payout)
                     break
         else:
             # No match, but give a small consolation based on rarest bean
@@ -282,9 +298,9 @@ class SlotMachine:
                 self.credits += payout
                 if 'coin' in self.sounds:
                     self.sounds['coin'].play()
-                print(f"🍀 Consolation prize: {payout} coins for rare bean!")
+                log.info("🍀 Consolation prize: %s coins for rare bean!", payout)
             else:
-                print("💔 No match, try again!")
+                log.debug("💔 No match, try again!")
         
         self.save_credits()
 
@@ -399,8 +415,8 @@ class SlotMachine:
         """Main game loop"""
         running = True
         
-        print("🎮 Slot Machine is running!")
-        print("💡 Press SPACEBAR to spin, ESC to quit")
+        log.info("🎮 Slot Machine is running!")
+        log.info("💡 Press SPACEBAR to spin, ESC to quit")
         
         while running:
             dt = self.clock.tick(FPS) / 1000.0
@@ -443,17 +459,18 @@ class SlotMachine:
             pygame.display.flip()
         
         pygame.quit()
-        print(f"🎰 Slot Machine closed. Final credits: {self.credits}")
+        log.info("🎰 Slot Machine closed. Final credits: %s", self.credits)
 
-def start_slot_machine():
-    """Start the slot machine mini-game"""
+def start_slot_machine(session_id: Optional[str] = None):
+    """Start the slot machine mini-game on a player's garden (the most recently active one by default)"""
     try:
-        slot_machine = SlotMachine()
+        session_id = session_id or session_store.most_recent() or DEFAULT_SESSION_ID
+        log.info("🎰 Playing with the garden of session %s", session_id[:8])
+        slot_machine = SlotMachine(session_id)
         slot_machine.run()
     except Exception as e:
-        print(f"❌ Error starting slot machine: {e}")
-        import traceback
-        traceback.print_exc()
+        log.exception("❌ Error starting slot machine: %s", e)
 
 if __name__ == "__main__":
+    configure_logging()
     start_slot_machine()
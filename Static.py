@@ -0,0 +1,196 @@
+"""
+Grow A Beanstock - Static Files
+Serves the game's art, sounds, scripts and styles with HTTP caching. Every file
+gets a strong ETag from a hash of its contents, so a redeploy that only touches
+modification times doesn't make browsers download everything again.
+Conditional requests (If-None-Match, If-Modified-Since) get 304s and Range
+requests (audio seeking in Sound/) get 206s. Content-hashed build outputs are
+marked immutable for a year; everything else is revalidated on each use.
+
+Small files are kept in memory in an LRU cache with a byte budget, so hot
+scripts and sprites are served without touching the disk. Configured from the
+environment when Run.py starts:
+    BEANSTOCK_STATIC_CACHE_MB   memory for cached files (default 32, 0 turns it off)
+"""
+
+import hashlib
+import mimetypes
+import os
+import re
+import stat
+import threading
+from collections import OrderedDict
+from email.utils import formatdate
+from typing import Any, Dict, Optional, Tuple
+
+from flask import current_app, request
+from werkzeug.exceptions import NotFound
+from werkzeug.security import safe_join
+from werkzeug.wsgi import wrap_file
+
+MAX_CACHED_FILE_BYTES = 1 << 20  # Bigger files (the music) are streamed from disk
+IMMUTABLE_MAX_AGE = 365 * 24 * 60 * 60
+HASH_CHUNK_BYTES = 1 << 16
+HASHED_NAME = re.compile(r'\.[0-9a-f]{8,64}\.[A-Za-z0-9]+$')  # e.g. Chocovine.3f9a0c1b2d.webp
+
+
+def is_hashed_name(filename: str) -> bool:
+    """Whether a file name carries a content hash, so its contents can never change"""
+    return HASHED_NAME.search(filename) is not None
+
+
+class _FileInfo:
+    """What is known about one version of a file on disk"""
+    __slots__ = ('path', 'size', 'mtime_ns', 'etag', 'mimetype')
+
+    def __init__(self, path: str, size: int, mtime_ns: int, etag: str, mimetype: str):
+        self.path = path
+        self.size = size
+        self.mtime_ns = mtime_ns
+        self.etag = etag
+        self.mimetype = mimetype
+
+
+class StaticFiles:
+    """Content-hash ETags for every file served, plus an LRU cache of small files' bytes"""
+    def __init__(self, max_bytes: int = 32 << 20, max_file_bytes: int = MAX_CACHED_FILE_BYTES):
+        self.max_bytes = max_bytes
+        self.max_file_bytes = max_file_bytes
+        self._lock = threading.Lock()
+        self._info: Dict[str, _FileInfo] = {}  # Every file served, by absolute path
+        self._data: 'OrderedDict[str, bytes]' = OrderedDict()  # Cached contents, least recently used first
+        self.cached_bytes = 0
+        self.hits = 0
+        self.misses = 0  # Counters are approximate under concurrent requests
+
+    def send(self, directory: str, filename: str, mimetype: Optional[str] = None, immutable: bool = False):
+        """Response for `filename` under `directory` (relative to the app's root), like send_from_directory"""
+        root = directory if os.path.isabs(directory) else os.path.join(current_app.root_path, directory)
+        path = safe_join(root, filename)
+        if path is None:
+            raise NotFound()
+
+        info, data = self._info.get(path), None
+        if info is None or not immutable:
+            # A hashed file can't change under its name, so only other files are checked on every request
+            info, data = self._current_info(path)
+        if data is None:
+            data = self._cached(path, info)
+
+        if data is not None:
+            response = current_app.response_class(data, mimetype=mimetype or info.mimetype)
+        else:
+            response = current_app.response_class(wrap_file(request.environ, self._open(info.path)),
+                                                  mimetype=mimetype or info.mimetype, direct_passthrough=True)
+            response.content_length = info.size
+        response.set_etag(info.etag)
+        response.headers['Last-Modified'] = formatdate(info.mtime_ns / 1e9, usegmt=True)
+        if immutable:
+            response.headers['Cache-Control'] = f"public, max-age={IMMUTABLE_MAX_AGE}, immutable"
+        else:
+            response.headers['Cache-Control'] = 'no-cache'
+        # 304s for If-None-Match / If-Modified-Since, and 206s for Range (checked against If-Range)
+        return response.make_conditional(request, accept_ranges=True, complete_length=info.size)
+
+    def _current_info(self, path: str) -> Tuple[_FileInfo, Optional[bytes]]:
+        """The file's info, checked against the disk, and its bytes if they had to be read"""
+        try:
+            st = os.stat(path)
+        except (FileNotFoundError, NotADirectoryError):
+            self._forget(path)
+            raise NotFound()
+        if not stat.S_ISREG(st.st_mode):
+            self._forget(path)
+            raise NotFound()
+        info = self._info.get(path)
+        if info is not None and info.mtime_ns == st.st_mtime_ns and info.size == st.st_size:
+            return info, None
+
+        # New or changed: hash the contents, and keep them if they are small enough
+        data = None
+        digest = hashlib.sha1()
+        with open(path, 'rb') as f:
+            if st.st_size <= self.max_file_bytes and self.max_bytes > 0:
+                data = f.read()
+                digest.update(data)
+            else:
+                for chunk in iter(lambda: f.read(HASH_CHUNK_BYTES), b''):
+                    digest.update(chunk)
+        info = _FileInfo(path, st.st_size, st.st_mtime_ns, digest.hexdigest(),
+                         mimetypes.guess_type(path)[0] or 'application/octet-stream')
+        with self._lock:
+            self._info[path] = info
+            self._evict(path)
+            if data is not None and len(data) == info.size:
+                self.misses += 1
+                self._store(path, data)
+        return info, data if data is not None and len(data) == info.size else None
+
+    def _cached(self, path: str, info: _FileInfo) -> Optional[bytes]:
+        with self._lock:
+            data = self._data.get(path)
+            if data is not None and len(data) == info.size:
+                self._data.move_to_end(path)
+                self.hits += 1
+                return data
+        if info.size > self.max_file_bytes or self.max_bytes <= 0:
+            return None
+        # Evicted earlier (or changed size on disk since); read it back in
+        self.misses += 1
+        with self._open(path) as f:
+            data = f.read()
+        if len(data) != info.size:
+            return None
+        with self._lock:
+            self._evict(path)
+            self._store(path, data)
+        return data
+
+    def _open(self, path: str):
+        try:
+            return open(path, 'rb')
+        except (FileNotFoundError, NotADirectoryError):
+            self._forget(path)
+            raise NotFound()
+
+    def _forget(self, path: str):
+        """Drop everything known about a file that is gone"""
+        with self._lock:
+            self._info.pop(path, None)
+            self._evict(path)
+
+    def _store(self, path: str, data: bytes):
+        """Cache a file's bytes, evicting the least recently used; caller holds the lock"""
+        if len(data) > self.max_bytes:
+            return
+        self._data[path] = data
+        self.cached_bytes += len(data)
+        while self.cached_bytes > self.max_bytes:
+            _, evicted = self._data.popitem(last=False)
+            self.cached_bytes -= len(evicted)
+
+    def _evict(self, path: str):
+        """Drop a file's cached bytes; caller holds the lock"""
+        data = self._data.pop(path, None)
+        if data is not None:
+            self.cached_bytes -= len(data)
+
+    def clear(self):
+        with self._lock:
+            self._info.clear()
+            self._data.clear()
+            self.cached_bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'files_known': len(self._info),
+            'files_cached': len(self._data),
+            'cached_bytes': self.cached_bytes,
+            'max_bytes': self.max_bytes,
+            'hits': self.hits,
+            'misses': self.misses
+        }
+
+
+# Global static file server (used by Run.py's static routes)
+static_files = StaticFiles(int(float(os.environ.get('BEANSTOCK_STATIC_CACHE_MB', '32') or 0) * (1 << 20)))
@@ -0,0 +1,248 @@
+"""
+Grow A Beanstock - SQLite Storage
+SQLite backend for the autosave flusher. Threads check connections out of a
+small bounded pool in WAL mode, so the flusher can write while request threads
+read cold players back in. Statements are constant and parameterized so sqlite's
+statement cache keeps them prepared, and each flush is one transaction.
+"""
+
+import os
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from Persistence import SAVE_DIRECTORY
+
+DATABASE_PATH = os.path.join(SAVE_DIRECTORY, 'beanstock.db')
+STATEMENT_CACHE_SIZE = 64
+POOL_SIZE = int(os.environ.get('BEANSTOCK_SQLITE_POOL', '4'))  # Most connections open at once
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS players (
+    session_id TEXT PRIMARY KEY,
+    coins NUMERIC NOT NULL,
+    shop_refresh_at REAL NOT NULL,
+    last_save REAL NOT NULL,
+    last_seen REAL NOT NULL,
+    next_instance_id INTEGER NOT NULL DEFAULT 1
+);
+CREATE TABLE IF NOT EXISTS pots (
+    session_id TEXT NOT NULL,
+    pot_index INTEGER NOT NULL,
+    state TEXT NOT NULL,
+    instance_id INTEGER,
+    PRIMARY KEY (session_id, pot_index)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS plant_instances (
+    session_id TEXT NOT NULL,
+    instance_id INTEGER NOT NULL,
+    species_id TEXT NOT NULL,
+    planted_at REAL NOT NULL,
+    picks_done INTEGER NOT NULL,
+    size TEXT NOT NULL,
+    finish TEXT NOT NULL,
+    ready_state TEXT NOT NULL,
+    level INTEGER NOT NULL,
+    experience NUMERIC NOT NULL,
+    PRIMARY KEY (session_id, instance_id)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS shop_slots (
+    session_id TEXT NOT NULL,
+    slot_index INTEGER NOT NULL,
+    species_id TEXT NOT NULL,
+    stock INTEGER NOT NULL,
+    base_price INTEGER NOT NULL,
+    purchases_this_roll INTEGER NOT NULL,
+    PRIMARY KEY (session_id, slot_index)
+) WITHOUT ROWID;
+'''
+# Databases created before integer instance IDs lack the allocator column; their
+# TEXT instance ID columns still hold decimal IDs, which the loader converts
+MIGRATIONS = {
+    ('players', 'next_instance_id'): 'ALTER TABLE players ADD COLUMN next_instance_id INTEGER NOT NULL DEFAULT 1'
+}
+
+UPSERT_PLAYER = '''
+INSERT INTO players (session_id, coins, shop_refresh_at, last_save, last_seen, next_instance_id)
+VALUES (?, ?, ?, ?, ?, ?)
+ON CONFLICT(session_id) DO UPDATE SET
+    coins = excluded.coins, shop_refresh_at = excluded.shop_refresh_at,
+    last_save = excluded.last_save, last_seen = excluded.last_seen,
+    next_instance_id = excluded.next_instance_id
+'''
+DELETE_POTS = 'DELETE FROM pots WHERE session_id = ?'
+DELETE_INSTANCES = 'DELETE FROM plant_instances WHERE session_id = ?'
+DELETE_SLOTS = 'DELETE FROM shop_slots WHERE session_id = ?'
+INSERT_POT = 'INSERT INTO pots VALUES (?, ?, ?, ?)'
+INSERT_INSTANCE = 'INSERT INTO plant_instances VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)'
+INSERT_SLOT = 'INSERT INTO shop_slots VALUES (?, ?, ?, ?, ?, ?)'
+SELECT_PLAYER = '''
+SELECT coins, shop_refresh_at, last_save, last_seen, next_instance_id FROM players WHERE session_id = ?
+'''
+SELECT_POTS = 'SELECT pot_index, state, instance_id FROM pots WHERE session_id = ? ORDER BY pot_index'
+SELECT_INSTANCES = '''
+SELECT instance_id, species_id, planted_at, picks_done, size, finish, ready_state, level, experience
+FROM plant_instances WHERE session_id = ?
+'''
+SELECT_SLOTS = '''
+SELECT species_id, stock, base_price, purchases_this_roll
+FROM shop_slots WHERE session_id = ? ORDER BY slot_index
+'''
+
+
+class SQLiteBackend:
+    """Stores players in normalized SQLite tables, sharing a bounded pool of connections between threads"""
+    def __init__(self, path: str = DATABASE_PATH, pool_size: int = POOL_SIZE):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.pool_size = max(1, pool_size)
+        self._idle: 'queue.LifoQueue[sqlite3.Connection]' = queue.LifoQueue()
+        self._connections: List[sqlite3.Connection] = []  # Every open connection, idle or checked out
+        self._connections_lock = threading.Lock()
+        with self._connection() as conn:
+            conn.executescript(SCHEMA)
+            self._migrate(conn)
+
+    @staticmethod
+    def _migrate(conn: sqlite3.Connection):
+        """Add columns that databases from older versions are missing"""
+        for (table, column), statement in MIGRATIONS.items():
+            columns = {row[1] for row in conn.execute(f'PRAGMA table_info({table})')}
+            if column not in columns:
+                with conn:
+                    conn.execute(statement)
+
+    def _open(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, check_same_thread=False,
+                               cached_statements=STATEMENT_CACHE_SIZE)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        conn.execute('PRAGMA busy_timeout=5000')
+        return conn
+
+    @contextmanager
+    def _connection(self) -> Iterator[sqlite3.Connection]:
+        """Check a connection out of the pool, opening one if the pool isn't full, and return it afterwards"""
+        try:
+            conn = self._idle.get_nowait()
+        except queue.Empty:
+            with self._connections_lock:
+                conn = None
+                if len(self._connections) < self.pool_size:
+                    conn = self._open()
+                    self._connections.append(conn)
+            if conn is None:
+                # Every connection is busy; wait for one to come back
+                conn = self._idle.get()
+        try:
+            yield conn
+        finally:
+            with self._connections_lock:
+                pooled = conn in self._connections  # Not if close() ran while it was checked out
+            if pooled:
+                if conn.in_transaction:
+                    conn.rollback()
+                self._idle.put(conn)
+
+    def close(self):
+        """Close every pooled connection"""
+        with self._connections_lock:
+            for conn in self._connections:
+                conn.close()
+            self._connections.clear()
+            self._idle = queue.LifoQueue()
+
+    def save_many(self, saves: Dict[str, Dict[str, Any]]) -> int:
+        """Write several players' save data in one transaction, returning approximate bytes written"""
+        players, pots, instances, slots = [], [], [], []
+        for session_id, save_data in saves.items():
+            shop = save_data['shop']
+            players.append((session_id, save_data['coins'], shop['refresh_at'],
+                            save_data['last_save'], save_data['last_seen'],
+                            save_data.get('next_instance_id', 1)))
+            for pot in save_data['pots']:
+                pots.append((session_id, pot['index'], pot['state'], pot['instance_id']))
+            for instance_id, plant in save_data['plant_instances'].items():
+                instances.append((
+                    session_id, instance_id, plant['species_id'], plant['planted_at'],
+                    plant['picks_done'], plant['rarity']['size'], plant['rarity']['finish'],
+                    plant['ready_state'], plant['level'], plant['experience']
+                ))
+            for index, slot in enumerate(shop['slots']):
+                slots.append((session_id, index, slot['species_id'], slot['stock'],
+                              slot['base_price'], slot['purchases_this_roll']))
+
+        keys = [(session_id,) for session_id in saves]
+        with self._connection() as conn, conn:
+            conn.executemany(DELETE_POTS, keys)
+            conn.executemany(DELETE_INSTANCES, keys)
+            conn.executemany(DELETE_SLOTS, keys)
+            conn.executemany(UPSERT_PLAYER, players)
+            conn.executemany(INSERT_POT, pots)
+            conn.executemany(INSERT_INSTANCE, instances)
+            conn.executemany(INSERT_SLOT, slots)
+        # Rough on-disk row sizes, enough to compare flushes with each other
+        return len(players) * 48 + len(pots) * 32 + len(instances) * 80 + len(slots) * 40
+
+    def load(self, session_id: str) -> Optional[Dict[str, Any]]:
+        """Reassemble one player's save data, or None if they were never saved"""
+        with self._connection() as conn:
+            player = conn.execute(SELECT_PLAYER, (session_id,)).fetchone()
+            if player is None:
+                return None
+            instance_rows = conn.execute(SELECT_INSTANCES, (session_id,)).fetchall()
+            pot_rows = conn.execute(SELECT_POTS, (session_id,)).fetchall()
+            slot_rows = conn.execute(SELECT_SLOTS, (session_id,)).fetchall()
+        coins, refresh_at, last_save, last_seen, next_instance_id = player
+
+        plant_instances = {}
+        for row in instance_rows:
+            instance_id, species_id, planted_at, picks_done, size, finish, ready_state, level, experience = row
+            plant_instances[instance_id] = {
+                'species_id': species_id,
+                'planted_at': planted_at,
+                'picks_done': picks_done,
+                'rarity': {'size': size, 'finish': finish},
+                'ready_state': ready_state,
+                'level': level,
+                'experience': experience
+            }
+
+        return {
+            'coins': coins,
+            'pots': [
+                {'index': index, 'state': pot_state, 'instance_id': instance_id}
+                for index, pot_state, instance_id in pot_rows
+            ],
+            'plant_instances': plant_instances,
+            'shop': {
+                'refresh_at': refresh_at,
+                'slots': [
+                    {
+                        'species_id': species_id,
+                        'stock': stock,
+                        'base_price': base_price,
+                        'purchases_this_roll': purchases
+                    } for species_id, stock, base_price, purchases in slot_rows
+                ]
+            },
+            'next_instance_id': next_instance_id,
+            'last_save': last_save,
+            'last_seen': last_seen
+        }
+
+    def load_all(self) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        with self._connection() as conn:
+            session_ids = [row[0] for row in conn.execute('SELECT session_id FROM players')]
+        for session_id in session_ids:
+            save_data = self.load(session_id)
+            if save_data is not None:
+                yield session_id, save_data
+
+    def count(self) -> int:
+        with self._connection() as conn:
+            return conn.execute('SELECT COUNT(*) FROM players').fetchone()[0]
@@ -1,19 +1,25 @@
-from flask import Flask, render_template, send_from_directory, jsonify, request
+from flask import Flask, render_template, send_from_directory, jsonify, request, g
 import os
 import sys
 import json
+import time
 
 # Add the parent directory to the path so we can import Setup
 sys.path.append(os.path.dirname(os.path.dirname(__file__)))
 
 try:
-    from Setup import get_game_state, get_shop_data, get_pots_data, initialize_game
+    from Setup import (get_game_state, get_shop_data, get_pots_data, initialize_game,
+                       resolve_session, SESSION_COOKIE_NAME, SESSION_MAX_AGE)
 except ImportError as e:
     print(f"Import error: {e}")
     # Fallback imports or error handling
+    SESSION_COOKIE_NAME = 'beanstock_session'
+    SESSION_MAX_AGE = 60 * 60 * 24 * 365
     def get_game_state():
         return {"coins": 120, "pots": []}
-    def get_shop_data():
+    def resolve_session(session_id):
+        return session_id, get_game_state(), False
+    def get_shop_data(state=None):
         return {
             "slots": [
                 {"species_id": "beanstalk", "species_name": "Beanstalk", "species_type": "picker", "rarity": "common", "stock": 8, "price": 120, "base_price": 120, "purchases": 0, "grow_time": 25, "base_sell": 14},
@@ -39,13 +45,43 @@ except ImportError as e:
             ],
             "refresh_at": 0
         }
-    def get_pots_data():
+    def get_pots_data(state=None):
         return []
     def initialize_game():
         pass
 
 app = Flask(__name__)
 
+# Offline progression is optional; without it gardens just pause while players are away
+try:
+    from Offline import catch_up
+except ImportError:
+    def catch_up(state, now=None):
+        return None
+
+def get_player_state(page_load=False):
+    """Get the GameState belonging to the player making this request"""
+    if 'game_state' not in g:
+        session_id, state, is_new = resolve_session(request.cookies.get(SESSION_COOKIE_NAME))
+        g.session_id = session_id
+        g.game_state = state
+        g.new_session = is_new
+        
+        if page_load:
+            # Credit whatever the garden produced while the player was away
+            catch_up(state)
+        else:
+            # The browser is open and spawning its own beans, so this isn't time away
+            state.last_seen = time.time()
+    return g.game_state
+
+@app.after_request
+def set_session_cookie(response):
+    if g.get('new_session'):
+        response.set_cookie(SESSION_COOKIE_NAME, g.session_id, max_age=SESSION_MAX_AGE,
+                            httponly=True, samesite='Lax')
+    return response
+
 # Initialize game on server start
 try:
     initialize_game()
@@ -64,7 +100,7 @@ def index():
 @app.route('/api/shop')
 def api_shop():
     try:
-        return jsonify(get_shop_data())
+        return jsonify(get_shop_data(get_player_state()))
     except Exception as e:
         # Return fallback data with correct prices
         return jsonify({
@@ -97,14 +133,14 @@ def api_shop():
 @app.route('/api/pots')
 def api_pots():
     try:
-        return jsonify(get_pots_data())
+        return jsonify(get_pots_data(get_player_state()))
     except Exception as e:
         return jsonify({"error": str(e), "pots": []})
 
 @app.route('/api/game-state')
 def api_game_state():
     try:
-        state = get_game_state()
+        state = get_player_state(page_load=True)
         return jsonify({
             "coins": getattr(state, 'coins', 120),
             "pots": getattr(state, 'pots', [])
@@ -171,9 +171,77 @@ class GameManager {
     }
 
     // Background shop refresh checking
-    startBackgroundShopRefresh() {
+    async startBackgroundShopRefresh() {
+        // Prefer server-pushed events; only poll when the event stream is unavailable
+        if (await this.startEventStream()) {
+            return;
+        }
+        this.startShopPolling();
+    }
+    
+    // Open the server-sent event stream for shop refreshes, ready plants and level-ups
+    async startEventStream() {
+        if (!window.EventSource) {
+            return false;
+        }
+        
+        try {
+            const response = await fetch('/api/stream-info');
+            const info = await response.json();
+            if (!info.enabled) {
+                return false;
+            }
+            
+            const url = `${window.location.protocol}//${window.location.hostname}:${info.port}${info.path}`;
+            this.eventSource = new EventSource(url, { withCredentials: true });
+            
+            this.eventSource.addEventListener('shop_refresh', async () => {
+                await this.loadShopData();
+                if (this.isShopOpen) {
+                    this.populateShop();
+                    this.showShopNotification('✨ Shop refreshed! Check out the new items!', 'refresh');
+                }
+                console.log('Shop refreshed (pushed by server)');
+            });
+            
+            this.eventSource.addEventListener('plant_ready', async (event) => {
+                const data = JSON.parse(event.data);
+                const response = await fetch('/api/pots');
+                if (response.ok) {
+                    this.pots = await response.json();
+                    this.updateAllPlantLevelBars();
+                }
+                console.log(`🌱 Plant in pot ${data.pot_index} is ready (pushed by server)`);
+            });
+            
+            this.eventSource.addEventListener('level_up', (event) => {
+                const data = JSON.parse(event.data);
+                console.log(`🎉 ${data.kind} ${data.instance_id} reached level ${data.new_level} (pushed by server)`);
+            });
+            
+            this.eventSource.onerror = () => {
+                // EventSource reconnects on its own; fall back to polling if the server is gone
+                if (this.eventSource.readyState === EventSource.CLOSED) {
+                    console.log('Event stream closed, falling back to shop polling');
+                    this.eventSource = null;
+                    this.startShopPolling();
+                }
+            };
+            
+            return true;
+        } catch (error) {
+            console.log('Event stream unavailable, polling instead:', error);
+            return false;
+        }
+    }
+    
+    startShopPolling() {
+        if (this.shopPollTimer) {
+            return;
+        }
+        
         // Check for shop refreshes every 30 seconds
-        setInterval(async () => {
+        this.shopPollTimer = setInterval(async () => {
             try {
                 const response = await fetch('/api/shop');
                 if (response.ok) {
@@ -2283,19 +2351,93 @@ class GameManager {
         levelBar.classList.add('visible');
     }
 
-    // Add experience to a clipper
-    async addClipperExperience(instanceId, xpAmount = 0.5) {
+    // Queue an XP event; queued events are sent together in one batch request
+    queueExperienceEvent(instanceId, kind, xpAmount) {
+        if (!this.experienceQueue) {
+            this.experienceQueue = [];
+        }
+        
+        return new Promise(resolve => {
+            this.experienceQueue.push({ instance_id: instanceId, kind: kind, xp_amount: xpAmount, resolve });
+            
+            if (this.experienceQueue.length >= 100) {
+                this.flushExperienceQueue();
+            } else if (!this.experienceFlushTimer) {
+                this.experienceFlushTimer = setTimeout(() => this.flushExperienceQueue(), 1000);
+            }
+        });
+    }
+    
+    // Send all queued XP events to the server in a single request
+    async flushExperienceQueue() {
+        clearTimeout(this.experienceFlushTimer);
+        this.experienceFlushTimer = null;
+        
+        const queued = this.experienceQueue || [];
+        this.experienceQueue = [];
+        if (queued.length === 0) {
+            return;
+        }
+        
         try {
-            const response = await fetch('/api/add-clipper-experience', {
+            const response = await fetch('/api/add-experience-batch', {
                 method: 'POST',
                 headers: { 'Content-Type': 'application/json' },
-                body: JSON.stringify({ 
-                    instance_id: instanceId,
-                    xp_amount: xpAmount
+                body: JSON.stringify({
+                    events: queued.map(event => ({
+                        instance_id: event.instance_id,
+                        kind: event.kind,
+                        xp_amount: event.xp_amount
+                    }))
                 })
             });
             
             const data = await response.json();
+            const results = new Map();
+            (data.results || []).forEach(result => {
+                results.set(`${result.kind}:${result.instance_id}`, result);
+                
+                // Patch the affected pot in place instead of refetching every pot
+                const pot = (this.pots || []).find(p => p.instance_id === result.instance_id);
+                if (!pot) {
+                    return;
+                }
+                if (result.kind === 'plant') {
+                    pot.level = result.new_level;
+                    pot.experience = result.experience;
+                    pot.required_xp = result.required_xp;
+                    pot.clipper_unlocked = result.clipper_unlocked;
+                    pot.clipper_level = result.clipper_level;
+                } else {
+                    pot.clipper_level = result.new_level;
+                    pot.clipper_experience = result.experience;
+                }
+            });
+            
+            // Only the last event per instance reports the level up, so it is handled once
+            const lastEvent = new Map();
+            queued.forEach(event => lastEvent.set(`${event.kind}:${event.instance_id}`, event));
+            queued.forEach(event => {
+                const key = `${event.kind}:${event.instance_id}`;
+                let result = results.get(key);
+                if (result && lastEvent.get(key) !== event) {
+                    result = { ...result, leveled_up: false };
+                }
+                event.resolve({ success: Boolean(data.success && result), result, pots: this.pots });
+            });
+        } catch (error) {
+            console.error('Error sending experience batch:', error);
+            queued.forEach(event => event.resolve(null));
+        }
+    }
+
+    // Add experience to a clipper
+    async addClipperExperience(instanceId, xpAmount = 0.5) {
+        try {
+            const data = await this.queueExperienceEvent(instanceId, 'clipper', xpAmount);
+            if (!data) {
+                return null;
+            }
             
             if (data.success && data.result && data.result.leveled_up) {
                 console.log(`✂️ Clipper leveled up to ${data.result.new_level}!`);
@@ -2320,18 +2462,11 @@ class GameManager {
     // Add experience to a plant
     async addPlantExperience(instanceId, xpAmount = 1) {
         try {
-            const response = await fetch('/api/add-plant-experience', {
-                method: 'POST',
-                headers: {
-                    'Content-Type': 'application/json',
-                },
-                body: JSON.stringify({
-                    instance_id: instanceId,
-                    xp_amount: xpAmount
-                })
-            });
+            const data = await this.queueExperienceEvent(instanceId, 'plant', xpAmount);
+            if (!data) {
+                return null;
+            }
             
-            const data = await response.json();
             if (data.success && data.result.leveled_up) {
                 // Update pots data FIRST with new leveling info
                 this.pots = data.pots;